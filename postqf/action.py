@@ -0,0 +1,110 @@
+# Copyright © 2022 Ralph Seichter
+#
+# This file is part of PostQF.
+#
+# PostQF is free software: you can redistribute it and/or modify it under the terms of the GNU
+# General Public License as published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# PostQF is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without
+# even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with PostQF.
+# If not, see <https://www.gnu.org/licenses/>.
+import shlex
+import subprocess
+import time
+from typing import List
+
+from postqf.config import ACTIONS
+from postqf.config import DEFAULT_POSTSUPER_CMD
+from postqf.logstuff import log
+
+# Maximum number of queue IDs written to postsuper at once.
+BATCH_SIZE = 1000
+
+
+class ActionRunner:
+    """Pass queue IDs to a single long-lived postsuper process in batches.
+
+    The number of IDs passed per second can be limited. In dry-run mode, no
+    process is started, and IDs are only counted.
+    """
+
+    def __init__(self, action: str, command: str = DEFAULT_POSTSUPER_CMD, dry_run: bool = False,
+                 rate: float = 0) -> None:
+        self.action = action
+        self.args = shlex.split(command) + [ACTIONS[action], '-']
+        self.dry_run = dry_run
+        self.rate = rate
+        self.batch_size = min(BATCH_SIZE, max(1, int(rate))) if rate else BATCH_SIZE
+        self.batch: List[str] = []
+        self.process = None
+        self.started = None
+        self.processed = 0
+        self.failed = 0
+
+    def __str__(self) -> str:
+        return ' '.join(shlex.quote(a) for a in self.args)
+
+    def add(self, queue_id: str) -> None:
+        """Queue an ID for processing."""
+        self.batch.append(queue_id)
+        if len(self.batch) >= self.batch_size:
+            self.flush()
+
+    def throttle(self) -> None:
+        """Wait until passing the next batch does not exceed the rate limit."""
+        now = time.monotonic()
+        if self.started is None:
+            self.started = now
+        delay = self.started + self.processed / self.rate - now
+        if delay > 0:
+            time.sleep(delay)
+
+    def flush(self) -> None:
+        """Pass all queued IDs to the postsuper process, starting it if necessary.
+        If the process has terminated, the IDs are counted as failed."""
+        if not self.batch:
+            return
+        if self.rate:
+            self.throttle()
+        count = len(self.batch)
+        data = ''.join(f'{i}\n' for i in self.batch)
+        self.batch = []
+        if self.dry_run:
+            self.processed += count
+            return
+        try:
+            if self.process is None:
+                self.process = subprocess.Popen(self.args, stdin=subprocess.PIPE)
+            self.process.stdin.write(data.encode('utf-8'))
+            self.process.stdin.flush()
+            self.processed += count
+        except OSError as e:
+            if not self.failed:
+                log.error(f'Cannot pass queue IDs to "{self}": {e}')
+            self.failed += count
+
+    def close(self) -> bool:
+        """Pass any remaining IDs and wait for the postsuper process to finish.
+        Returns False if IDs could not be passed or postsuper failed."""
+        self.flush()
+        success = self.failed == 0
+        if self.process:
+            try:
+                self.process.stdin.close()
+            except OSError:
+                pass
+            status = self.process.wait()
+            self.process = None
+            if status:
+                log.error(f'Command "{self}" failed with exit status {status}')
+                success = False
+        return success
+
+    def summary(self) -> str:
+        """Return a summary of processed and failed IDs."""
+        mode = ' (dry run)' if self.dry_run else ''
+        return f'{self.action}{mode}: {self.processed} queue IDs processed, {self.failed} failed'
@@ -0,0 +1,103 @@
+# Copyright © 2022 Ralph Seichter
+#
+# This file is part of PostQF.
+#
+# PostQF is free software: you can redistribute it and/or modify it under the terms of the GNU
+# General Public License as published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# PostQF is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without
+# even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with PostQF.
+# If not, see <https://www.gnu.org/licenses/>.
+import os
+from typing import Dict
+from typing import Iterable
+from typing import Optional
+from typing import Tuple
+
+# Trie key marking the end of a domain entry.
+END = ''
+# Loaded lists by absolute path, with the file size and modification time.
+list_cache: Dict[str, Tuple[int, int, 'AddressList']] = {}
+
+
+class AddressList:
+    """Set of email addresses and domains. Addresses are matched exactly, using
+    a hash set. Domains are stored in a trie of reversed labels, so that each
+    domain entry also matches all of its subdomains. Matching ignores case."""
+
+    def __init__(self, entries: Iterable[str] = ()) -> None:
+        self.addresses = set()
+        self.domains = {}
+        for entry in entries:
+            self.add(entry)
+
+    def __len__(self) -> int:
+        return len(self.addresses) + self.count_domains(self.domains)
+
+    @staticmethod
+    def count_domains(node: dict) -> int:
+        """Return the number of domain entries in a trie node."""
+        return sum(1 if key == END else AddressList.count_domains(child) for key, child in node.items())
+
+    def add(self, entry: str) -> None:
+        """Add an address like "alice@example.com", or a domain like
+        "example.com" (optionally preceded by "@")."""
+        entry = entry.strip().lower()
+        if not entry:
+            return
+        if entry.startswith('@') or '@' not in entry:
+            node = self.domains
+            for label in reversed(entry.lstrip('@').split('.')):
+                node = node.setdefault(label, {})
+            node[END] = True
+        else:
+            self.addresses.add(entry)
+
+    def match_domain(self, domain: str) -> bool:
+        """Return True if the domain or one of its parent domains is listed."""
+        node = self.domains
+        for label in reversed(domain.split('.')):
+            node = node.get(label)
+            if node is None:
+                return False
+            if END in node:
+                return True
+        return False
+
+    def match(self, address: Optional[str]) -> bool:
+        """Return True if the address or its domain is listed."""
+        if not address:
+            return False
+        address = address.lower()
+        if address in self.addresses:
+            return True
+        at = address.rfind('@')
+        return at >= 0 and bool(self.domains) and self.match_domain(address[at + 1:])
+
+
+def parse_list(lines: Iterable[str]) -> AddressList:
+    """Create an address list from lines of text. Empty lines and comments
+    starting with "#" are ignored."""
+    return AddressList(line.split('#', 1)[0] for line in lines)
+
+
+def load_list(path: str) -> AddressList:
+    """Load an address list file, one address or domain per line. Lists are
+    cached in memory, and reloaded only if the file has changed.
+
+    Args:
+        path: File name/path.
+    """
+    path = os.path.abspath(path)
+    st = os.stat(path)
+    cached = list_cache.get(path)
+    if cached and cached[:2] == (st.st_size, st.st_mtime_ns):
+        return cached[2]
+    with open(path, encoding='utf-8') as file:
+        result = parse_list(file)
+    list_cache[path] = (st.st_size, st.st_mtime_ns, result)
+    return result
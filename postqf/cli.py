@@ -0,0 +1,142 @@
+# Copyright © 2022 Ralph Seichter
+#
+# This file is part of PostQF.
+#
+# PostQF is free software: you can redistribute it and/or modify it under the terms of the GNU
+# General Public License as published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# PostQF is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without
+# even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with PostQF.
+# If not, see <https://www.gnu.org/licenses/>.
+"""Command line entry point. Only the modules required by the given command
+are imported, because interpreter startup dominates short runs, e.g. "postqf -i"
+for a small queue or a query passed to the daemon."""
+import sys
+from argparse import ArgumentParser
+from argparse import Namespace
+from typing import List
+from typing import Optional
+
+from postqf import PROGRAM
+from postqf import VERSION
+from postqf.config import ACTIONS
+from postqf.config import DEFAULT_POSTQUEUE_CMD
+from postqf.config import DEFAULT_POSTSUPER_CMD
+from postqf.config import Interval
+from postqf.groupby import parse_fields
+from postqf.histogram import GROUPS
+from postqf.sample import parse_rate
+
+
+def parse_args(argv: Optional[List[str]] = None) -> Namespace:  # pragma: no cover
+    """Parse command line arguments.
+
+    Args:
+        argv: Arguments to parse, sys.argv[1:] if not specified.
+    """
+    parser = ArgumentParser(prog=PROGRAM, epilog=f'{PROGRAM} {VERSION} Copyright © 2022 Ralph Seichter')
+    group = parser.add_argument_group('Regular expression filters')
+    group.add_argument('-d', dest='reason', metavar='REGEX', help='Delay reason filter.')
+    group.add_argument('-q', dest='qname', metavar='REGEX', help='Queue name filter.')
+    group.add_argument('-r', dest='rcpt', metavar='REGEX', help='Recipient address filter.')
+    group.add_argument('-s', dest='sender', metavar='REGEX', help='Sender address filter.')
+    group = parser.add_argument_group('Address list filters')
+    group.add_argument('--rcpt-file', dest='rcpt_file', metavar='FILE',
+                       help='Recipient addresses and domains, one per line.')
+    group.add_argument('--sender-file', dest='sender_file', metavar='FILE',
+                       help='Sender addresses and domains, one per line.')
+    group = parser.add_argument_group('Arrival time filters')
+    group.add_argument('-a', dest='after', metavar='TS', help='Message arrived after TS.')
+    group.add_argument('-b', dest='before', metavar='TS', help='Message arrived before TS.')
+    parser.add_argument('-j', '--jobs', dest='jobs', metavar='N', type=int,
+                        help='Number of worker processes (default: 1).')
+    parser.add_argument('-n', '--limit', dest='limit', metavar='N', type=int,
+                        help='Stop after N matching records.')
+    parser.add_argument('-o', dest='outfile', metavar='OUTFILE',
+                        help='Output file. Use a dash "-" for standard output.')
+    parser.add_argument('--line-buffered', dest='line_buffered', action='store_true',
+                        help='Write output line by line, even if it is not a terminal.')
+    parser.add_argument('--stats', dest='stats', action='store_const', const='-',
+                        help='Print run statistics to stderr.')
+    parser.add_argument('--stats-file', dest='stats', metavar='FILE',
+                        help='Write run statistics to FILE in JSON format.')
+    group = parser.add_argument_group('Input source')
+    group.add_argument('-p', '--postqueue', dest='postqueue', action='store_true',
+                       help='Read queue data from a command instead of input files.')
+    group.add_argument('--postqueue-cmd', dest='postqueue_cmd', metavar='CMD',
+                       help=f'Command used with --postqueue (default: "{DEFAULT_POSTQUEUE_CMD}").')
+    group.add_argument('--concurrent', dest='concurrent', action='store_true',
+                       help='Read all input files concurrently, e.g. multiple named pipes.')
+    group.add_argument('--socket', dest='socket', metavar='SOCKET',
+                       help=f'Query the snapshot of a running daemon, see "{PROGRAM} daemon -h".')
+    group.add_argument('-x', '--index', dest='index', metavar='DB',
+                       help=f'Index database for input files, see "{PROGRAM} index -h".')
+    parser.add_argument('infile', metavar='FILE', nargs='*', help='Input file. Use a dash "-" for standard input.')
+    parser.add_argument('--top', dest='top', metavar='N', type=int,
+                        help='Only report the N most frequent keys, using bounded memory.')
+    parser.add_argument('--normalize-reasons', dest='normalize_reasons', action='store_true',
+                        help='Replace host names, addresses etc. in delay reasons with placeholders.')
+    parser.add_argument('-u', '--unique', dest='unique', action='store_true',
+                        help='Only process the first matching record for each queue ID.')
+    group = parser.add_argument_group('Sampling (reports show estimated counts and 95% confidence margins)')
+    sampling = group.add_mutually_exclusive_group()
+    sampling.add_argument('--sample', dest='sample', metavar='RATE', type=parse_rate,
+                          help='Only process a fraction of the records, e.g. 0.01 for 1%%.')
+    sampling.add_argument('--reservoir', dest='reservoir', metavar='N', type=int,
+                          help='Only process N records, chosen uniformly from all input.')
+    group.add_argument('--seed', dest='seed', metavar='N', type=int,
+                       help='Seed for choosing sampled records by queue ID (default: 0).')
+    group = parser.add_argument_group('Queue actions (executed using postsuper)')
+    actions = group.add_mutually_exclusive_group()
+    for name, option in ACTIONS.items():
+        actions.add_argument(f'--{name}', dest='action', action='store_const', const=name,
+                             help=f'{name.capitalize()} matching messages (postsuper {option}).')
+    group.add_argument('--postsuper-cmd', dest='postsuper_cmd', metavar='CMD',
+                       help=f'Command used for queue actions (default: "{DEFAULT_POSTSUPER_CMD}").')
+    group.add_argument('--dry-run', dest='dry_run', action='store_true',
+                       help='Only count the queue IDs which would be processed.')
+    group.add_argument('--rate', dest='rate', metavar='N', type=float,
+                       help='Process at most N queue IDs per second.')
+    group = parser.add_argument_group('Custom output (reports can be combined)')
+    group.add_argument('--id', '-i', dest='queue_id', action='store_true', help='ID output only.')
+    group.add_argument('--records', dest='records', action='store_true',
+                       help='Output matching records in addition to reports.')
+    group.add_argument('--group-by', dest='report_group', metavar='FIELDS', type=parse_fields,
+                       help='Report counts by a comma-separated list of fields: '
+                            'queue, rcpt, rdom, reason, sdom, sender.')
+    group.add_argument('--histogram', dest='report_histogram', metavar='WIDTH', type=Interval.to_seconds,
+                       help='Arrival time histogram, using buckets of WIDTH (e.g. "15m", "hour", "day").')
+    group.add_argument('--histogram-by', dest='histogram_by', choices=GROUPS,
+                       help='Split histogram buckets by queue name or delay reason.')
+    group.add_argument('--rcpt', dest='report_rcpt', action='store_true', help='Recipient address report.')
+    group.add_argument('--rdom', dest='report_rdom', action='store_true', help='Recipient domain report.')
+    group.add_argument('--reason', dest='report_reason', action='store_true', help='Delay reason report.')
+    group.add_argument('--sdom', dest='report_sdom', action='store_true', help='Sender domain report.')
+    group.add_argument('--sender', dest='report_sender', action='store_true', help='Sender address report.')
+    ns = parser.parse_args(argv)
+    if ns.action and (ns.sample or ns.reservoir):
+        parser.error('Queue actions cannot be combined with sampling')
+    return ns
+
+
+def main() -> None:  # pragma: no cover
+    """Execution starts here."""
+    command = sys.argv[1:2]
+    if command == ['index']:
+        from postqf.index import index_command
+        sys.exit(0 if index_command(sys.argv[2:]) else 1)
+    if command == ['daemon']:
+        from postqf.daemon import daemon_command
+        sys.exit(0 if daemon_command(sys.argv[2:]) else 1)
+    ns = parse_args()
+    if ns.socket:
+        from postqf.client import query
+        sys.exit(query(ns.socket, sys.argv[1:], ns.outfile or '-'))
+    from postqf.config import cf
+    from postqf.core import process_files
+    cf.refresh(ns)
+    sys.exit(0 if process_files() else 1)
@@ -0,0 +1,76 @@
+# Copyright © 2022 Ralph Seichter
+#
+# This file is part of PostQF.
+#
+# PostQF is free software: you can redistribute it and/or modify it under the terms of the GNU
+# General Public License as published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# PostQF is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without
+# even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with PostQF.
+# If not, see <https://www.gnu.org/licenses/>.
+"""Client side of the query protocol used by "postqf daemon". A request is a
+single line containing the command line arguments as a JSON array. The response
+starts with a status line, containing the exit status and a message, followed
+by the query output."""
+import json
+import socket
+import sys
+from typing import List
+from typing import Tuple
+
+# Buffer size used for receiving query output.
+BUFFER_SIZE = 1024 * 1024
+
+
+def encode_request(argv: List[str]) -> bytes:
+    """Return a request line for the given command line arguments."""
+    return json.dumps(argv).encode('utf-8') + b'\n'
+
+
+def encode_status(status: int, message: str = '') -> bytes:
+    """Return a response status line."""
+    return f'{status} {message}\n'.encode('utf-8')
+
+
+def decode_status(line: bytes) -> Tuple[int, str]:
+    """Return the exit status and message contained in a response status line."""
+    status, _, message = line.decode('utf-8').rstrip('\n').partition(' ')
+    return int(status), message
+
+
+def query(path: str, argv: List[str], outfile: str = '-') -> int:
+    """Pass command line arguments to a daemon listening on a Unix domain
+    socket, and write the query output to a file. Returns the exit status.
+
+    Args:
+        path: Socket path.
+        argv: Command line arguments.
+        outfile: Output file name/path, "-" for stdout.
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(path)
+            sock.sendall(encode_request(argv))
+        except OSError as e:
+            print(f'Cannot query daemon at {path}: {e}', file=sys.stderr)
+            return 1
+        with sock.makefile('rb', buffering=BUFFER_SIZE) as response:
+            status, message = decode_status(response.readline())
+            if message:
+                print(message, file=sys.stderr)
+            out = sys.stdout.buffer if outfile == '-' else open(outfile, 'wb')
+            try:
+                while True:
+                    data = response.read1(BUFFER_SIZE)
+                    if not data:
+                        break
+                    out.write(data)
+                out.flush()
+            finally:
+                if out is not sys.stdout.buffer:
+                    out.close()
+    return status
@@ -0,0 +1,130 @@
+# Copyright © 2022 Ralph Seichter
+#
+# This file is part of PostQF.
+#
+# PostQF is free software: you can redistribute it and/or modify it under the terms of the GNU
+# General Public License as published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# PostQF is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without
+# even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with PostQF.
+# If not, see <https://www.gnu.org/licenses/>.
+import io
+import struct
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+# Compression formats by magic bytes.
+MAGIC = {
+    b'\x1f\x8b': 'gzip',
+    b'BZh': 'bzip2',
+    b'\xfd7zXZ\x00': 'xz',
+}
+MAGIC_SIZE = max(len(m) for m in MAGIC)
+# Approximate amount of compressed data per parallel decompression task.
+MEMBER_CHUNK_SIZE = 4 * 1024 * 1024
+
+
+def compression(prefix: bytes) -> Optional[str]:
+    """Return the compression format indicated by the first bytes of a file, or
+    None if the data is not compressed."""
+    for magic, name in MAGIC.items():
+        if prefix.startswith(magic):
+            return name
+    return None
+
+
+def file_compression(path: str) -> Optional[str]:
+    """Return the compression format of a file, or None if it is not compressed."""
+    with open(path, 'rb') as file:
+        return compression(file.read(MAGIC_SIZE))
+
+
+def decompressing_reader(raw: io.BufferedReader, name: str, buffer_size: int) -> io.BufferedReader:
+    """Wrap a binary file in a reader which decompresses large chunks of data.
+    Closing the returned reader does not close the wrapped file.
+
+    Args:
+        raw: Compressed binary input.
+        name: Compression format as returned by compression().
+        buffer_size: Size of the decompressed data buffer.
+    """
+    # Compression modules are imported on demand to keep startup fast.
+    if name == 'gzip':
+        import gzip
+        file = gzip.GzipFile(fileobj=raw, mode='rb')
+    elif name == 'bzip2':
+        import bz2
+        file = bz2.BZ2File(raw, mode='rb')
+    else:
+        import lzma
+        file = lzma.LZMAFile(raw, mode='rb')
+    return io.BufferedReader(file, buffer_size=buffer_size)
+
+
+def gzip_members(path: str) -> Optional[List[Tuple[int, int]]]:
+    """Return offset and size of all members of a multi-member gzip file. Member
+    sizes are only known in advance if each member header contains a BGZF block
+    size field, as written by "bgzip". Returns None for other files.
+
+    Args:
+        path: File name/path.
+    """
+    members = []
+    offset = 0
+    with open(path, 'rb') as file:
+        while True:
+            header = file.read(12)
+            if not header:
+                return members
+            if len(header) < 12 or header[:3] != b'\x1f\x8b\x08' or not header[3] & 4:
+                return None
+            extra = file.read(struct.unpack('<H', header[10:12])[0])
+            size = None
+            i = 0
+            while i + 4 <= len(extra):
+                length = struct.unpack('<H', extra[i + 2:i + 4])[0]
+                if extra[i:i + 2] == b'BC' and length == 2:
+                    size = struct.unpack('<H', extra[i + 4:i + 6])[0] + 1
+                i += 4 + length
+            if size is None:
+                return None
+            members.append((offset, size))
+            offset += size
+            file.seek(offset)
+
+
+def member_ranges(members: List[Tuple[int, int]], chunk: int = MEMBER_CHUNK_SIZE) -> List[Tuple[int, int]]:
+    """Group consecutive gzip members into byte ranges of roughly the given size.
+
+    Args:
+        members: Offset and size of each member.
+        chunk: Desired range size in bytes.
+    """
+    ranges = []
+    start = end = 0
+    for offset, size in members:
+        end = offset + size
+        if end - start >= chunk:
+            ranges.append((start, end))
+            start = end
+    if end > start:
+        ranges.append((start, end))
+    return ranges
+
+
+def decompress_range(task: Tuple[str, int, int]) -> bytes:
+    """Decompress a byte range of a gzip file consisting of complete members.
+
+    Args:
+        task: File name/path, start offset and end offset.
+    """
+    import gzip
+    path, start, end = task
+    with open(path, 'rb') as file:
+        file.seek(start)
+        return gzip.decompress(file.read(end - start))
@@ -12,6 +12,7 @@
 #
 # You should have received a copy of the GNU General Public License along with PostQF.
 # If not, see <https://www.gnu.org/licenses/>.
+import math
 import re
 from argparse import Namespace
 from datetime import datetime
@@ -19,6 +20,21 @@ from datetime import timedelta
 from re import IGNORECASE
 from re import Pattern
 from re import compile
+from typing import Optional
+
+from postqf.addrlist import AddressList
+from postqf.addrlist import load_list
+
+DEFAULT_POSTQUEUE_CMD = 'postqueue -j'
+DEFAULT_POSTSUPER_CMD = 'postsuper'
+# Queue actions and the matching postsuper options, which read queue IDs from
+# stdin if followed by "-".
+ACTIONS = {
+    'hold': '-h',
+    'release': '-H',
+    'requeue': '-r',
+    'delete': '-d',
+}
 
 
 class Interval:
@@ -31,13 +47,26 @@ class Interval:
         'h': 60 * 60,
         'd': 60 * 60 * 24,
     }
+    unit_names_map = {
+        'minute': '1m',
+        'hour': '1h',
+        'day': '1d',
+    }
 
     def __init__(self, after: str = DEFAULT_AFTER, before: str = DEFAULT_BEFORE) -> None:
         self.after_str = after
         self.before_str = before
-        self.after = None
-        self.before = None
         self.reference = datetime.now()
+        self.after = self.to_datetime(after, datetime.fromtimestamp(0))
+        self.before = self.to_datetime(before, datetime.fromisoformat(Interval.DEFAULT_BEFORE))
+        # Boundaries in epoch seconds, None if not specified. Arrival times are
+        # integers, so rounding preserves the results of datetime comparison.
+        self.after_epoch: Optional[int] = None
+        self.before_epoch: Optional[int] = None
+        if after and after != Interval.DEFAULT_AFTER:
+            self.after_epoch = math.floor(self.after.timestamp())
+        if before and before != Interval.DEFAULT_BEFORE:
+            self.before_epoch = math.ceil(self.before.timestamp())
 
     def __str__(self) -> str:
         return f'({self.after}, {self.before})'
@@ -60,31 +89,73 @@ class Interval:
             d = datetime.fromisoformat(string)
         return d
 
+    @staticmethod
+    def to_seconds(string: str) -> int:
+        """Convert a duration like "15m", "2h" or "day" into seconds. Digits
+        without a unit are interpreted as seconds."""
+        duration = Interval.unit_names_map.get(string.lower(), string)
+        match = re.match(r'(\d+)([dhms]?)$', duration, IGNORECASE)
+        if not match or not int(match.group(1)):
+            raise ValueError(f'Invalid duration: {string}')
+        return int(match.group(1)) * Interval.unit_seconds_map[(match.group(2) or 's').lower()]
+
+    @property
+    def active(self) -> bool:
+        """Return True if at least one boundary was specified."""
+        return self.after_epoch is not None or self.before_epoch is not None
+
     def includes(self, t: datetime) -> bool:
         """Return True if a datetime object is indluded in the configured interval."""
-        if not self.before:
-            self.after = self.to_datetime(self.after_str, datetime.fromtimestamp(0))
-            self.before = self.to_datetime(self.before_str, datetime.fromisoformat('9999-12-31'))
         return self.after < t < self.before
 
+    def includes_epoch(self, t: int) -> bool:
+        """Return True if an epoch time is included in the configured interval."""
+        if self.after_epoch is not None and t <= self.after_epoch:
+            return False
+        return self.before_epoch is None or t < self.before_epoch
+
 
 class Config:
     """PostQF configuration elements."""
 
     def __init__(self) -> None:
+        self.action = None
+        self.concurrent = False
+        self.dry_run = False
+        self.histogram_by = None
+        self.index = None
         self.infile = None
         self.interval = None
+        self.jobs = 1
+        self.limit = 0
+        self.line_buffered = False
+        self.normalize_reasons = False
         self.outfile = None
+        self.postqueue = False
+        self.postqueue_cmd = None
+        self.postsuper_cmd = None
         self.qname_re = None
         self.queue_id = None
+        self.rate = 0
+        self.rcpt_list = None
         self.rcpt_re = None
         self.reason_re = None
+        self.records = False
+        self.report_group = None
+        self.report_histogram = 0
         self.report_rcpt = False
         self.report_rdom = False
         self.report_reason = False
         self.report_sdom = False
         self.report_sender = False
+        self.reservoir = 0
+        self.sample = 0
+        self.seed = 0
+        self.sender_list = None
         self.sender_re = None
+        self.stats = None
+        self.top = 0
+        self.unique = False
 
     @staticmethod
     def re_compile(regex: str, default: str = '.') -> Pattern:
@@ -93,6 +164,13 @@ class Config:
             regex = default
         return compile(regex, IGNORECASE)
 
+    @staticmethod
+    def load_list(path: Optional[str]) -> Optional[AddressList]:
+        """Load an address list file if a path is specified, None otherwise."""
+        if not path:
+            return None
+        return load_list(path)
+
     @staticmethod
     def get_attr(ns: Namespace, name: str, default):
         """Return a namespace attribute if available, a default value otherwise."""
@@ -103,19 +181,43 @@ class Config:
 
     def refresh(self, ns: Namespace) -> None:
         """Refresh config from parsed command line arguments."""
+        self.action = self.get_attr(ns, 'action', None)
+        self.concurrent = self.get_attr(ns, 'concurrent', False)
+        self.dry_run = self.get_attr(ns, 'dry_run', False)
+        self.histogram_by = self.get_attr(ns, 'histogram_by', None)
+        self.index = self.get_attr(ns, 'index', None)
         self.infile = self.get_attr(ns, 'infile', ['-'])
+        self.jobs = self.get_attr(ns, 'jobs', 1)
+        self.limit = self.get_attr(ns, 'limit', 0)
+        self.line_buffered = self.get_attr(ns, 'line_buffered', False)
+        self.normalize_reasons = self.get_attr(ns, 'normalize_reasons', False)
         self.outfile = self.get_attr(ns, 'outfile', '-')
+        self.postqueue = self.get_attr(ns, 'postqueue', False)
+        self.postqueue_cmd = self.get_attr(ns, 'postqueue_cmd', DEFAULT_POSTQUEUE_CMD)
+        self.postsuper_cmd = self.get_attr(ns, 'postsuper_cmd', DEFAULT_POSTSUPER_CMD)
         self.queue_id = self.get_attr(ns, 'queue_id', False)
+        self.rate = self.get_attr(ns, 'rate', 0)
+        self.records = self.get_attr(ns, 'records', False)
+        self.report_group = self.get_attr(ns, 'report_group', None)
+        self.report_histogram = self.get_attr(ns, 'report_histogram', 0)
         self.report_rcpt = self.get_attr(ns, 'report_rcpt', False)
         self.report_rdom = self.get_attr(ns, 'report_rdom', False)
         self.report_reason = self.get_attr(ns, 'report_reason', False)
         self.report_sdom = self.get_attr(ns, 'report_sdom', False)
         self.report_sender = self.get_attr(ns, 'report_sender', False)
+        self.reservoir = self.get_attr(ns, 'reservoir', 0)
+        self.sample = self.get_attr(ns, 'sample', 0)
+        self.seed = self.get_attr(ns, 'seed', 0)
+        self.stats = self.get_attr(ns, 'stats', None)
+        self.top = self.get_attr(ns, 'top', 0)
+        self.unique = self.get_attr(ns, 'unique', False)
 
         self.qname_re = Config.re_compile(ns.qname)
         self.rcpt_re = Config.re_compile(ns.rcpt)
         self.reason_re = Config.re_compile(ns.reason)
         self.sender_re = Config.re_compile(ns.sender)
+        self.rcpt_list = Config.load_list(self.get_attr(ns, 'rcpt_file', None))
+        self.sender_list = Config.load_list(self.get_attr(ns, 'sender_file', None))
 
         after = self.get_attr(ns, 'after', Interval.DEFAULT_AFTER)
         before = self.get_attr(ns, 'before', Interval.DEFAULT_BEFORE)
@@ -14,20 +14,67 @@
 # If not, see <https://www.gnu.org/licenses/>.
 import json
 import sys
-from argparse import ArgumentParser
-from argparse import Namespace
+from io import BytesIO
+from time import perf_counter
+from typing import Callable
+from typing import Dict
+from typing import Iterable
+from typing import List
 from typing import Optional
+from typing import TYPE_CHECKING
+from typing import Tuple
 
-from postqf import PROGRAM
-from postqf import VERSION
+from postqf.cli import main as cli_main
+from postqf.config import Config
 from postqf.config import cf
-from postqf.filter import arrival_match
-from postqf.filter import rcpt_match
-from postqf.filter import reason_match
-from postqf.filter import str_match
+from postqf.dedupe import FingerprintSet
+from postqf.filter import compile_filter
+from postqf.filter import compile_prefilter
+from postqf.groupby import count_group
+from postqf.groupby import generate_group_report
+from postqf.histogram import count_arrival
+from postqf.histogram import generate_histogram
 from postqf.logstuff import log
-
-report_dict = {}
+from postqf.output import OutputClosed
+from postqf.output import OutputWriter
+from postqf.parallel import Task
+from postqf.parallel import read_range
+from postqf.parallel import run_ordered
+from postqf.parallel import split_file
+from postqf.reason import normalize_reason
+from postqf.sample import Reservoir
+from postqf.sample import SquareSums
+from postqf.sample import estimate
+from postqf.sample import sample_check
+from postqf.source import FileSource
+from postqf.source import Source
+from postqf.source import input_sources
+from postqf.stats import SAMPLE_INTERVAL
+from postqf.stats import Stats
+from postqf.stats import stats_hooks
+from postqf.topn import ExactCounter
+from postqf.topn import SpaceSaving
+from postqf.topn import new_counter
+
+if TYPE_CHECKING:  # pragma: no cover
+    from postqf.action import ActionRunner
+
+# Default counter used by count_key() and count_rcpt().
+report_dict = ExactCounter()
+# Counters of the reports requested for the current run, by report name.
+reports: Dict[str, object] = {}
+# Sums of squared per-record counts of the requested reports if records are sampled, by report name.
+report_squares: Dict[str, SquareSums] = {}
+# Number of matching records in the current run.
+match_count = 0
+# Statistics of the current run, None unless requested.
+run_stats: Optional[Stats] = None
+# Queue IDs of matching records in the current run, None unless --unique is set.
+seen_ids: Optional[FingerprintSet] = None
+# Receives the queue IDs of matching records if a queue action was requested.
+action_runner: Optional['ActionRunner'] = None
+# Collects the input records if --reservoir is set, which are only processed once all input has been read.
+reservoir: Optional[Reservoir] = None
 
 
 def close_file(file):
@@ -48,6 +95,8 @@ def open_file(path: str, mode: str, dash_file):
     """
     if path == '-':
         return dash_file
+    if 'b' in mode:
+        return open(path, mode=mode)
     return open(path, mode=mode, encoding='utf-8')
 
 
@@ -63,6 +112,22 @@ def format_output(data: dict) -> str:
     return json.dumps(data)
 
 
+def encode_output(data: dict, line: Optional[bytes] = None) -> bytes:
+    """Return the output for a matching record as a line of bytes. If the raw
+    input line is available, it is passed through unchanged instead of encoding
+    the data again.
+
+    Args:
+        data: Postfix recipient data.
+        line: Raw input line the data was decoded from.
+    """
+    if line is None or cf.queue_id:
+        return format_output(data).encode('utf-8') + b'\n'
+    if line.endswith(b'\n'):
+        return line
+    return line + b'\n'
+
+
 def queue_name(data: dict) -> Optional[str]:
     """Extract the Postfix queue name. This also serves as a sanity check,
     because valid queue data must contain this attribute.
@@ -76,7 +141,8 @@ def queue_name(data: dict) -> Optional[str]:
     log.error(f'Malformed input data: element "{name}" is missing')
 
 
-def count_rcpt(recipients: list, attribute: str, to_lower: bool = False, separator: str = '') -> None:
+def count_rcpt(recipients: list, attribute: str, to_lower: bool = False, separator: str = '',
+               counter=None, transform: Optional[Callable[[str], str]] = None) -> None:
     """Collect recipient attribute data for a report.
 
     Args:
@@ -85,13 +151,16 @@ def count_rcpt(recipients: list, attribute: str, to_lower: bool = False, separat
         to_lower: Convert attribute value to lower case?
         separator: If specified, split attribute values at the given substring and pick the second element.
         This is useful for extracting domain names from address-type attributes.
+        counter: ExactCounter or SpaceSaving object, report_dict if not specified.
+        transform: If specified, applied to attribute values before counting.
     """
     for r in recipients:
         if attribute in r:
-            count_key(r[attribute], to_lower=to_lower, separator=separator)
+            value = r[attribute] if transform is None else transform(r[attribute])
+            count_key(value, to_lower=to_lower, separator=separator, counter=counter)
 
 
-def count_key(key: str, to_lower: bool = False, separator: str = '') -> None:
+def count_key(key: str, to_lower: bool = False, separator: str = '', counter=None) -> None:
     """Collect sender address data for a report.
 
     Args:
@@ -99,107 +168,509 @@ def count_key(key: str, to_lower: bool = False, separator: str = '') -> None:
         to_lower: Convert key to lower case?
         separator: If specified, split attribute values at the given substring and pick the second element.
         This is useful for extracting domain names from address-type attributes.
+        counter: ExactCounter or SpaceSaving object, report_dict if not specified.
     """
-    global report_dict
     if key and separator:
         key = key.split(separator)[1]
     if key:
         if to_lower:
             key = key.lower()
-        if key in report_dict:
-            report_dict[key] += 1
+        if counter is None:
+            counter = report_dict
+        counter.add(key)
+
+
+# Available reports, by name. Each function counts the keys found in queue data.
+REPORTS = {
+    'group': lambda qdata, counter: count_group(qdata, cf.report_group, counter, cf.normalize_reasons),
+    'histogram': lambda qdata, counter: count_arrival(qdata, cf.report_histogram, cf.histogram_by, counter,
+                                                      cf.normalize_reasons),
+    'rcpt': lambda qdata, counter: count_rcpt(qdata['recipients'], 'address', to_lower=True, counter=counter),
+    'rdom': lambda qdata, counter: count_rcpt(qdata['recipients'], 'address', to_lower=True, separator='@',
+                                              counter=counter),
+    'reason': lambda qdata, counter: count_rcpt(qdata['recipients'], 'delay_reason', counter=counter,
+                                                transform=normalize_reason if cf.normalize_reasons else None),
+    'sdom': lambda qdata, counter: count_key(qdata['sender'], to_lower=True, separator='@', counter=counter),
+    'sender': lambda qdata, counter: count_key(qdata['sender'], to_lower=True, counter=counter),
+}
+
+
+def generate_report(data: dict, outfile, reverse: bool = False, rate: float = 1.0,
+                    squares: Optional[dict] = None) -> None:
+    """Generate report and write it to the given output file. If records were
+    sampled, each line contains the estimated count, the margin of its 95%
+    confidence interval and the key.
+
+    Args:
+        data: Report data dictionary.
+        outfile: Output file handle.
+        reverse: Sort data in reverse order?
+        rate: Fraction of records sampled.
+        squares: Sums of squared per-record counts by key if records were sampled, see SquareSums.
+    """
+    for i in sorted(data.items(), key=lambda _item: _item[1], reverse=reverse):
+        if rate < 1:
+            print(*estimate(i[1], rate, squares.get(i[0]) if squares else None), i[0], file=outfile)
         else:
-            report_dict[key] = 1
+            print(i[1], i[0], file=outfile)
 
 
-def generate_report(data: dict, outfile, reverse: bool = False) -> None:
-    """Generate report and write it to the given output file.
+def generate_top_report(data: SpaceSaving, top: int, outfile, reverse: bool = False, rate: float = 1.0,
+                        squares: Optional[dict] = None) -> None:
+    """Generate a top N report and write it to the given output file. Each line
+    contains the estimated count, the maximum estimation error and the key. If
+    records were sampled, both numbers are scaled up, and the margin of the 95%
+    confidence interval precedes the key.
 
     Args:
-        data: Report data dictionary.
+        data: Report data summary.
+        top: Maximum number of keys to report.
         outfile: Output file handle.
         reverse: Sort data in reverse order?
+        rate: Fraction of records sampled.
+        squares: Sums of squared per-record counts by key if records were sampled, see SquareSums.
     """
-    for i in sorted(data.items(), key=lambda _item: _item[1], reverse=reverse):
-        print(i[1], i[0], file=outfile)
+    rows = data.top(top)
+    if not reverse:
+        rows.reverse()
+    for key, count, error in rows:
+        if rate < 1:
+            count, margin = estimate(count, rate, squares.get(key) if squares else None)
+            print(count, round(error / rate), margin, key, file=outfile)
+        else:
+            print(count, error, key, file=outfile)
+
+
+def write_reports(outfile, headers: bool = False) -> None:
+    """Write all requested reports to the given output file.
+
+    Args:
+        outfile: Output file handle.
+        headers: Precede each report with a line containing its name?
+    """
+    rate = sample_rate()
+    for name, counter in reports.items():
+        if headers:
+            print(f'# {name}', file=outfile)
+        squares = report_squares.get(name)
+        if name == 'group':
+            generate_group_report(counter, cf.top, outfile, rate, squares)
+        elif name == 'histogram':
+            generate_histogram(counter, outfile, rate, squares)
+        elif isinstance(counter, SpaceSaving):
+            generate_top_report(counter, cf.top, outfile, rate=rate, squares=squares)
+        else:
+            generate_report(counter, outfile, rate=rate, squares=squares)
+
+
+def reset_reports() -> None:
+    """Create empty counters for all requested reports. The histogram is always
+    counted exactly, because its number of buckets is bounded by the time range.
+    If records are sampled, the sums of squared per-record counts are tracked as well."""
+    reports.clear()
+    report_squares.clear()
+    for name in REPORTS:
+        if getattr(cf, f'report_{name}'):
+            reports[name] = ExactCounter() if name == 'histogram' else new_counter(cf.top)
+            if cf.sample or cf.reservoir > 0:
+                report_squares[name] = SquareSums()
 
 
-def process_record(qdata: dict, outfile) -> None:
+def sample_rate() -> float:
+    """Return the fraction of input records processed in the current run, which
+    is 1 unless records are sampled."""
+    if reservoir is not None:
+        return reservoir.rate()
+    return cf.sample or 1.0
+
+
+def output_records() -> bool:
+    """Return True if matching records are written to the output file."""
+    return cf.queue_id or cf.records or not (reports or cf.action)
+
+
+def process_record(qdata: dict, outfile, line: Optional[bytes] = None, match: Callable = None) -> bool:
     """Process a single Postfix queue data record and write to the given
-    output file if the record matches all user-specified filters.
+    output file if the record matches all user-specified filters. Returns True
+    if the record matches.
 
     Args:
         qdata: Postfix queue data.
-        outfile: Output file handle.
+        outfile: Binary output file handle.
+        line: Raw input line the data was decoded from, if available.
+        match: Filter predicate created by compile_filter(), compiled on demand if not specified.
+    """
+    if match is None:
+        match = compile_filter(cf)
+    if match(qdata):
+        emit_record(qdata, outfile, line)
+        return True
+    return False
+
+
+def add_squares(squares: SquareSums, counts: Dict, counter) -> None:
+    """Add the squared key counts of a sampled record. For top N reports, only
+    the sums of keys monitored by the SpaceSaving object are kept, so that
+    memory use remains bounded.
+
+    Args:
+        squares: Sums of squared counts of a report, updated in place.
+        counts: Key counts of the record.
+        counter: Report counter.
+    """
+    squares.add(counts)
+    if isinstance(counter, SpaceSaving) and len(squares) > 2 * counter.capacity:
+        squares.retain(counter.counts)
+
+
+def emit_record(qdata: dict, outfile, line: Optional[bytes] = None) -> None:
+    """Count a matching record in all requested reports, pass its queue ID to
+    the queue action, and write it to the given output file if records are part
+    of the output.
+
+    Args:
+        qdata: Postfix queue data.
+        outfile: Binary output file handle.
+        line: Raw input line the data was decoded from, if available.
+    """
+    for name, counter in reports.items():
+        if name in report_squares:
+            counts = ExactCounter()
+            REPORTS[name](qdata, counts)
+            for key, count in counts.items():
+                counter.add(key, count)
+            add_squares(report_squares[name], counts, counter)
+        else:
+            REPORTS[name](qdata, counter)
+    if action_runner is not None:
+        action_runner.add(qdata['queue_id'])
+    if output_records():
+        outfile.write(encode_output(qdata, line))
+
+
+def process_lines(lines: Iterable, outfile) -> bool:
+    """Process all queue data records (one JSON object per line) from an input
+    source. Lines which cannot match the configured filters, or which are not
+    part of the sample if --sample is set, are skipped without decoding them.
+
+    Processing stops once the configured limit of matching records has been
+    reached, possibly while processing an earlier input source. Returns True to
+    indicate success, False in case of exceptions.
+
+    Args:
+        lines: Iterable input source providing bytes, e.g. a binary file handle.
+        outfile: Binary output file handle.
+    """
+    global match_count
+    if limit_reached():
+        return True
+    if cf.sample:
+        lines = filter(sample_check(cf.sample, cf.seed), lines)
+    if run_stats is not None:
+        return process_lines_stats(lines, outfile, run_stats)
+    prefilter = compile_prefilter(cf)
+    match = compile_filter(cf, seen=seen_ids)
+    loads = json.loads
+    try:
+        for line in lines:
+            if (prefilter is None or prefilter(line)) and process_record(loads(line), outfile, line, match):
+                match_count += 1
+                if limit_reached():
+                    break
+    except OutputClosed:
+        raise
+    except Exception as e:  # pragma: no cover
+        log.exception(e)
+        return False
+    return True
+
+
+def process_lines_stats(lines: Iterable, outfile, stats: Stats) -> bool:
+    """Variant of process_lines() which collects statistics. Every Nth record
+    is timed per processing stage, see SAMPLE_INTERVAL.
+
+    Args:
+        lines: Iterable input source providing bytes, e.g. a binary file handle.
+        outfile: Binary output file handle.
+        stats: Statistics object, updated in place.
     """
-    if (str_match(cf.qname_re, queue_name(qdata)) and
-            str_match(cf.sender_re, qdata['sender']) and
-            rcpt_match(qdata['recipients']) and
-            reason_match(qdata['recipients']) and
-            arrival_match(qdata['arrival_time'])):
-        if cf.report_rdom:
-            count_rcpt(qdata['recipients'], 'address', to_lower=True, separator='@')
-        elif cf.report_rcpt:
-            count_rcpt(qdata['recipients'], 'address', to_lower=True)
-        elif cf.report_reason:
-            count_rcpt(qdata['recipients'], 'delay_reason')
-        elif cf.report_sdom:
-            count_key(qdata['sender'], to_lower=True, separator='@')
-        elif cf.report_sender:
-            count_key(qdata['sender'], to_lower=True)
+    global match_count
+    rejected = stats.rejected
+    match = compile_filter(cf, rejected, seen_ids)
+    # Lines skipped without decoding count as rejected by the failing filter.
+    prefilter = compile_prefilter(cf, rejected)
+    loads = json.loads
+    clock = perf_counter
+    times = stats.stage_times
+    start = clock()
+    try:
+        for line in lines:
+            stats.records += 1
+            stats.bytes += len(line)
+            if stats.records % SAMPLE_INTERVAL:
+                if prefilter is not None and not prefilter(line):
+                    continue
+                try:
+                    qdata = loads(line)
+                except ValueError:
+                    stats.parse_errors += 1
+                    raise
+                if not match(qdata):
+                    continue
+                emit_record(qdata, outfile, line)
+            else:
+                stats.sampled += 1
+                t0 = clock()
+                passed = prefilter is None or prefilter(line)
+                t1 = clock()
+                times['prefilter'] += t1 - t0
+                if not passed:
+                    continue
+                try:
+                    qdata = loads(line)
+                except ValueError:
+                    stats.parse_errors += 1
+                    raise
+                t2 = clock()
+                times['parse'] += t2 - t1
+                passed = match(qdata)
+                t3 = clock()
+                times['filter'] += t3 - t2
+                if not passed:
+                    continue
+                emit_record(qdata, outfile, line)
+                times['output'] += clock() - t3
+            stats.matches += 1
+            match_count += 1
+            if limit_reached():
+                break
+    except OutputClosed:
+        raise
+    except Exception as e:  # pragma: no cover
+        log.exception(e)
+        return False
+    finally:
+        stats.busy += clock() - start
+    return True
+
+
+def process_source(source: Source, outfile) -> bool:
+    """Process a single input source. If --reservoir is set, lines which pass
+    the prefilter are only offered to the reservoir instead.
+
+    Returns True to indicate success, False in case of exceptions.
+
+    Args:
+        source: Input source.
+        outfile: Binary output file handle.
+    """
+    success = False
+    try:
+        if reservoir is not None:
+            prefilter = compile_prefilter(cf)
+            reservoir.offer(source.open() if prefilter is None else filter(prefilter, source.open()))
+            success = True
         else:
-            print(format_output(qdata), file=outfile)
+            success = process_lines(source.open(), outfile)
+    finally:
+        success = source.close() and success
+    return success
+
+
+def limit_reached() -> bool:
+    """Return True if the configured limit of matching records has been reached."""
+    return 0 < cf.limit <= match_count
+
+
+def merge_reports(data: Dict[str, object], squares: Optional[Dict[str, SquareSums]] = None) -> None:
+    """Merge partial report data, e.g. collected by a worker process, into the
+    counters of the current run.
+
+    Args:
+        data: Report counters by report name.
+        squares: Sums of squared per-record counts by report name, see SquareSums.
+    """
+    for name, counter in data.items():
+        reports[name].merge(counter)
+    for name, sums in (squares or {}).items():
+        report_squares[name].merge(sums)
+        if isinstance(reports[name], SpaceSaving):
+            report_squares[name].retain(reports[name].counts)
 
 
-def process_files() -> bool:
-    """Process all given input files in order.
+def init_worker(config: Config) -> None:
+    """Initialise a worker process with the parent's configuration.
+
+    Args:
+        config: Configuration of the parent process.
+    """
+    cf.__dict__.update(vars(config))
+
+
+def process_range(task: Task) -> Tuple[bytes, Dict[str, object], Dict[str, SquareSums], bool, Optional[Stats]]:
+    """Process a byte range of an input file inside a worker process.
+
+    Returns a tuple containing the output data, the partial report data, the
+    partial sums of squared counts (empty unless records are sampled), a
+    success indicator and the partial statistics (None unless requested).
+
+    Args:
+        task: Input file path, start offset and end offset.
+    """
+    global run_stats
+    path, start, end = task
+    reset_reports()
+    run_stats = Stats() if cf.stats else None
+    outfile = BytesIO()
+    success = process_lines(read_range(path, start, end), outfile)
+    return outfile.getvalue(), dict(reports), dict(report_squares), success, run_stats
+
+
+def process_parallel(outfile) -> bool:
+    """Distribute all given input files across a pool of worker processes.
+    Regular files are split into byte ranges, while other input sources like
+    stdin or named pipes are processed by the parent process. Output is written
+    in input order.
 
     Returns True to indicate success, False in case of exceptions.
+
+    Args:
+        outfile: Binary output file handle.
     """
-    ex = None
-    outfile = open_file(cf.outfile, 'wt', sys.stdout)
-    for path in cf.infile:
-        infile = open_file(path, 'rt', sys.stdin)
+    success = True
+    tasks = [t for path in cf.infile for t in split_file(path, 4 * cf.jobs)]
+    results = run_ordered(process_range, [t for t in tasks if t[2] >= 0], cf.jobs, init_worker, (cf,))
+    for path, start, end in tasks:
+        if end < 0:
+            success &= process_source(FileSource(path, cf.jobs), outfile)
+        else:
+            output, data, squares, ok, stats = next(results)
+            outfile.write(output)
+            merge_reports(data, squares)
+            if stats is not None:
+                run_stats.merge(stats)
+            success &= ok
+    return success
+
+
+class TaggedOutput:
+    """Binary output file wrapper which adds a "source" element to each JSON
+    record written, containing the name of the record's input source."""
+
+    def __init__(self, outfile, name: str) -> None:
+        self.outfile = outfile
+        self.name = name
+        self.prefix = b'{"source": ' + json.dumps(name).encode('utf-8') + b', '
+
+    def write(self, data: bytes) -> None:
+        if data.startswith(b'{"'):
+            data = self.prefix + data[1:]
+        elif data.startswith(b'{'):
+            data = json.dumps(dict(json.loads(data), source=self.name)).encode('utf-8') + b'\n'
+        self.outfile.write(data)
+
+
+def process_concurrent(outfile) -> bool:
+    """Read all given input files concurrently, processing lines as they
+    arrive. Matching records are tagged with the name of their input file,
+    unless only queue IDs are written.
+
+    Returns True to indicate success, False in case of exceptions.
+
+    Args:
+        outfile: Output writer. Reading stops for all inputs once its reader has gone away.
+    """
+    # Imported on demand, because asyncio is slow to import.
+    from postqf.ingest import ingest
+
+    def handle(name: str, lines: list) -> bool:
         try:
-            for line in infile:
-                process_record(json.loads(line), outfile)
-        except Exception as e:  # pragma: no cover
-            log.exception(e)
-            ex = e
+            return process_lines(lines, outfile if cf.queue_id else TaggedOutput(outfile, name))
+        except OutputClosed:
+            return True
+
+    return ingest(cf.infile, handle, lambda: limit_reached() or outfile.broken)
+
+
+def process_files(sources: Optional[List[Source]] = None, outfile=None) -> bool:
+    """Process all given input files in order, or concurrently if requested.
+    Byte ranges of files are not processed in parallel if a limit is set or records are deduplicated,
+    because both apply to the whole sequence of input records, if an index is
+    used, or if a queue action was requested. With --reservoir, all input is
+    read sequentially before the sampled records are processed.
+
+    Returns True to indicate success, False in case of exceptions.
+
+    Args:
+        sources: If specified, process these sources in order instead of the configured input.
+        outfile: If specified, write to this binary file handle instead of the configured output file.
+        The handle is not closed.
+    """
+    global match_count, run_stats, seen_ids, action_runner, reservoir
+    success = True
+    match_count = 0
+    reset_reports()
+    run_stats = Stats() if cf.stats or stats_hooks else None
+    seen_ids = FingerprintSet() if cf.unique else None
+    action_runner = None
+    if cf.action:
+        # Imported on demand, because subprocess is slow to import.
+        from postqf.action import ActionRunner
+        action_runner = ActionRunner(cf.action, cf.postsuper_cmd, cf.dry_run, cf.rate)
+    reservoir = Reservoir(cf.reservoir, cf.seed) if cf.reservoir > 0 else None
+    start = perf_counter()
+    file = open_file(cf.outfile, 'wb', sys.stdout.buffer) if outfile is None else outfile
+    output = OutputWriter(file, cf.line_buffered or None)
+    try:
+        # Output written so far is kept even if a later input source fails.
+        try:
+            if sources is None and cf.concurrent and not (cf.postqueue or reservoir):
+                success = process_concurrent(output)
+            elif sources is None and cf.jobs > 1 and not (cf.index or cf.limit or cf.postqueue or cf.unique or
+                                                          cf.action or reservoir):
+                success = process_parallel(output)
+            else:
+                for source in input_sources(cf) if sources is None else sources:
+                    if limit_reached():
+                        break
+                    success &= process_source(source, output)
+            if reservoir is not None:
+                lines = reservoir.lines()
+                log.info(f'Sampled {len(lines)} of {reservoir.offered} records')
+                success &= process_lines(lines, output)
+            if reports:
+                write_reports(output, headers=len(reports) > 1 or output_records())
         finally:
-            close_file(infile)
-    global report_dict
-    if report_dict:
-        generate_report(report_dict, outfile)
-    close_file(outfile)
-    return not isinstance(ex, Exception)
-
-
-def parse_args() -> Namespace:  # pragma: no cover
-    """Parse command line arguments."""
-    parser = ArgumentParser(prog=PROGRAM, epilog=f'{PROGRAM} {VERSION} Copyright © 2022 Ralph Seichter')
-    group = parser.add_argument_group('Regular expression filters')
-    group.add_argument('-d', dest='reason', metavar='REGEX', help='Delay reason filter.')
-    group.add_argument('-q', dest='qname', metavar='REGEX', help='Queue name filter.')
-    group.add_argument('-r', dest='rcpt', metavar='REGEX', help='Recipient address filter.')
-    group.add_argument('-s', dest='sender', metavar='REGEX', help='Sender address filter.')
-    group = parser.add_argument_group('Arrival time filters')
-    group.add_argument('-a', dest='after', metavar='TS', help='Message arrived after TS.')
-    group.add_argument('-b', dest='before', metavar='TS', help='Message arrived before TS.')
-    parser.add_argument('-o', dest='outfile', metavar='OUTFILE',
-                        help='Output file. Use a dash "-" for standard output.')
-    parser.add_argument('infile', metavar='FILE', nargs='*', help='Input file. Use a dash "-" for standard input.')
-    group = parser.add_argument_group('Custom output (mutually exclusive)').add_mutually_exclusive_group()
-    group.add_argument('--id', '-i', dest='queue_id', action='store_true', help='ID output only.')
-    group.add_argument('--rcpt', dest='report_rcpt', action='store_true', help='Recipient address report.')
-    group.add_argument('--rdom', dest='report_rdom', action='store_true', help='Recipient domain report.')
-    group.add_argument('--reason', dest='report_reason', action='store_true', help='Delay reason report.')
-    group.add_argument('--sdom', dest='report_sdom', action='store_true', help='Sender domain report.')
-    group.add_argument('--sender', dest='report_sender', action='store_true', help='Sender address report.')
-    return parser.parse_args()
+            output.flush()
+    except OutputClosed:
+        log.debug('Output closed by reader, processing stopped')
+    finally:
+        if outfile is None:
+            close_file(file)
+    if action_runner is not None:
+        success &= action_runner.close()
+        print(action_runner.summary(), file=sys.stderr)
+    if run_stats is not None:
+        finish_stats(run_stats, perf_counter() - start)
+    return success
+
+
+def finish_stats(stats: Stats, wall: float) -> None:
+    """Complete the statistics of a run, pass them to all registered hooks and
+    write them if requested.
+
+    Args:
+        stats: Statistics of the run.
+        wall: Elapsed wall time in seconds.
+    """
+    stats.wall = wall
+    stats.cardinality = {name: len(counter) for name, counter in reports.items()}
+    for hook in stats_hooks:
+        hook(stats)
+    if cf.stats:
+        stats.write(cf.stats)
 
 
 def main() -> None:  # pragma: no cover
-    """Execution starts here."""
-    cf.refresh(parse_args())
-    process_files()
+    """Execution starts here, see postqf.cli.main()."""
+    cli_main()
@@ -0,0 +1,219 @@
+# Copyright © 2022 Ralph Seichter
+#
+# This file is part of PostQF.
+#
+# PostQF is free software: you can redistribute it and/or modify it under the terms of the GNU
+# General Public License as published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# PostQF is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without
+# even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with PostQF.
+# If not, see <https://www.gnu.org/licenses/>.
+import json
+import os
+import signal
+import socketserver
+import sys
+import threading
+import time
+from argparse import ArgumentParser
+from argparse import Namespace
+from io import BytesIO
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+from postqf import PROGRAM
+from postqf.cli import parse_args
+from postqf.client import encode_status
+from postqf.config import DEFAULT_POSTQUEUE_CMD
+from postqf.config import cf
+from postqf.core import process_files
+from postqf.logstuff import log
+from postqf.source import CommandSource
+from postqf.source import FileSource
+from postqf.source import MemorySource
+
+# Seconds between snapshot refreshes, by default.
+DEFAULT_INTERVAL = 60
+
+
+class Snapshot:
+    """Queue data captured at a point in time, kept as raw JSON lines in a
+    single bytes object. Snapshots are never modified once created."""
+
+    def __init__(self, data: bytes, created: float) -> None:
+        self.data = data
+        self.created = created
+        self.records = data.count(b'\n') + (1 if data and not data.endswith(b'\n') else 0)
+
+    def source(self) -> MemorySource:
+        """Return an input source providing the snapshot data."""
+        return MemorySource(f'snapshot of {time.ctime(self.created)}', self.data)
+
+
+# Snapshot used to answer queries. It is replaced as a whole by refresh(), so
+# that queries in progress keep using the snapshot they started with.
+snapshot: Optional[Snapshot] = None
+
+
+def load_snapshot(path: Optional[str] = None, command: str = DEFAULT_POSTQUEUE_CMD) -> Snapshot:
+    """Read queue data into a new snapshot.
+
+    Args:
+        path: Input file name/path, None to run the command instead.
+        command: Command providing queue data, like "postqueue -j".
+    """
+    source = FileSource(path) if path else CommandSource(command)
+    created = time.time()
+    try:
+        data = b''.join(source.open())
+    finally:
+        success = source.close()
+    if not success:
+        raise OSError(f'Cannot read queue data from "{source}"')
+    return Snapshot(data, created)
+
+
+def refresh(path: Optional[str] = None, command: str = DEFAULT_POSTQUEUE_CMD) -> bool:
+    """Replace the current snapshot with fresh queue data. If reading fails, the
+    current snapshot is kept. Returns True to indicate success.
+
+    Args:
+        path: Input file name/path, None to run the command instead.
+        command: Command providing queue data, like "postqueue -j".
+    """
+    global snapshot
+    try:
+        snapshot = load_snapshot(path, command)
+    except Exception as e:
+        log.error(f'Cannot refresh snapshot: {e}')
+        return False
+    log.info(f'Snapshot refreshed, {snapshot.records} records')
+    return True
+
+
+class Refresher(threading.Thread):
+    """Background thread refreshing the snapshot periodically, or immediately
+    when triggered."""
+
+    def __init__(self, interval: float, path: Optional[str], command: str) -> None:
+        super().__init__(name='refresher', daemon=True)
+        self.interval = interval
+        self.path = path
+        self.command = command
+        self.wakeup = threading.Event()
+
+    def trigger(self) -> None:
+        """Refresh the snapshot as soon as possible."""
+        self.wakeup.set()
+
+    def run(self) -> None:
+        while True:
+            self.wakeup.wait(self.interval)
+            self.wakeup.clear()
+            refresh(self.path, self.command)
+
+
+def answer(argv: List[str], current: Optional[Snapshot]) -> Tuple[int, str, bytes]:
+    """Answer a query, using the same command line arguments as a regular run.
+    Returns the exit status, a message and the query output.
+
+    Args:
+        argv: Command line arguments.
+        current: Snapshot to query.
+    """
+    if current is None:
+        return 1, 'No snapshot available yet', b''
+    try:
+        ns = parse_args(argv)
+    except SystemExit:
+        return 2, 'Invalid arguments', b''
+    if ns.action:
+        return 2, 'Queue actions are not supported in queries', b''
+    # The daemon must not read or write files on behalf of its clients.
+    if ns.stats or ns.rcpt_file or ns.sender_file:
+        return 2, 'Statistics and address list files are not supported in queries', b''
+    cf.refresh(ns)
+    output = BytesIO()
+    if not process_files([current.source()], output):
+        return 1, 'Query failed', output.getvalue()
+    return 0, '', output.getvalue()
+
+
+class QueryHandler(socketserver.StreamRequestHandler):
+    """Handle a single query, see the postqf.client module for the protocol."""
+
+    def handle(self) -> None:
+        try:
+            argv = json.loads(self.rfile.readline())
+        except ValueError:
+            self.wfile.write(encode_status(2, 'Malformed request'))
+            return
+        status, message, output = answer(argv, snapshot)
+        self.wfile.write(encode_status(status, message))
+        self.wfile.write(output)
+
+
+class QueryServer(socketserver.UnixStreamServer):
+    """Answer queries on a Unix domain socket, one at a time, because queries
+    use the shared configuration object. Snapshot refreshes happen in the
+    background and never block queries."""
+
+    def server_close(self) -> None:
+        super().server_close()
+        try:
+            os.unlink(self.server_address)
+        except OSError:
+            pass
+
+
+def serve(socket_path: str, interval: float, path: Optional[str], command: str) -> bool:  # pragma: no cover
+    """Load a first snapshot and answer queries until terminated. SIGHUP
+    triggers an immediate refresh. Returns True to indicate success.
+
+    Args:
+        socket_path: Path of the Unix domain socket to create.
+        interval: Seconds between snapshot refreshes.
+        path: Input file name/path, None to run the command instead.
+        command: Command providing queue data, like "postqueue -j".
+    """
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+    refresh(path, command)
+    refresher = Refresher(interval, path, command)
+    refresher.start()
+    signal.signal(signal.SIGHUP, lambda *_: refresher.trigger())
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    with QueryServer(socket_path, QueryHandler) as server:
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+    return True
+
+
+def parse_daemon_args(argv: List[str]) -> Namespace:  # pragma: no cover
+    """Parse command line arguments of the daemon subcommand."""
+    parser = ArgumentParser(prog=f'{PROGRAM} daemon',
+                            description='Keep a queue snapshot in memory and answer queries on a Unix domain '
+                                        f'socket. Use "{PROGRAM} --socket SOCKET" with regular filter and report '
+                                        'options to query. Send SIGHUP to refresh the snapshot immediately.')
+    parser.add_argument('-i', '--interval', dest='interval', metavar='SECONDS', type=float,
+                        default=DEFAULT_INTERVAL,
+                        help=f'Seconds between snapshot refreshes (default: {DEFAULT_INTERVAL}).')
+    parser.add_argument('--postqueue-cmd', dest='postqueue_cmd', metavar='CMD', default=DEFAULT_POSTQUEUE_CMD,
+                        help=f'Command providing queue data (default: "{DEFAULT_POSTQUEUE_CMD}").')
+    parser.add_argument('socket', metavar='SOCKET', help='Unix domain socket path.')
+    parser.add_argument('infile', metavar='FILE', nargs='?',
+                        help='Read queue data from a file instead of running the command.')
+    return parser.parse_args(argv)
+
+
+def daemon_command(argv: List[str]) -> bool:  # pragma: no cover
+    """Execute the daemon subcommand. Returns True to indicate success."""
+    ns = parse_daemon_args(argv)
+    return serve(ns.socket, ns.interval, ns.infile, ns.postqueue_cmd)
@@ -0,0 +1,89 @@
+# Copyright © 2022 Ralph Seichter
+#
+# This file is part of PostQF.
+#
+# PostQF is free software: you can redistribute it and/or modify it under the terms of the GNU
+# General Public License as published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# PostQF is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without
+# even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with PostQF.
+# If not, see <https://www.gnu.org/licenses/>.
+from array import array
+from typing import Hashable
+
+# Initial number of slots, must be a power of two.
+INITIAL_CAPACITY = 1 << 16
+# Maximum ratio of used slots, as numerator and denominator.
+LOAD_NUM = 3
+LOAD_DEN = 4
+FINGERPRINT_MASK = (1 << 64) - 1
+
+
+def fingerprint(key: Hashable) -> int:
+    """Return a non-zero 64-bit fingerprint of a key. Fingerprints are only
+    stable within a single process, because string hashing is randomised."""
+    return hash(key) & FINGERPRINT_MASK or 1
+
+
+class FingerprintSet:
+    """Set of keys, storing only 64-bit fingerprints in an open addressing hash
+    table backed by an array. Each key requires between 10.7 and 21.3 bytes,
+    a fraction of the memory used by a set of strings. Fingerprint collisions
+    are possible, but unlikely: for 100 million keys, the probability of any
+    collision is about 0.03%."""
+
+    def __init__(self, capacity: int = INITIAL_CAPACITY) -> None:
+        self.table = array('Q', bytes(8 * capacity))
+        self.mask = capacity - 1
+        self.size = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __contains__(self, key: Hashable) -> bool:
+        fp = fingerprint(key)
+        table = self.table
+        i = fp & self.mask
+        while table[i]:
+            if table[i] == fp:
+                return True
+            i = (i + 1) & self.mask
+        return False
+
+    def add(self, key: Hashable) -> bool:
+        """Add a key. Returns True if the key was not yet present."""
+        if self.insert(fingerprint(key)):
+            if self.size * LOAD_DEN > len(self.table) * LOAD_NUM:
+                self.grow()
+            return True
+        return False
+
+    def insert(self, fp: int) -> bool:
+        """Insert a fingerprint using linear probing. Returns True if the
+        fingerprint was not yet present."""
+        table = self.table
+        mask = self.mask
+        i = fp & mask
+        while True:
+            slot = table[i]
+            if not slot:
+                table[i] = fp
+                self.size += 1
+                return True
+            if slot == fp:
+                return False
+            i = (i + 1) & mask
+
+    def grow(self) -> None:
+        """Double the number of slots and insert all fingerprints again."""
+        old = self.table
+        self.table = array('Q', bytes(16 * len(old)))
+        self.mask = len(self.table) - 1
+        self.size = 0
+        for fp in old:
+            if fp:
+                self.insert(fp)
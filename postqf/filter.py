@@ -12,12 +12,31 @@
 #
 # You should have received a copy of the GNU General Public License along with PostQF.
 # If not, see <https://www.gnu.org/licenses/>.
-from datetime import datetime
+import re
+from typing import Callable
+from typing import Dict
 from typing import List
+from typing import Optional
 from typing import Pattern
+from typing import Tuple
 
+from postqf.addrlist import AddressList
+from postqf.config import Config
+from postqf.config import Interval
 from postqf.config import cf
+from postqf.dedupe import FingerprintSet
+from postqf.logstuff import DEBUG
 from postqf.logstuff import log
+from postqf.reason import normalize_reason
+
+# Characters which JSON encoders emit verbatim. Only these are used for raw line
+# prefiltering, because other characters might appear in escaped form.
+LITERAL_CHARS = frozenset(chr(i) for i in range(32, 127)) - frozenset('"/\\')
+# Non-ASCII characters which case-insensitively match ASCII letters.
+FOLDED_CHARS = {'i': '\u0130\u0131', 'k': '\u212a', 's': '\u017f'}
+QUANTIFIER_RE = re.compile(r'\{\d*(,\d*)?\}')
+Check = Callable[[dict], bool]
+QUEUE_NAME_RE = re.compile(rb'"queue_name"\s*:\s*"([^"\\]*)"')
 
 
 def str_match(regex: Pattern, candidate: str) -> bool:
@@ -29,7 +48,7 @@ def str_match(regex: Pattern, candidate: str) -> bool:
     """
     if candidate and regex.search(candidate):
         return True
-    log.debug(f'"{candidate}" does not match "{regex.pattern}"')
+    log.debug('"%s" does not match "%s"', candidate, regex.pattern)
     return False
 
 
@@ -42,25 +61,29 @@ def rcpt_match(recipients: List[dict]) -> bool:
     for recipient in recipients:
         if cf.rcpt_re.search(recipient['address']):
             return True
-    log.debug(f'No match for {cf.rcpt_re.pattern}')
+    log.debug('No match for %s', cf.rcpt_re.pattern)
     return False
 
 
 def reason_match(recipients: List[dict]) -> bool:
     """Return True if one of the delay reasons matches, or if there is no delay
     reason available for any recipient and no reason filter has been specified.
+    Delay reasons are normalized first if configured.
 
     Args:
         recipients: List of Postfix recipient data.
     """
     for recipient in recipients:
         if 'delay_reason' in recipient:
-            if cf.reason_re.search(recipient['delay_reason']):
+            reason = recipient['delay_reason']
+            if cf.normalize_reasons:
+                reason = normalize_reason(reason)
+            if cf.reason_re.search(reason):
                 return True
         elif cf.reason_re.pattern == '.':
             # Queue data contains no delay reason and no reason filter was specified.
             return True
-    log.debug(f'No match for {cf.reason_re.pattern}')
+    log.debug('No match for %s', cf.reason_re.pattern)
     return False
 
 
@@ -70,5 +93,357 @@ def arrival_match(epoch_time: int) -> bool:
     Args:
         epoch_time: Message arrival time in seconds since the Unix epoch.
     """
-    arrived = datetime.fromtimestamp(epoch_time)
-    return cf.interval.includes(arrived)
+    return cf.interval.includes_epoch(epoch_time)
+
+
+def class_end(pattern: str, start: int) -> int:
+    """Return the index following a character class, or -1 if the class is not
+    terminated.
+
+    Args:
+        pattern: Regular expression.
+        start: Index following the opening bracket.
+    """
+    i = start
+    if pattern.startswith('^', i):
+        i += 1
+    if pattern.startswith(']', i):
+        i += 1
+    while i < len(pattern):
+        if pattern[i] == '\\':
+            i += 2
+        elif pattern[i] == ']':
+            return i + 1
+        else:
+            i += 1
+    return -1
+
+
+def required_literal(pattern: str) -> str:
+    """Return the longest literal substring which every match of a regular
+    expression must contain. The analysis is conservative, and an empty string
+    is returned for patterns containing groups or alternatives.
+
+    Args:
+        pattern: Regular expression.
+    """
+    if '|' in pattern or '(' in pattern or ')' in pattern:
+        return ''
+    runs = ['']
+    i = 0
+    while i < len(pattern):
+        c = pattern[i]
+        i += 1
+        if c == '\\':
+            if i == len(pattern):
+                break
+            c = pattern[i]
+            i += 1
+            if c.isalnum():
+                if c not in 'bBdDsSwWAZ':
+                    # Character codes and group references are not analysed.
+                    break
+                c = ''
+        elif c in '*?{':
+            if c == '{':
+                match = QUANTIFIER_RE.match(pattern, i - 1)
+                if not match:
+                    break
+                i = match.end()
+            # The quantified character is optional.
+            runs[-1] = runs[-1][:-1]
+            c = ''
+        elif c == '[':
+            i = class_end(pattern, i)
+            if i < 0:
+                break
+            c = ''
+        elif c in '.^$+':
+            c = ''
+        if c in LITERAL_CHARS:
+            runs[-1] += c
+        elif runs[-1]:
+            runs.append('')
+    return max(runs, key=len)
+
+
+def literal_re(literal: str) -> Pattern:
+    """Compile a literal string into a case-insensitive bytes regex which
+    matches raw UTF-8 input the same way the IGNORECASE str regex would.
+
+    Args:
+        literal: String consisting of LITERAL_CHARS.
+    """
+    parts = []
+    for c in literal:
+        b = re.escape(c).encode()
+        folded = FOLDED_CHARS.get(c.lower())
+        if folded:
+            b = b'(?:' + b'|'.join([b] + [f.encode() for f in folded]) + b')'
+        parts.append(b)
+    return re.compile(b''.join(parts), re.IGNORECASE)
+
+
+def compile_prefilter(config: Config,
+                      rejected: Optional[Dict[str, int]] = None) -> Optional[Callable[[bytes], bool]]:
+    """Create a function which cheaply checks raw input lines before they are
+    decoded. The function returns False only for lines which cannot match the
+    configured filters. Returns None if there is nothing to check.
+
+    Args:
+        config: Configuration providing the regular expression filters.
+        rejected: If specified, count rejected lines by the name of the filter
+        whose check failed first in this dictionary.
+    """
+    qname_re = config.qname_re if config.qname_re.pattern != '.' else None
+    literals = []
+    regexes = [('sender', config.sender_re), ('rcpt', config.rcpt_re)]
+    if not config.normalize_reasons:
+        # Normalized delay reasons contain placeholders missing from raw input.
+        regexes.append(('reason', config.reason_re))
+    for name, regex in regexes:
+        literal = required_literal(regex.pattern)
+        if len(literal) > 1:
+            literals.append((name, literal_re(literal).search))
+    if not (qname_re or literals):
+        return None
+    if rejected is not None:
+        for name in (['qname'] if qname_re else []) + [name for name, _ in literals]:
+            rejected.setdefault(name, 0)
+
+    def prefilter(line: bytes) -> bool:
+        if b'\\u' in line:
+            # Unicode escape sequences could hide literals.
+            return True
+        if qname_re:
+            match = QUEUE_NAME_RE.search(line)
+            if match and not str_match(qname_re, match.group(1).decode('utf-8', 'replace')):
+                if rejected is not None:
+                    rejected['qname'] += 1
+                return False
+        for name, search in literals:
+            if not search(line):
+                if rejected is not None:
+                    rejected[name] += 1
+                return False
+        return True
+
+    return prefilter
+
+
+def qname_check(regex: Pattern) -> Check:
+    """Return a check for the queue name, which also serves as a sanity check
+    because valid queue data must contain this attribute.
+
+    Args:
+        regex: Queue name filter, or None if inactive.
+    """
+    search = regex.search if regex else None
+
+    def check(qdata: dict) -> bool:
+        name = qdata.get('queue_name')
+        if name is None:
+            log.error('Malformed input data: element "queue_name" is missing')
+            return False
+        return search is None or search(name) is not None
+
+    return check
+
+
+def sender_check(regex: Pattern) -> Check:
+    """Return a check for the sender address.
+
+    Args:
+        regex: Sender address filter.
+    """
+    search = regex.search
+    return lambda qdata: search(qdata['sender']) is not None
+
+
+def rcpt_check(regex: Pattern) -> Check:
+    """Return a check which succeeds if one of the recipient addresses matches.
+
+    Args:
+        regex: Recipient address filter.
+    """
+    search = regex.search
+
+    def check(qdata: dict) -> bool:
+        for recipient in qdata['recipients']:
+            if search(recipient['address']):
+                return True
+        return False
+
+    return check
+
+
+def sender_list_check(addresses: AddressList) -> Check:
+    """Return a check which succeeds if the sender address is listed.
+
+    Args:
+        addresses: Sender address list.
+    """
+    match = addresses.match
+    return lambda qdata: match(qdata['sender'])
+
+
+def rcpt_list_check(addresses: AddressList) -> Check:
+    """Return a check which succeeds if one of the recipient addresses is listed.
+
+    Args:
+        addresses: Recipient address list.
+    """
+    match = addresses.match
+
+    def check(qdata: dict) -> bool:
+        for recipient in qdata['recipients']:
+            if match(recipient['address']):
+                return True
+        return False
+
+    return check
+
+
+def reason_check(regex: Pattern, normalize: bool = False) -> Check:
+    """Return a check which succeeds if one of the delay reasons matches.
+
+    Args:
+        regex: Delay reason filter.
+        normalize: Match normalized delay reasons, see normalize_reason().
+    """
+    search = regex.search
+
+    def check(qdata: dict) -> bool:
+        for recipient in qdata['recipients']:
+            reason = recipient.get('delay_reason')
+            if reason is not None and search(normalize_reason(reason) if normalize else reason):
+                return True
+        return False
+
+    return check
+
+
+def arrival_check(interval: Interval) -> Check:
+    """Return a check for the message arrival time, comparing epoch seconds.
+
+    Args:
+        interval: Arrival time interval with at least one boundary.
+    """
+    after = interval.after_epoch
+    before = interval.before_epoch
+    if before is None:
+        return lambda qdata: qdata['arrival_time'] > after
+    if after is None:
+        return lambda qdata: qdata['arrival_time'] < before
+    return lambda qdata: after < qdata['arrival_time'] < before
+
+
+def unique_check(seen: FingerprintSet) -> Check:
+    """Return a check which accepts only the first record for each queue ID.
+    Records without a queue ID are always accepted.
+
+    Args:
+        seen: Queue IDs of previously accepted records, updated in place.
+    """
+    add = seen.add
+
+    def check(qdata: dict) -> bool:
+        queue_id = qdata.get('queue_id')
+        return queue_id is None or add(queue_id)
+
+    return check
+
+
+def logged_check(name: str, check: Check) -> Check:
+    """Wrap a check to log rejected records.
+
+    Args:
+        name: Filter name.
+        check: Check to wrap.
+    """
+
+    def logged(qdata: dict) -> bool:
+        if check(qdata):
+            return True
+        log.debug('%s filter rejected queue ID %s', name, qdata.get('queue_id'))
+        return False
+
+    return logged
+
+
+def counted_check(name: str, check: Check, rejected: Dict[str, int]) -> Check:
+    """Wrap a check to count rejected records.
+
+    Args:
+        name: Filter name.
+        check: Check to wrap.
+        rejected: Rejected record counts by filter name, updated in place.
+    """
+    rejected.setdefault(name, 0)
+
+    def counted(qdata: dict) -> bool:
+        if check(qdata):
+            return True
+        rejected[name] += 1
+        return False
+
+    return counted
+
+
+def is_active(regex: Optional[Pattern]) -> bool:
+    """Return True if a regular expression filter is not the Config.re_compile() default."""
+    return regex is not None and regex.pattern != '.'
+
+
+def filter_checks(config: Config, seen: Optional[FingerprintSet] = None) -> List[Tuple[str, Check]]:
+    """Return named checks for all active filters, cheapest first. The check for
+    unique queue IDs comes last, so that only matching records are recorded.
+
+    Args:
+        config: Configuration providing the filters.
+        seen: If specified, reject records whose queue ID is contained in this set.
+    """
+    checks = [('qname', qname_check(config.qname_re if is_active(config.qname_re) else None))]
+    if config.interval and config.interval.active:
+        checks.append(('arrival', arrival_check(config.interval)))
+    if is_active(config.sender_re):
+        checks.append(('sender', sender_check(config.sender_re)))
+    if config.sender_list is not None:
+        checks.append(('sender_file', sender_list_check(config.sender_list)))
+    if is_active(config.rcpt_re):
+        checks.append(('rcpt', rcpt_check(config.rcpt_re)))
+    if config.rcpt_list is not None:
+        checks.append(('rcpt_file', rcpt_list_check(config.rcpt_list)))
+    if is_active(config.reason_re):
+        checks.append(('reason', reason_check(config.reason_re, config.normalize_reasons)))
+    if seen is not None:
+        checks.append(('unique', unique_check(seen)))
+    return checks
+
+
+def compile_filter(config: Config, rejected: Optional[Dict[str, int]] = None,
+                   seen: Optional[FingerprintSet] = None) -> Check:
+    """Compile the configured filters into a single predicate. Inactive filters
+    are omitted, and rejected records are only logged if DEBUG level is enabled.
+
+    Args:
+        config: Configuration providing the filters.
+        rejected: If specified, count rejected records by filter name in this dictionary.
+        seen: If specified, reject records whose queue ID is contained in this set.
+    """
+    checks = filter_checks(config, seen)
+    if log.isEnabledFor(DEBUG):
+        checks = [(name, logged_check(name, check)) for name, check in checks]
+    if rejected is not None:
+        checks = [(name, counted_check(name, check, rejected)) for name, check in checks]
+    checks = tuple(check for _, check in checks)
+    if len(checks) == 1:
+        return checks[0]
+
+    def match(qdata: dict) -> bool:
+        for check in checks:
+            if not check(qdata):
+                return False
+        return True
+
+    return match
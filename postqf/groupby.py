@@ -0,0 +1,133 @@
+# Copyright © 2022 Ralph Seichter
+#
+# This file is part of PostQF.
+#
+# PostQF is free software: you can redistribute it and/or modify it under the terms of the GNU
+# General Public License as published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# PostQF is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without
+# even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with PostQF.
+# If not, see <https://www.gnu.org/licenses/>.
+import sys
+from functools import lru_cache
+from typing import Callable
+from typing import Optional
+from typing import Tuple
+
+from postqf.reason import normalize_reason
+from postqf.sample import estimate
+from postqf.topn import SpaceSaving
+
+
+def domain(address: str) -> str:
+    """Return the lower case domain part of an email address, or an empty
+    string if there is none."""
+    return address.rpartition('@')[2].lower() if '@' in address else ''
+
+
+# Fields which can be grouped by, extracting a value from message data.
+MESSAGE_FIELDS = {
+    'queue': lambda qdata: qdata['queue_name'],
+    'sdom': lambda qdata: domain(qdata['sender']),
+    'sender': lambda qdata: qdata['sender'].lower(),
+}
+# Fields which can be grouped by, extracting a value from recipient data.
+RCPT_FIELDS = {
+    'rcpt': lambda r: r['address'].lower(),
+    'rdom': lambda r: domain(r['address']),
+    'reason': lambda r: r.get('delay_reason', ''),
+}
+FIELDS = tuple(sorted(list(MESSAGE_FIELDS) + list(RCPT_FIELDS)))
+
+
+def parse_fields(string: str) -> Tuple[str, ...]:
+    """Convert a comma-separated list of field names into a tuple.
+
+    Args:
+        string: Field names like "queue,rdom,reason".
+    """
+    fields = tuple(f.strip().lower() for f in string.split(','))
+    for field in fields:
+        if field not in FIELDS:
+            raise ValueError(f'Unknown field "{field}", valid fields are {", ".join(FIELDS)}')
+    return fields
+
+
+@lru_cache(maxsize=None)
+def compile_group_by(fields: Tuple[str, ...], normalize: bool = False) -> Callable[[dict, object], None]:
+    """Create a function which counts the group key tuple of a message. If one
+    of the fields refers to recipient data, a key is counted for each
+    recipient. Key values are interned, because they repeat across many keys.
+
+    Args:
+        fields: Field names, see FIELDS.
+        normalize: Use normalized delay reasons, see normalize_reason().
+    """
+    intern = sys.intern
+    getters = []
+    for field in fields:
+        if field in MESSAGE_FIELDS:
+            getters.append((False, MESSAGE_FIELDS[field]))
+        elif field == 'reason' and normalize:
+            getters.append((True, lambda r: normalize_reason(r.get('delay_reason', ''))))
+        else:
+            getters.append((True, RCPT_FIELDS[field]))
+    per_rcpt = any(rcpt for rcpt, _ in getters)
+
+    def key(qdata: dict, recipient: dict) -> tuple:
+        return tuple(intern(get(recipient if rcpt else qdata) or '') for rcpt, get in getters)
+
+    def count(qdata: dict, counter) -> None:
+        if per_rcpt:
+            for recipient in qdata['recipients']:
+                counter.add(key(qdata, recipient))
+        else:
+            counter.add(key(qdata, None))
+
+    return count
+
+
+def count_group(qdata: dict, fields: Tuple[str, ...], counter, normalize: bool = False) -> None:
+    """Count the group key tuples of a message.
+
+    Args:
+        qdata: Postfix queue data.
+        fields: Field names, see FIELDS.
+        counter: ExactCounter or SpaceSaving object.
+        normalize: Use normalized delay reasons, see normalize_reason().
+    """
+    compile_group_by(fields, normalize)(qdata, counter)
+
+
+def generate_group_report(data, top: int, outfile, rate: float = 1.0, squares: Optional[dict] = None) -> None:
+    """Write a group report to the given output file, with the most frequent
+    keys last. Each line contains the count, followed by the estimation error
+    in top N mode, the margin of the 95% confidence interval if records were
+    sampled, and the field values, all separated by tabs.
+
+    Args:
+        data: ExactCounter or SpaceSaving object.
+        top: Maximum number of keys to report if data is a SpaceSaving object.
+        outfile: Output file handle.
+        rate: Fraction of records sampled.
+        squares: Sums of squared per-record counts by key if records were sampled, see SquareSums.
+    """
+    if isinstance(data, SpaceSaving):
+        rows = data.top(top)
+        rows.reverse()
+        for key, count, error in rows:
+            if rate < 1:
+                count, margin = estimate(count, rate, squares.get(key) if squares else None)
+                print(count, round(error / rate), margin, *key, sep='\t', file=outfile)
+            else:
+                print(count, error, *key, sep='\t', file=outfile)
+    else:
+        for key, count in sorted(data.items(), key=lambda item: item[1]):
+            if rate < 1:
+                print(*estimate(count, rate, squares.get(key) if squares else None), *key, sep='\t', file=outfile)
+            else:
+                print(count, *key, sep='\t', file=outfile)
@@ -0,0 +1,88 @@
+# Copyright © 2022 Ralph Seichter
+#
+# This file is part of PostQF.
+#
+# PostQF is free software: you can redistribute it and/or modify it under the terms of the GNU
+# General Public License as published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# PostQF is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without
+# even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with PostQF.
+# If not, see <https://www.gnu.org/licenses/>.
+from datetime import datetime
+from datetime import timezone
+from typing import Optional
+
+from postqf.reason import normalize_reason
+from postqf.sample import estimate
+
+# Attributes which histogram counts can be grouped by.
+GROUPS = ('queue', 'reason')
+
+
+def bucket_start(epoch_time: int, width: int) -> int:
+    """Return the start of the bucket containing an epoch time. Buckets are
+    aligned to multiples of their width, counted from the Unix epoch (UTC).
+
+    Args:
+        epoch_time: Time in seconds since the Unix epoch.
+        width: Bucket width in seconds.
+    """
+    return epoch_time - epoch_time % width
+
+
+def count_arrival(qdata: dict, width: int, group: Optional[str], counter, normalize: bool = False) -> None:
+    """Count a message in the bucket of its arrival time. If a group is
+    specified, buckets are split by queue name, or by delay reason. A message
+    with several distinct delay reasons is counted once per reason.
+
+    Args:
+        qdata: Postfix queue data.
+        width: Bucket width in seconds.
+        group: One of GROUPS, or None.
+        counter: ExactCounter or compatible object.
+        normalize: Group by normalized delay reasons, see normalize_reason().
+    """
+    arrival = qdata.get('arrival_time')
+    if arrival is None:
+        return
+    bucket = bucket_start(arrival, width)
+    if group is None:
+        counter.add(bucket)
+    elif group == 'queue':
+        counter.add((bucket, qdata['queue_name']))
+    else:
+        reasons = {r['delay_reason'] for r in qdata['recipients'] if 'delay_reason' in r}
+        if normalize:
+            reasons = {normalize_reason(r) for r in reasons}
+        for reason in reasons:
+            counter.add((bucket, reason))
+
+
+def format_bucket(bucket: int) -> str:
+    """Return the start of a bucket as an ISO 8601 UTC time string."""
+    return datetime.fromtimestamp(bucket, timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def generate_histogram(data: dict, outfile, rate: float = 1.0, squares: Optional[dict] = None) -> None:
+    """Write histogram data to the given output file, ordered by time. Each
+    line contains the bucket start time, the count, the margin of the 95%
+    confidence interval if records were sampled, and the group (if any), so
+    that the output can be passed to plotting tools directly. Buckets without
+    matching messages are omitted.
+
+    Args:
+        data: Counts by bucket start time, or by (bucket start time, group) tuple.
+        outfile: Output file handle.
+        rate: Fraction of records sampled.
+        squares: Sums of squared per-record counts by key if records were sampled, see SquareSums.
+    """
+    for key in sorted(data):
+        counts = estimate(data[key], rate, squares.get(key) if squares else None) if rate < 1 else (data[key],)
+        if isinstance(key, tuple):
+            print(format_bucket(key[0]), *counts, key[1], file=outfile)
+        else:
+            print(format_bucket(key), *counts, file=outfile)
@@ -0,0 +1,231 @@
+# Copyright © 2022 Ralph Seichter
+#
+# This file is part of PostQF.
+#
+# PostQF is free software: you can redistribute it and/or modify it under the terms of the GNU
+# General Public License as published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# PostQF is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without
+# even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with PostQF.
+# If not, see <https://www.gnu.org/licenses/>.
+import json
+import os
+import sqlite3
+from argparse import ArgumentParser
+from argparse import Namespace
+from typing import Iterator
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+from postqf import PROGRAM
+from postqf.config import Config
+from postqf.filter import is_active
+from postqf.logstuff import log
+from postqf.reason import normalize_reason
+
+# Number of records inserted per batch while indexing.
+BATCH_SIZE = 10000
+# Version of the database layout. Databases with another version are rebuilt,
+# which only discards the index, not any queue data.
+SCHEMA_VERSION = 1
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS records (
+    file_id INTEGER NOT NULL,
+    offset INTEGER NOT NULL,
+    length INTEGER NOT NULL,
+    queue_id TEXT,
+    queue_name TEXT,
+    sender TEXT,
+    arrival_time INTEGER,
+    PRIMARY KEY (file_id, offset)
+);
+CREATE TABLE IF NOT EXISTS recipients (
+    file_id INTEGER NOT NULL,
+    offset INTEGER NOT NULL,
+    address TEXT,
+    reason TEXT
+);
+CREATE INDEX IF NOT EXISTS records_arrival ON records (file_id, arrival_time);
+CREATE INDEX IF NOT EXISTS records_queue_id ON records (queue_id);
+CREATE INDEX IF NOT EXISTS recipients_record ON recipients (file_id, offset);
+'''
+
+
+class Index:
+    """SQLite index over queue data snapshot files. Each indexed record is
+    referenced by the byte offset and length of its line in the snapshot file."""
+
+    def __init__(self, path: str) -> None:
+        self.conn = sqlite3.connect(path)
+        if self.conn.execute('PRAGMA user_version').fetchone()[0] != SCHEMA_VERSION:
+            self.conn.executescript('DROP TABLE IF EXISTS recipients; DROP TABLE IF EXISTS records; '
+                                    f'DROP TABLE IF EXISTS files; PRAGMA user_version = {SCHEMA_VERSION};')
+        self.conn.executescript(SCHEMA)
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def file_id(self, path: str) -> Optional[int]:
+        """Return the ID of an indexed file, or None if the index for the file
+        is missing or outdated, based on its size and modification time."""
+        st = os.stat(path)
+        row = self.conn.execute('SELECT id, size, mtime_ns FROM files WHERE path = ?',
+                                (os.path.abspath(path),)).fetchone()
+        if row and (row[1], row[2]) == (st.st_size, st.st_mtime_ns):
+            return row[0]
+        return None
+
+    def update(self, path: str) -> Tuple[int, int]:
+        """Index a file unless its index is up to date.
+
+        Returns the file ID and the number of records indexed, which is -1 if
+        the file was up to date. Exceptions (e.g. invalid JSON data) are passed
+        on, leaving the file unindexed.
+
+        Args:
+            path: File name/path.
+        """
+        file_id = self.file_id(path)
+        if file_id is not None:
+            return file_id, -1
+        path = os.path.abspath(path)
+        st = os.stat(path)
+        count = 0
+        with self.conn:
+            self.remove(path)
+            file_id = self.conn.execute('INSERT INTO files (path, size, mtime_ns) VALUES (?, ?, ?)',
+                                        (path, st.st_size, st.st_mtime_ns)).lastrowid
+            records = []
+            recipients = []
+            offset = 0
+            with open(path, 'rb') as file:
+                for line in file:
+                    qdata = json.loads(line)
+                    records.append((file_id, offset, len(line), qdata.get('queue_id'), qdata.get('queue_name'),
+                                    qdata.get('sender'), qdata.get('arrival_time')))
+                    for r in qdata.get('recipients', []):
+                        recipients.append((file_id, offset, r.get('address'), r.get('delay_reason')))
+                    offset += len(line)
+                    if len(records) >= BATCH_SIZE:
+                        count += self.insert(records, recipients)
+                count += self.insert(records, recipients)
+        return file_id, count
+
+    def insert(self, records: list, recipients: list) -> int:
+        """Insert and clear batches of record and recipient rows. Returns the
+        number of records inserted."""
+        count = len(records)
+        self.conn.executemany('INSERT INTO records VALUES (?, ?, ?, ?, ?, ?, ?)', records)
+        self.conn.executemany('INSERT INTO recipients VALUES (?, ?, ?, ?)', recipients)
+        records.clear()
+        recipients.clear()
+        return count
+
+    def remove(self, path: str) -> None:
+        """Remove a file from the index."""
+        row = self.conn.execute('SELECT id FROM files WHERE path = ?', (path,)).fetchone()
+        if row:
+            for table in ['recipients', 'records']:
+                self.conn.execute(f'DELETE FROM {table} WHERE file_id = ?', row)
+            self.conn.execute('DELETE FROM files WHERE id = ?', row)
+
+    def offsets(self, file_id: int, config: Config) -> List[Tuple[int, int]]:
+        """Return offsets and lengths of all lines in an indexed file which can
+        match the configured filters, in file order. Delay reasons are
+        normalized before matching if --normalize-reasons is set.
+
+        Args:
+            file_id: ID of an indexed file.
+            config: Configuration providing the filters.
+        """
+        patterns = {
+            'qname': config.qname_re,
+            'sender': config.sender_re,
+            'rcpt': config.rcpt_re,
+            'reason': config.reason_re,
+        }
+        normalize = config.normalize_reasons
+
+        def search(name: str, value: Optional[str]) -> bool:
+            if value is None:
+                return False
+            if normalize and name == 'reason':
+                value = normalize_reason(value)
+            return bool(patterns[name].search(value))
+
+        self.conn.create_function('postqf_search', 2, search)
+        sql = 'SELECT offset, length FROM records r WHERE file_id = ?'
+        params = [file_id]
+        interval = config.interval
+        if interval and interval.after_epoch is not None:
+            sql += ' AND arrival_time > ?'
+            params.append(interval.after_epoch)
+        if interval and interval.before_epoch is not None:
+            sql += ' AND arrival_time < ?'
+            params.append(interval.before_epoch)
+        if is_active(config.qname_re):
+            sql += " AND postqf_search('qname', queue_name)"
+        if is_active(config.sender_re):
+            sql += " AND postqf_search('sender', sender)"
+        for name, column in [('rcpt', 'address'), ('reason', 'reason')]:
+            if is_active(patterns[name]):
+                sql += (' AND EXISTS (SELECT 1 FROM recipients x WHERE x.file_id = r.file_id'
+                        f" AND x.offset = r.offset AND postqf_search('{name}', x.{column}))")
+        return self.conn.execute(sql + ' ORDER BY offset', params).fetchall()
+
+
+def read_lines(path: str, offsets: List[Tuple[int, int]]) -> Iterator[bytes]:
+    """Yield lines from a file, given their byte offsets and lengths."""
+    with open(path, 'rb') as file:
+        for offset, length in offsets:
+            file.seek(offset)
+            yield file.read(length)
+
+
+def parse_args(argv: List[str]) -> Namespace:  # pragma: no cover
+    """Parse command line arguments of the index subcommand."""
+    parser = ArgumentParser(prog=f'{PROGRAM} index', description='Create or update an index of snapshot files.')
+    parser.add_argument('-x', '--index', dest='index', metavar='DB', required=True, help='Index database file.')
+    parser.add_argument('infile', metavar='FILE', nargs='+', help='Snapshot file.')
+    return parser.parse_args(argv)
+
+
+def index_command(argv: List[str]) -> bool:  # pragma: no cover
+    """Execute the index subcommand. Returns True to indicate success."""
+    ns = parse_args(argv)
+    return update_files(ns.index, ns.infile)
+
+
+def update_files(db: str, paths: List[str]) -> bool:
+    """Create or update the index for the given files, printing one line per
+    indexed file. Returns True to indicate success, False in case of exceptions.
+
+    Args:
+        db: Index database file.
+        paths: Snapshot files.
+    """
+    success = True
+    index = Index(db)
+    try:
+        for path in paths:
+            try:
+                _, count = index.update(path)
+                if count >= 0:
+                    print(f'{path}: {count} records')
+            except Exception as e:
+                log.error(f'Cannot index {path}: {e}')
+                success = False
+    finally:
+        index.close()
+    return success
@@ -0,0 +1,174 @@
+# Copyright © 2022 Ralph Seichter
+#
+# This file is part of PostQF.
+#
+# PostQF is free software: you can redistribute it and/or modify it under the terms of the GNU
+# General Public License as published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# PostQF is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without
+# even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with PostQF.
+# If not, see <https://www.gnu.org/licenses/>.
+import asyncio
+import os
+import stat
+import sys
+from itertools import islice
+from typing import Callable
+from typing import List
+
+from postqf.logstuff import log
+from postqf.source import BUFFER_SIZE
+from postqf.source import FileSource
+
+# Maximum number of lines read from a regular file at once.
+BATCH_LINES = 1000
+# Handler for lines read from an input, given the input name. Returns False to
+# indicate failure.
+Handler = Callable[[str, List[bytes]], bool]
+
+
+def is_pipe(path: str) -> bool:
+    """Return True if the path designates a named pipe, or if the path is "-"
+    and stdin is a pipe or a socket. These inputs can be read without blocking."""
+    try:
+        if path == '-':
+            mode = os.fstat(sys.stdin.fileno()).st_mode
+            return stat.S_ISFIFO(mode) or stat.S_ISSOCK(mode)
+        return stat.S_ISFIFO(os.stat(path).st_mode)
+    except (OSError, ValueError):
+        return False
+
+
+def release_fifo(path: str, future: asyncio.Future) -> None:
+    """Unblock a pending open() call for reading a named pipe by briefly opening
+    the pipe for writing. Opening fails unless the call has already reached the
+    point of blocking, so this is repeated until the call has returned.
+
+    Args:
+        path: Named pipe path.
+        future: Result of the open() call.
+    """
+    if future.done():
+        return
+    try:
+        if stat.S_ISFIFO(os.stat(path).st_mode):
+            os.close(os.open(path, os.O_WRONLY | os.O_NONBLOCK))
+    except OSError:
+        pass
+    future.get_loop().call_later(0.01, release_fifo, path, future)
+
+
+def close_opened(future: asyncio.Future) -> None:
+    """Close the file descriptor returned by an open() call whose caller has
+    stopped waiting for it."""
+    if not future.cancelled() and future.exception() is None:
+        os.close(future.result())
+
+
+async def ingest_file(path: str, handle: Handler, done: Callable[[], bool]) -> bool:
+    """Read a regular file, or another input which is not a pipe, in batches of
+    lines, using a worker thread.
+
+    Args:
+        path: File name/path or "-".
+        handle: Function called for each batch of lines.
+        done: Function returning True if reading should stop.
+    """
+    loop = asyncio.get_running_loop()
+    source = FileSource(path)
+    success = False
+    try:
+        lines = source.open()
+        success = True
+        while not done():
+            batch = await loop.run_in_executor(None, lambda: list(islice(lines, BATCH_LINES)))
+            if not batch or done():
+                break
+            success &= handle(path, batch)
+    finally:
+        success = source.close() and success
+    return success
+
+
+async def ingest_stream(path: str, handle: Handler, done: Callable[[], bool]) -> bool:
+    """Read a named pipe or a socket, or stdin if the path is "-", passing on
+    lines as soon as they arrive.
+
+    Args:
+        path: File name/path or "-".
+        handle: Function called for each batch of lines.
+        done: Function returning True if reading should stop.
+    """
+    loop = asyncio.get_running_loop()
+    if path == '-':
+        file = open(sys.stdin.fileno(), 'rb', buffering=0, closefd=False)
+    else:
+        # Opening a named pipe blocks until a writer has opened it as well.
+        future = loop.run_in_executor(None, os.open, path, os.O_RDONLY)
+        try:
+            fd = await asyncio.shield(future)
+        except asyncio.CancelledError:
+            future.add_done_callback(close_opened)
+            release_fifo(path, future)
+            raise
+        file = open(fd, 'rb', buffering=0)
+    reader = asyncio.StreamReader()
+    transport, _ = await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), file)
+    success = True
+    rest = b''
+    try:
+        while not done():
+            data = await reader.read(BUFFER_SIZE)
+            if not data or done():
+                break
+            data = rest + data
+            end = data.rfind(b'\n') + 1
+            rest = data[end:]
+            if end:
+                success &= handle(path, data[:end].splitlines(keepends=True))
+        if rest and not done():
+            success &= handle(path, [rest])
+    finally:
+        transport.close()
+    return success
+
+
+async def ingest_all(paths: List[str], handle: Handler, done: Callable[[], bool]) -> bool:
+    """Read all inputs concurrently. Once done() returns True, reading stops
+    for all inputs."""
+    tasks = set()
+    for path in paths:
+        ingest = ingest_stream if is_pipe(path) else ingest_file
+        tasks.add(asyncio.ensure_future(ingest(path, handle, done)))
+    success = True
+    while tasks:
+        finished, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in finished:
+            try:
+                success &= task.result()
+            except Exception as e:
+                log.error(f'Cannot read input: {e}')
+                success = False
+        if done():
+            for task in tasks:
+                task.cancel()
+            break
+    return success
+
+
+def ingest(paths: List[str], handle: Handler, done: Callable[[], bool]) -> bool:
+    """Read multiple inputs concurrently, so that a slow input like a named pipe
+    does not hold up the others. Lines are passed on in batches, in input order
+    for each input. Returns True to indicate success, False in case of errors.
+
+    Args:
+        paths: File names/paths, "-" for stdin.
+        handle: Function called with the input name and a batch of lines.
+        done: Function returning True if reading should stop, checked after
+        each batch.
+    """
+    return asyncio.run(ingest_all(paths, handle, done))
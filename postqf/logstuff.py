@@ -12,29 +12,51 @@
 #
 # You should have received a copy of the GNU General Public License along with PostQF.
 # If not, see <https://www.gnu.org/licenses/>.
-import logging
 import os
-from logging import ERROR
-from logging import Formatter
-from logging import Logger
-from logging import StreamHandler
-from logging import getLogger
+from typing import Optional
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:  # pragma: no cover
+    from logging import Logger
+
+# Numeric log levels, which match those of the logging package. Importing the
+# package takes a noticeable part of the startup time, so it is only imported
+# once a message is logged.
+LEVELS = {
+    'CRITICAL': 50,
+    'FATAL': 50,
+    'ERROR': 40,
+    'WARN': 30,
+    'WARNING': 30,
+    'INFO': 20,
+    'DEBUG': 10,
+    'NOTSET': 0,
+}
+DEBUG = LEVELS['DEBUG']
+ERROR = LEVELS['ERROR']
 
 
 def level_from_str(log_level: str) -> int:
-    i = getattr(logging, log_level.upper(), None)
+    i = LEVELS.get(log_level.upper())
     if isinstance(i, int):
         return i
     raise ValueError(f'Invalid log level "{log_level}" (use DEBUG, INFO, WARNING, ERROR or CRITICAL)')
 
 
-def create_logger() -> Logger:
-    """Create a Logger object."""
+def env_level() -> int:
+    """Return the log level set by the LOG_LEVEL environment variable."""
     key = 'LOG_LEVEL'
     if key in os.environ:
-        level = level_from_str(os.environ.get(key))
-    else:  # pragma: no cover (unittests set LOG_LEVEL env)
-        level = ERROR
+        return level_from_str(os.environ.get(key))
+    return ERROR  # pragma: no cover (unittests set LOG_LEVEL env)
+
+
+def create_logger() -> 'Logger':
+    """Create a Logger object."""
+    from logging import Formatter
+    from logging import StreamHandler
+    from logging import getLogger
+    level = env_level()
     handler = StreamHandler()
     handler.setFormatter(Formatter('%(asctime)s %(levelname)s %(message)s'))
     handler.setLevel(level)
@@ -44,5 +66,24 @@ def create_logger() -> Logger:
     return logger
 
 
+class LazyLogger:
+    """Stand-in for a Logger object, which is created on first use."""
+
+    def __init__(self) -> None:
+        self.logger: Optional['Logger'] = None
+
+    def __getattr__(self, name: str):
+        if self.logger is None:
+            self.logger = create_logger()
+        return getattr(self.logger, name)
+
+    def isEnabledFor(self, level: int) -> bool:
+        """Return True if messages of the given level are logged, without
+        creating the Logger object if it does not exist yet."""
+        if self.logger is None:
+            return level >= env_level()
+        return self.logger.isEnabledFor(level)
+
+
 # Shared logger object
-log = create_logger()
+log = LazyLogger()
@@ -0,0 +1,78 @@
+# Copyright © 2022 Ralph Seichter
+#
+# This file is part of PostQF.
+#
+# PostQF is free software: you can redistribute it and/or modify it under the terms of the GNU
+# General Public License as published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# PostQF is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without
+# even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with PostQF.
+# If not, see <https://www.gnu.org/licenses/>.
+import os
+from typing import Optional
+from typing import Union
+
+# Amount of output collected before it is written in block-buffered mode.
+BUFFER_SIZE = 1024 * 1024
+
+
+class OutputClosed(Exception):
+    """Raised when the reader of the output has gone away, e.g. because it was
+    piped into "head"."""
+
+
+class OutputWriter:
+    """Collect output in a large buffer and write it to a binary file with few
+    system calls. In line-buffered mode, which is the default for terminals,
+    output is written as soon as a line is complete. Strings are encoded using
+    UTF-8, so that the writer can also be passed to print().
+
+    If writing fails with a broken pipe, OutputClosed is raised and further
+    output is discarded. The file descriptor is then redirected to /dev/null,
+    so that flushing it again during interpreter shutdown does not fail.
+    """
+
+    def __init__(self, file, line_buffered: Optional[bool] = None, buffer_size: int = BUFFER_SIZE) -> None:
+        self.file = file
+        if line_buffered is None:
+            line_buffered = file.isatty()
+        self.line_buffered = line_buffered
+        self.buffer_size = buffer_size
+        self.buffer = bytearray()
+        self.broken = False
+
+    def write(self, data: Union[bytes, str]) -> None:
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        self.buffer += data
+        if len(self.buffer) >= self.buffer_size or (self.line_buffered and b'\n' in data):
+            self.flush()
+
+    def flush(self) -> None:
+        """Write all collected output."""
+        if self.broken:
+            self.buffer.clear()
+            return
+        try:
+            if self.buffer:
+                self.file.write(self.buffer)
+                self.buffer.clear()
+            self.file.flush()
+        except BrokenPipeError:
+            self.broken = True
+            self.buffer.clear()
+            self.discard()
+            raise OutputClosed
+
+    def discard(self) -> None:
+        """Redirect the file descriptor to /dev/null."""
+        try:
+            devnull = os.open(os.devnull, os.O_WRONLY)
+            os.dup2(devnull, self.file.fileno())
+            os.close(devnull)
+        except (AttributeError, OSError, ValueError):
+            pass
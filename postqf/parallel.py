@@ -0,0 +1,156 @@
+# Copyright © 2022 Ralph Seichter
+#
+# This file is part of PostQF.
+#
+# PostQF is free software: you can redistribute it and/or modify it under the terms of the GNU
+# General Public License as published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# PostQF is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without
+# even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with PostQF.
+# If not, see <https://www.gnu.org/licenses/>.
+import mmap
+import os
+import stat
+from collections import deque
+from typing import Callable
+from typing import Iterable
+from typing import Iterator
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+from postqf.compress import file_compression
+
+# Regular files smaller than this are never split into multiple byte ranges.
+MIN_CHUNK_SIZE = 32 * 1024 * 1024
+
+# A task is described by (path, start offset, end offset). An end offset of -1
+# marks a task which cannot be split and must be streamed by the parent process.
+Task = Tuple[str, int, int]
+
+
+def is_regular_file(path: str) -> bool:
+    """Return True if the path designates a regular file (not stdin, a pipe, etc.)."""
+    if path == '-':
+        return False
+    try:
+        return stat.S_ISREG(os.stat(path).st_mode)
+    except OSError:
+        return False
+
+
+def split_file(path: str, parts: int, min_chunk: int = 0) -> List[Task]:
+    """Split a file into byte ranges which can be processed independently.
+
+    Range boundaries are not necessarily aligned with line boundaries. See
+    read_range() for how lines crossing a boundary are assigned. Compressed
+    files cannot be split.
+
+    Args:
+        path: File name/path or "-".
+        parts: Desired number of ranges.
+        min_chunk: Minimum range size in bytes, MIN_CHUNK_SIZE if not specified.
+    """
+    if not is_regular_file(path) or file_compression(path):
+        return [(path, 0, -1)]
+    size = os.path.getsize(path)
+    chunk = max(min_chunk or MIN_CHUNK_SIZE, -(-size // max(parts, 1)))
+    if size <= chunk:
+        return [(path, 0, size)]
+    return [(path, start, min(start + chunk, size)) for start in range(0, size, chunk)]
+
+
+def map_file(file) -> Optional[mmap.mmap]:
+    """Memory-map an open file for sequential reading. Returns None if the file
+    cannot be mapped, e.g. because it is empty or not a regular file.
+
+    Args:
+        file: Binary file object.
+    """
+    try:
+        mm = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+    if hasattr(mm, 'madvise') and hasattr(mmap, 'MADV_SEQUENTIAL'):
+        mm.madvise(mmap.MADV_SEQUENTIAL)
+    return mm
+
+
+def mapped_lines(mm: mmap.mmap, start: int = 0, end: int = -1) -> Iterator[bytes]:
+    """Yield all lines of a memory-mapped file which begin inside the byte range
+    [start, end), see read_range(). Line boundaries are searched in the mapped
+    pages directly, so that each line is copied only once.
+
+    Args:
+        mm: Memory-mapped file.
+        start: Start offset (inclusive).
+        end: End offset (exclusive), -1 for the end of the file.
+    """
+    size = len(mm)
+    if end < 0 or end > size:
+        end = size
+    pos = start
+    if start > 0:
+        pos = mm.find(b'\n', start - 1) + 1 or size
+    while pos < end:
+        stop = mm.find(b'\n', pos) + 1 or size
+        yield mm[pos:stop]
+        pos = stop
+
+
+def read_range(path: str, start: int, end: int) -> Iterator[bytes]:
+    """Yield all lines which begin inside the byte range [start, end).
+
+    A line crossing the end offset is read completely, while a partial line at
+    the start offset is skipped, because it belongs to the preceding range.
+
+    Args:
+        path: File name/path.
+        start: Start offset (inclusive).
+        end: End offset (exclusive).
+    """
+    with open(path, 'rb') as file:
+        mm = map_file(file)
+        if mm is not None:
+            with mm:
+                yield from mapped_lines(mm, start, end)
+            return
+        if start > 0:
+            file.seek(start - 1)
+            file.readline()
+        pos = file.tell()
+        while pos < end:
+            line = file.readline()
+            if not line:
+                break
+            pos += len(line)
+            yield line
+
+
+def run_ordered(worker: Callable, tasks: Iterable, jobs: int, initializer: Callable = None,
+                initargs: tuple = ()) -> Iterator:
+    """Execute a worker function for each task using a process pool, yielding
+    results in task order. The number of pending tasks is limited to keep memory
+    usage of buffered results in check.
+
+    Args:
+        worker: Picklable function which accepts a single task argument.
+        tasks: Task arguments.
+        jobs: Number of worker processes.
+        initializer: Optional function called once in each worker process.
+        initargs: Arguments passed to the initializer.
+    """
+    pending = deque()
+    # Imported on demand, because multiprocessing is slow to import.
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=jobs, initializer=initializer, initargs=initargs) as executor:
+        for task in tasks:
+            if len(pending) >= 2 * jobs:
+                yield pending.popleft().result()
+            pending.append(executor.submit(worker, task))
+        while pending:
+            yield pending.popleft().result()
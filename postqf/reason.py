@@ -0,0 +1,61 @@
+# Copyright © 2022 Ralph Seichter
+#
+# This file is part of PostQF.
+#
+# PostQF is free software: you can redistribute it and/or modify it under the terms of the GNU
+# General Public License as published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# PostQF is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without
+# even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with PostQF.
+# If not, see <https://www.gnu.org/licenses/>.
+import re
+import sys
+from functools import lru_cache
+from typing import List
+from typing import Pattern
+from typing import Tuple
+
+# Maximum number of distinct raw delay reasons whose normalized form is cached.
+CACHE_SIZE = 1 << 16
+# Rewriting rules, applied in order. Each rule replaces variable parts of a
+# delay reason, like host names and IP addresses, with a placeholder.
+RULES = [
+    # Host name followed by an IP address, as in "connect to mail.example.com[192.0.2.1]:25".
+    (r'[\w.-]+\[(?:IPv6:)?[0-9a-f.:]+\]', '<host>[<ip>]'),
+    (r'\[(?:IPv6:)?[0-9a-f.:]*:[0-9a-f.:]*\]', '[<ip>]'),
+    (r'\b\d{1,3}(?:\.\d{1,3}){3}\b', '<ip>'),
+    (r'[\w.+=-]+@[\w.-]+', '<address>'),
+    (r'\b(queued as|id=)\s*[0-9a-z-]+', r'\1 <id>'),
+    (r'\b\d{1,2}:\d{2}:\d{2}\b', '<time>'),
+    (r'\b(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec) +\d{1,2}\b', '<date>'),
+    (r'\b(?:[a-z0-9](?:[a-z0-9-]*[a-z0-9])?\.)+[a-z]{2,}\b', '<host>'),
+    (r'\b\d{5,}\b', '<n>'),
+]
+
+
+@lru_cache(maxsize=1)
+def compiled_rules() -> List[Tuple[Pattern, str]]:
+    """Return the rewriting rules with compiled patterns. The patterns are
+    compiled on first use, because most runs do not normalize delay reasons."""
+    return [(re.compile(pattern, re.IGNORECASE), placeholder) for pattern, placeholder in RULES]
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def normalize_reason(reason: str) -> str:
+    """Rewrite a delay reason into a template, replacing host names, IP
+    addresses, email addresses, remote queue IDs, times and long numbers with
+    placeholders. For example, "connect to mail.example.com[192.0.2.1]:25:
+    Connection timed out" becomes "connect to <host>[<ip>]:25: Connection
+    timed out". Results are cached, because reasons repeat across many
+    recipients, and interned, because many reasons share a template.
+
+    Args:
+        reason: Delay reason reported by Postfix.
+    """
+    for regex, placeholder in compiled_rules():
+        reason = regex.sub(placeholder, reason)
+    return sys.intern(reason)
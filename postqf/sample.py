@@ -0,0 +1,148 @@
+# Copyright © 2022 Ralph Seichter
+#
+# This file is part of PostQF.
+#
+# PostQF is free software: you can redistribute it and/or modify it under the terms of the GNU
+# General Public License as published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# PostQF is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without
+# even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with PostQF.
+# If not, see <https://www.gnu.org/licenses/>.
+"""Deterministic sampling of queue data records. Whether a record is sampled
+depends only on a hash of its queue ID and the seed, so that repeated runs over
+the same queue select the same messages."""
+import heapq
+import math
+import re
+from typing import Callable
+from typing import Collection
+from typing import Dict
+from typing import Hashable
+from typing import Iterable
+from typing import List
+from typing import Optional
+from typing import Tuple
+from zlib import crc32
+
+HASH_RANGE = 1 << 32
+# Queue ID of a raw JSON record, extracted without decoding the record.
+QUEUE_ID = re.compile(rb'"queue_id"\s*:\s*"([^"]*)"')
+# Standard normal quantile for 95% confidence intervals.
+Z_95 = 1.96
+
+
+def parse_rate(string: str) -> float:
+    """Convert a string into a sampling rate, which must be a number greater
+    than 0 and at most 1."""
+    rate = float(string)
+    if not 0 < rate <= 1:
+        raise ValueError(f'Sampling rate {string} not in range (0, 1]')
+    return rate
+
+
+def line_hash(line: bytes, seed: int = 0) -> int:
+    """Return the 32 bit sampling hash of a raw record. The hash is computed
+    from the queue ID, or from the whole line if it contains none.
+
+    Args:
+        line: Raw JSON record.
+        seed: Hash seed.
+    """
+    m = QUEUE_ID.search(line)
+    return crc32(m.group(1) if m else line, seed & 0xFFFFFFFF)
+
+
+def sample_check(rate: float, seed: int = 0) -> Callable[[bytes], bool]:
+    """Create a function which returns True if a raw record is part of the
+    sample, so that unsampled records need not be decoded.
+
+    Args:
+        rate: Fraction of records to sample.
+        seed: Hash seed.
+    """
+    threshold = rate * HASH_RANGE
+    search = QUEUE_ID.search
+    seed &= 0xFFFFFFFF
+
+    def check(line: bytes) -> bool:
+        m = search(line)
+        return crc32(m.group(1) if m else line, seed) < threshold
+
+    return check
+
+
+class Reservoir:
+    """Sample of a fixed number of raw records, chosen uniformly from all
+    offered records. The records with the lowest hash values are kept, which
+    makes the sample independent of input order."""
+
+    def __init__(self, size: int, seed: int = 0) -> None:
+        self.size = size
+        self.seed = seed
+        self.offered = 0
+        self.heap: List[Tuple[int, int, bytes]] = []
+
+    def offer(self, lines: Iterable[bytes]) -> None:
+        """Offer raw records for sampling."""
+        heap = self.heap
+        for line in lines:
+            self.offered += 1
+            # Negated hash values turn the min-heap into a max-heap.
+            item = (-line_hash(line, self.seed), self.offered, line)
+            if len(heap) < self.size:
+                heapq.heappush(heap, item)
+            elif item > heap[0]:
+                heapq.heapreplace(heap, item)
+
+    def lines(self) -> List[bytes]:
+        """Return the sampled records in input order."""
+        return [line for _, _, line in sorted(self.heap, key=lambda item: item[1])]
+
+    def rate(self) -> float:
+        """Return the fraction of offered records which were sampled."""
+        return len(self.heap) / self.offered if self.offered else 1.0
+
+
+class SquareSums(dict):
+    """Sums of squared per-record counts by report key. Records are sampled by
+    queue ID, so all items counted for a record, e.g. recipients sharing a
+    domain, enter the sample together. The variance of a scaled-up count
+    therefore depends on these sums, not on the count alone. This is exact as
+    long as each queue ID appears in a single record."""
+
+    def add(self, counts: Dict[Hashable, int]) -> None:
+        """Add the key counts of a record."""
+        for key, count in counts.items():
+            self[key] = self.get(key, 0) + count * count
+
+    def merge(self, other: dict) -> None:
+        """Add the sums collected by another object, e.g. in a worker process."""
+        for key, value in other.items():
+            self[key] = self.get(key, 0) + value
+
+    def retain(self, keys: Collection[Hashable]) -> None:
+        """Drop the sums of all keys which are not contained in the given collection."""
+        for key in [k for k in self if k not in keys]:
+            del self[key]
+
+
+def estimate(count: int, rate: float, squares: Optional[int] = None) -> Tuple[int, int]:
+    """Scale a count observed in a sample up to the whole population. Returns
+    the estimate and the half width of its approximate 95% confidence interval,
+    treating records as sampled independently with the given rate.
+
+    Args:
+        count: Count observed in the sample.
+        rate: Fraction of records sampled.
+        squares: Sum of squared counts per record, see SquareSums. If not
+        specified, each counted item is assumed to be sampled on its own.
+    """
+    if rate >= 1:
+        return count, 0
+    if squares is None:
+        squares = count
+    return round(count / rate), math.ceil(Z_95 * math.sqrt(squares * (1 - rate)) / rate)
@@ -0,0 +1,215 @@
+# Copyright © 2022 Ralph Seichter
+#
+# This file is part of PostQF.
+#
+# PostQF is free software: you can redistribute it and/or modify it under the terms of the GNU
+# General Public License as published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# PostQF is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without
+# even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with PostQF.
+# If not, see <https://www.gnu.org/licenses/>.
+import io
+import sys
+from typing import Iterable
+from typing import Iterator
+from typing import List
+from typing import Tuple
+
+from postqf.compress import MAGIC_SIZE
+from postqf.compress import compression
+from postqf.compress import decompress_range
+from postqf.compress import decompressing_reader
+from postqf.compress import file_compression
+from postqf.compress import gzip_members
+from postqf.compress import member_ranges
+from postqf.config import Config
+from postqf.logstuff import log
+from postqf.parallel import is_regular_file
+from postqf.parallel import map_file
+from postqf.parallel import mapped_lines
+from postqf.parallel import run_ordered
+
+# Buffer size used for reading input data.
+BUFFER_SIZE = 1024 * 1024
+
+
+class Source:
+    """Input source providing queue data, one JSON object per line. Sources are
+    opened immediately before reading and closed afterwards, possibly before all
+    data has been read."""
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+
+    def __str__(self) -> str:
+        return self.name
+
+    def open(self) -> Iterable[bytes]:
+        """Return an iterable providing lines of bytes."""
+        raise NotImplementedError  # pragma: no cover
+
+    def close(self) -> bool:
+        """Release resources. Returns False if the source reported an error."""
+        raise NotImplementedError  # pragma: no cover
+
+
+def gzip_lines(path: str, members: List[Tuple[int, int]], jobs: int) -> Iterator[bytes]:
+    """Decompress groups of gzip members using a process pool, and yield the
+    resulting lines in order.
+
+    Args:
+        path: File name/path.
+        members: Offset and size of each member, see gzip_members().
+        jobs: Number of worker processes.
+    """
+    tasks = [(path, start, end) for start, end in member_ranges(members)]
+    rest = b''
+    for data in run_ordered(decompress_range, tasks, jobs):
+        data = rest + data
+        end = data.rfind(b'\n') + 1
+        yield from io.BytesIO(data[:end])
+        rest = data[end:]
+    if rest:
+        yield rest
+
+
+class FileSource(Source):
+    """A file, or stdin if the path is "-". Uncompressed regular files are
+    memory-mapped, other input is streamed. Data compressed using gzip, bzip2 or
+    xz is detected by its magic bytes and decompressed transparently. Gzip files
+    with known member sizes are decompressed in parallel if jobs > 1."""
+
+    def __init__(self, path: str, jobs: int = 1) -> None:
+        super().__init__(path)
+        self.jobs = jobs
+        self.files = []
+
+    def open(self) -> Iterable[bytes]:
+        if self.name == '-':
+            raw = open(sys.stdin.fileno(), 'rb', buffering=BUFFER_SIZE, closefd=False)
+        else:
+            raw = open(self.name, 'rb', buffering=BUFFER_SIZE)
+        self.files = [raw]
+        name = compression(raw.peek(MAGIC_SIZE))
+        if not name:
+            mm = map_file(raw) if self.name != '-' else None
+            if mm is None:
+                return raw
+            self.files.insert(0, mm)
+            return mapped_lines(mm)
+        if name == 'gzip' and self.jobs > 1 and self.name != '-':
+            members = gzip_members(self.name)
+            if members and len(members) > 1:
+                return gzip_lines(self.name, members, self.jobs)
+        reader = decompressing_reader(raw, name, BUFFER_SIZE)
+        self.files.insert(0, reader)
+        return reader
+
+    def close(self) -> bool:
+        for file in self.files:
+            file.close()
+        self.files = []
+        return True
+
+
+class CommandSource(Source):
+    """Output of a command like "postqueue -j". If the source is closed before
+    the command has finished, the command is terminated."""
+
+    def __init__(self, command: str) -> None:
+        super().__init__(command)
+        self.process = None
+        self.exhausted = False
+        self.terminated = False
+
+    def open(self) -> Iterable[bytes]:
+        # Imported on demand, because subprocess is slow to import.
+        import shlex
+        import subprocess
+        self.process = subprocess.Popen(shlex.split(self.name), stdout=subprocess.PIPE, bufsize=BUFFER_SIZE)
+        return self.lines()
+
+    def lines(self) -> Iterator[bytes]:
+        """Yield the command's output lines, and note when all output was read.
+        The output pipe is deliberately not closed if the generator is, so that
+        the command cannot exit due to a broken pipe before close() is called."""
+        for line in self.process.stdout:
+            yield line
+        self.exhausted = True
+
+    def close(self) -> bool:
+        if not self.process:
+            return True
+        if not self.exhausted and self.process.poll() is None:
+            self.process.terminate()
+            self.terminated = True
+        self.process.stdout.close()
+        status = self.process.wait()
+        self.process = None
+        if status and not self.terminated:
+            log.error(f'Command "{self.name}" failed with exit status {status}')
+            return False
+        return True
+
+
+class MemorySource(Source):
+    """Queue data held in memory, e.g. a snapshot kept by the daemon."""
+
+    def __init__(self, name: str, data: bytes) -> None:
+        super().__init__(name)
+        self.data = data
+
+    def open(self) -> Iterable[bytes]:
+        return mapped_lines(self.data)
+
+    def close(self) -> bool:
+        return True
+
+
+class IndexedFileSource(FileSource):
+    """A regular file which is looked up in an index database first, so that
+    only lines which can match the configured filters are read. The file is
+    indexed if necessary. If indexing fails, all lines are read."""
+
+    def __init__(self, path: str, db: str, config: Config) -> None:
+        super().__init__(path)
+        self.db = db
+        self.config = config
+
+    def open(self) -> Iterable[bytes]:
+        # Imported on demand, like the sqlite3 module it depends on.
+        from postqf.index import Index
+        index = Index(self.db)
+        try:
+            file_id, _ = index.update(self.name)
+            offsets = index.offsets(file_id, self.config)
+        except Exception as e:
+            log.warning(f'Cannot use index for {self.name}: {e}')
+            return super().open()
+        finally:
+            index.close()
+        from postqf.index import read_lines
+        return read_lines(self.name, offsets)
+
+
+def indexable(path: str) -> bool:
+    """Return True if the path designates an uncompressed regular file."""
+    return is_regular_file(path) and not file_compression(path)
+
+
+def input_sources(config: Config) -> List[Source]:
+    """Return the input sources specified by the configuration.
+
+    Args:
+        config: Configuration providing input files or a command.
+    """
+    if config.postqueue:
+        return [CommandSource(config.postqueue_cmd)]
+    if config.index:
+        return [IndexedFileSource(p, config.index, config) if indexable(p) else FileSource(p, config.jobs)
+                for p in config.infile]
+    return [FileSource(path, config.jobs) for path in config.infile]
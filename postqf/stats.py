@@ -0,0 +1,122 @@
+# Copyright © 2022 Ralph Seichter
+#
+# This file is part of PostQF.
+#
+# PostQF is free software: you can redistribute it and/or modify it under the terms of the GNU
+# General Public License as published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# PostQF is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without
+# even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with PostQF.
+# If not, see <https://www.gnu.org/licenses/>.
+import json
+import sys
+from typing import Callable
+from typing import Dict
+from typing import List
+
+# Only every Nth record is timed, keeping the overhead of reading the clock low.
+SAMPLE_INTERVAL = 64
+# Processing stages which are timed for sampled records. Time spent reading
+# input (and loop overhead) is calculated as the remainder.
+STAGES = ('prefilter', 'parse', 'filter', 'output')
+
+# Functions called with the Stats object at the end of each run. If any hook
+# is registered, statistics are collected even without the --stats option.
+stats_hooks: List[Callable[['Stats'], None]] = []
+
+
+def add_stats_hook(hook: Callable[['Stats'], None]) -> None:
+    """Register a function to be called with the statistics of each run."""
+    stats_hooks.append(hook)
+
+
+class Stats:
+    """Statistics collected while processing queue data."""
+
+    def __init__(self) -> None:
+        self.records = 0
+        self.bytes = 0
+        self.parse_errors = 0
+        # Records rejected by each filter, including records which the
+        # prefilter skipped without decoding them.
+        self.rejected: Dict[str, int] = {}
+        self.matches = 0
+        # Number of timed records and their accumulated time per stage.
+        self.sampled = 0
+        self.stage_times: Dict[str, float] = dict.fromkeys(STAGES, 0.0)
+        # Time spent processing lines, and overall wall time, in seconds.
+        self.busy = 0.0
+        self.wall = 0.0
+        # Number of distinct keys per report.
+        self.cardinality: Dict[str, int] = {}
+
+    def merge(self, other: 'Stats') -> None:
+        """Merge statistics collected by a worker process into this object."""
+        self.records += other.records
+        self.bytes += other.bytes
+        self.parse_errors += other.parse_errors
+        for name, count in other.rejected.items():
+            self.rejected[name] = self.rejected.get(name, 0) + count
+        self.matches += other.matches
+        self.sampled += other.sampled
+        for stage, seconds in other.stage_times.items():
+            self.stage_times[stage] += seconds
+        self.busy += other.busy
+
+    def stages(self) -> Dict[str, float]:
+        """Return the estimated total time per stage in seconds, extrapolated
+        from the sampled records. With multiple worker processes, times are
+        summed across all workers."""
+        scale = self.records / self.sampled if self.sampled else 0.0
+        result = {'read': 0.0}
+        result.update({stage: seconds * scale for stage, seconds in self.stage_times.items()})
+        result['read'] = max(0.0, self.busy - sum(result.values()))
+        return result
+
+    def rate(self) -> float:
+        """Return the number of records processed per second of wall time."""
+        return self.records / self.wall if self.wall > 0 else 0.0
+
+    def as_dict(self) -> dict:
+        """Return the statistics as a JSON-compatible dictionary."""
+        return {
+            'records': self.records,
+            'bytes': self.bytes,
+            'parse_errors': self.parse_errors,
+            'rejected': dict(self.rejected),
+            'matches': self.matches,
+            'cardinality': dict(self.cardinality),
+            'sampled': self.sampled,
+            'stages': self.stages(),
+            'wall': self.wall,
+            'records_per_second': self.rate(),
+        }
+
+    def format(self) -> str:
+        """Return the statistics as human-readable text."""
+        lines = [
+            f'records read: {self.records}',
+            f'bytes read: {self.bytes}',
+            f'parse errors: {self.parse_errors}',
+        ]
+        lines.extend(f'rejected by {name}: {count}' for name, count in self.rejected.items())
+        lines.append(f'matches: {self.matches}')
+        lines.extend(f'{name} report keys: {count}' for name, count in self.cardinality.items())
+        lines.extend(f'{stage} time: {seconds:.3f}s' for stage, seconds in self.stages().items())
+        lines.append(f'wall time: {self.wall:.3f}s')
+        lines.append(f'records/s: {self.rate():.0f}')
+        return '\n'.join(lines) + '\n'
+
+    def write(self, path: str) -> None:
+        """Write the statistics as text to stderr if path is "-", otherwise as
+        a JSON object to the given file."""
+        if path == '-':
+            sys.stderr.write(self.format())
+        else:
+            with open(path, 'w', encoding='utf-8') as file:
+                json.dump(self.as_dict(), file, indent=2)
+                file.write('\n')
@@ -0,0 +1,128 @@
+# Copyright © 2022 Ralph Seichter
+#
+# This file is part of PostQF.
+#
+# PostQF is free software: you can redistribute it and/or modify it under the terms of the GNU
+# General Public License as published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# PostQF is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without
+# even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with PostQF.
+# If not, see <https://www.gnu.org/licenses/>.
+from heapq import heapify
+from heapq import heappop
+from heapq import heappush
+from typing import Hashable
+from typing import List
+from typing import Tuple
+
+# Minimum number of keys monitored by a SpaceSaving object, and the factor
+# applied to the number of requested top entries.
+MIN_CAPACITY = 1024
+CAPACITY_FACTOR = 10
+
+
+def capacity_for(top: int) -> int:
+    """Return the number of keys to monitor for a top N report."""
+    return max(MIN_CAPACITY, CAPACITY_FACTOR * top)
+
+
+def new_counter(top: int = 0):
+    """Return a SpaceSaving object for top N reports, an ExactCounter otherwise.
+
+    Args:
+        top: Number of keys to report, 0 for all keys.
+    """
+    if top:
+        return SpaceSaving(capacity_for(top))
+    return ExactCounter()
+
+
+class ExactCounter(dict):
+    """Exact key counts, offering the same update methods as SpaceSaving."""
+
+    def add(self, key: Hashable, count: int = 1) -> None:
+        """Count occurrences of a key."""
+        self[key] = self.get(key, 0) + count
+
+    def merge(self, other: dict) -> None:
+        """Merge another set of counts into this one."""
+        for key, count in other.items():
+            self[key] = self.get(key, 0) + count
+
+
+class SpaceSaving:
+    """Bounded-memory frequency estimation using the Space-Saving algorithm by
+    Metwally, Agrawal and El Abbadi. At most 'capacity' keys are monitored. Each
+    estimated count is an upper bound of the true count, which exceeds the true
+    count by at most the associated error. Keys with a true count greater than
+    total / capacity are guaranteed to be monitored."""
+
+    def __init__(self, capacity: int) -> None:
+        self.capacity = capacity
+        self.counts = {}
+        self.errors = {}
+        # Min-heap of (count, key). Counts are increased without updating the
+        # heap, so entries may be outdated, but never exceed the actual count.
+        self.heap = []
+        self.total = 0
+
+    def __len__(self) -> int:
+        return len(self.counts)
+
+    def add(self, key: Hashable, count: int = 1) -> None:
+        """Count occurrences of a key."""
+        self.total += count
+        if key in self.counts:
+            self.counts[key] += count
+        elif len(self.counts) < self.capacity:
+            self.counts[key] = count
+            self.errors[key] = 0
+            heappush(self.heap, (count, key))
+        else:
+            minimum = self.evict()
+            self.counts[key] = minimum + count
+            self.errors[key] = minimum
+            heappush(self.heap, (minimum + count, key))
+
+    def evict(self) -> int:
+        """Stop monitoring the key with the smallest count, and return that count."""
+        while True:
+            count, key = heappop(self.heap)
+            current = self.counts.get(key)
+            if current == count:
+                del self.counts[key]
+                del self.errors[key]
+                return count
+            if current is not None:
+                heappush(self.heap, (current, key))
+
+    def minimum(self) -> int:
+        """Return the upper bound for the count of any key which is not monitored."""
+        if len(self.counts) < self.capacity:
+            return 0
+        return min(self.counts.values())
+
+    def merge(self, other: 'SpaceSaving') -> None:
+        """Merge another summary into this one, retaining the error guarantees."""
+        own_min = self.minimum()
+        other_min = other.minimum()
+        counts = {}
+        errors = {}
+        for key in list(self.counts) + [k for k in other.counts if k not in self.counts]:
+            counts[key] = self.counts.get(key, own_min) + other.counts.get(key, other_min)
+            errors[key] = self.errors.get(key, own_min) + other.errors.get(key, other_min)
+        keep = sorted(counts, key=lambda k: counts[k], reverse=True)[:self.capacity]
+        self.counts = {k: counts[k] for k in keep}
+        self.errors = {k: errors[k] for k in keep}
+        self.heap = [(c, k) for k, c in self.counts.items()]
+        heapify(self.heap)
+        self.total += other.total
+
+    def top(self, n: int) -> List[Tuple[Hashable, int, int]]:
+        """Return up to n (key, count, error) tuples, highest counts first."""
+        keys = sorted(self.counts, key=lambda k: self.counts[k], reverse=True)[:n]
+        return [(k, self.counts[k], self.errors[k]) for k in keys]
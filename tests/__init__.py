@@ -14,13 +14,16 @@ General Public License for more details.
 You should have received a copy of the GNU General Public License along with PostQF.
 If not, see <https://www.gnu.org/licenses/>.
 """
+import os
 import re
 from os.path import abspath
 from os.path import join
+from tempfile import NamedTemporaryFile
 from typing import List
 from unittest import TestCase
 
 from postqf import config
+from postqf.core import process_files
 
 
 class PostqfTestCase(TestCase):
@@ -60,3 +63,16 @@ class PostqfTestCase(TestCase):
     @staticmethod
     def parentdir(reference=__file__):
         return abspath(join(reference, '..'))
+
+    def _output(self) -> bytes:
+        """Process the configured input, writing to a temporary file, and
+        return the output."""
+        tmp = NamedTemporaryFile(delete=False)
+        tmp.close()
+        config.cf.outfile = tmp.name
+        try:
+            self.assertTrue(process_files())
+            with open(tmp.name, 'rb') as f:
+                return f.read()
+        finally:
+            os.unlink(tmp.name)
@@ -0,0 +1,118 @@
+# Copyright © 2022 Ralph Seichter
+#
+# This file is part of PostQF.
+#
+# PostQF is free software: you can redistribute it and/or modify it under the terms of the GNU
+# General Public License as published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# PostQF is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without
+# even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with PostQF.
+# If not, see <https://www.gnu.org/licenses/>.
+"""Benchmark process_files() using synthetic queue data, reporting throughput
+and peak memory usage. Each case runs in a fresh process.
+
+Usage: python -m tests.benchmark [-h] [--sizes N,N,...] [-j N] [--seed N] [--case NAME ...]
+"""
+import os
+import resource
+import shutil
+import tempfile
+import time
+from argparse import ArgumentParser
+from argparse import Namespace
+from concurrent.futures import ProcessPoolExecutor
+from os.path import join
+from typing import Tuple
+
+from postqf.config import cf
+from postqf.core import process_files
+from tests.generate import BASE_TIME
+from tests.generate import TIME_SPAN
+from tests.generate import generate
+
+DEFAULT_SIZES = '10000,100000'
+# Filter combinations, applied with records output.
+FILTERS = {
+    'none': {},
+    'qname': {'qname': '^deferred$'},
+    'sender': {'sender': r'^alice\d*@gmail\.com$'},
+    'rcpt': {'rcpt': r'@example\.net$'},
+    'reason': {'reason': 'timed out'},
+    'arrival': {'after': str(BASE_TIME + TIME_SPAN // 2)},
+    'combined': {'qname': 'deferred', 'rcpt': r'\.com$', 'reason': 'refused|timed out',
+                 'after': str(BASE_TIME + TIME_SPAN // 4)},
+}
+# Output modes, applied without filters.
+OUTPUTS = {
+    'id': {'queue_id': True},
+    'rcpt': {'report_rcpt': True},
+    'rdom': {'report_rdom': True},
+    'reason': {'report_reason': True},
+    'sdom': {'report_sdom': True},
+    'sender': {'report_sender': True},
+    'top': {'report_rcpt': True, 'top': 10},
+    'all': {'report_rcpt': True, 'report_rdom': True, 'report_reason': True, 'report_sdom': True,
+            'report_sender': True},
+}
+
+
+def cases() -> dict:
+    """Return all benchmark cases, as command line options by case name."""
+    result = {f'filter-{name}': options for name, options in FILTERS.items()}
+    result.update({f'output-{name}': options for name, options in OUTPUTS.items()})
+    return result
+
+
+def run_case(path: str, options: dict, jobs: int) -> Tuple[float, int]:
+    """Process a file using the given options. Returns the elapsed time in
+    seconds and the peak resident set size in KiB, including worker processes.
+    Intended to be executed in a separate process."""
+    args = {'qname': None, 'rcpt': None, 'reason': None, 'sender': None}
+    args.update(options)
+    cf.refresh(Namespace(infile=[path], outfile=os.devnull, jobs=jobs, **args))
+    start = time.perf_counter()
+    process_files()
+    elapsed = time.perf_counter() - start
+    rss = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+              resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    return elapsed, rss
+
+
+def benchmark(sizes: list, jobs: int, seed: int, names: list) -> None:
+    """Generate input files of the given sizes and print the results of all
+    selected cases as a table."""
+    tmpdir = tempfile.mkdtemp()
+    try:
+        print(f'{"case":<18} {"records":>9} {"seconds":>9} {"records/s":>11} {"peak RSS MiB":>13}')
+        for size in sizes:
+            path = join(tmpdir, f'qdata-{size}')
+            with open(path, 'wb') as f:
+                f.writelines(generate(size, seed=seed))
+            for name, options in cases().items():
+                if names and name not in names:
+                    continue
+                with ProcessPoolExecutor(max_workers=1) as executor:
+                    elapsed, rss = executor.submit(run_case, path, options, jobs).result()
+                print(f'{name:<18} {size:>9} {elapsed:>9.3f} {size / elapsed:>11.0f} {rss / 1024:>13.1f}',
+                      flush=True)
+    finally:
+        shutil.rmtree(tmpdir)
+
+
+def main() -> None:
+    parser = ArgumentParser(description='Benchmark PostQF using synthetic queue data.')
+    parser.add_argument('--sizes', default=DEFAULT_SIZES, help=f'Record counts (default: {DEFAULT_SIZES}).')
+    parser.add_argument('-j', '--jobs', type=int, default=1, help='Number of worker processes.')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed for the generator.')
+    parser.add_argument('--case', dest='cases', action='append', choices=sorted(cases()),
+                        help='Run only the given case (can be repeated).')
+    ns = parser.parse_args()
+    benchmark([int(s) for s in ns.sizes.split(',')], ns.jobs, ns.seed, ns.cases or [])
+
+
+if __name__ == '__main__':
+    main()
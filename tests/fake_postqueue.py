@@ -0,0 +1,34 @@
+# Copyright © 2022 Ralph Seichter
+#
+# This file is part of PostQF.
+#
+# PostQF is free software: you can redistribute it and/or modify it under the terms of the GNU
+# General Public License as published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# PostQF is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without
+# even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with PostQF.
+# If not, see <https://www.gnu.org/licenses/>.
+"""Stand-in for "postqueue -j", writing the qdata test file repeatedly.
+
+Usage: fake_postqueue.py [REPEAT [STATUS]]
+
+REPEAT defaults to 1, and 0 means forever. STATUS is the exit status.
+"""
+import itertools
+import sys
+from os.path import dirname
+from os.path import join
+
+if __name__ == '__main__':
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 1
+    status = int(sys.argv[2]) if len(sys.argv) > 2 else 0
+    with open(join(dirname(__file__), 'qdata'), 'rb') as f:
+        data = f.read()
+    for _ in itertools.count() if repeat == 0 else range(repeat):
+        sys.stdout.buffer.write(data)
+    sys.stdout.flush()
+    sys.exit(status)
@@ -0,0 +1,30 @@
+# Copyright © 2022 Ralph Seichter
+#
+# This file is part of PostQF.
+#
+# PostQF is free software: you can redistribute it and/or modify it under the terms of the GNU
+# General Public License as published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# PostQF is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without
+# even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with PostQF.
+# If not, see <https://www.gnu.org/licenses/>.
+"""Stand-in for "postsuper", appending the option and all queue IDs read from
+stdin to a log file, one per line.
+
+Usage: fake_postsuper.py LOGFILE [STATUS] OPTION -
+
+STATUS is the exit status.
+"""
+import sys
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    status = int(args[1]) if len(args) > 3 else 0
+    with open(args[0], 'a') as log:
+        for line in sys.stdin:
+            log.write(f'{args[-2]} {line}')
+    sys.exit(status)
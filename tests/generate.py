@@ -0,0 +1,131 @@
+# Copyright © 2022 Ralph Seichter
+#
+# This file is part of PostQF.
+#
+# PostQF is free software: you can redistribute it and/or modify it under the terms of the GNU
+# General Public License as published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# PostQF is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without
+# even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with PostQF.
+# If not, see <https://www.gnu.org/licenses/>.
+"""Deterministic generator for synthetic "postqueue -j" data.
+
+Usage: generate.py [-h] [-n COUNT] [--rcpts N] [--reasons N] [--queues MIX] [--seed N] [-o OUTFILE]
+"""
+import json
+import random
+import sys
+from argparse import ArgumentParser
+from typing import Dict
+from typing import Iterator
+
+# Arrival times are spread across one week, starting at this epoch time.
+BASE_TIME = 1642000000
+TIME_SPAN = 7 * 24 * 60 * 60
+DEFAULT_QUEUES = 'deferred=70,active=15,hold=10,incoming=5'
+DOMAINS = ['example.com', 'example.net', 'example.org', 'gmail.com', 'outlook.com', 'web.de', 'gmx.de',
+           'yahoo.com', 'mail.ru', 'uni-example.edu']
+NAMES = ['alice', 'bob', 'carol', 'dave', 'erin', 'frank', 'grace', 'heidi', 'ivan', 'judy', 'mallory',
+         'ned', 'olivia', 'peggy', 'rupert', 'sybil', 'trent', 'victor', 'walter']
+# Delay reason templates, completed using a host name and an IP address.
+REASONS = [
+    'connect to {host}[{ip}]:25: Connection timed out',
+    'connect to {host}[{ip}]:25: Connection refused',
+    'host {host}[{ip}] said: 450 4.7.1 Unverified Client host rejected: Please try again later'
+    ' (in reply to RCPT TO command)',
+    'host {host}[{ip}] said: 452 4.2.2 Mailbox full (in reply to RCPT TO command)',
+    'host {host}[{ip}] said: 421 4.7.0 Too many connections, try again later (in reply to end of DATA command)',
+    'delivery temporarily suspended: connect to {host}[{ip}]:25: No route to host',
+    'lost connection with {host}[{ip}] while receiving the initial server greeting',
+    'Host or domain name not found. Name service error for name={host} type=MX: Host not found, try again',
+]
+# Characters used in long queue IDs.
+ID_CHARS = '0123456789BCDFGHJKLMNPQRSTVWXYZbcdfghjklmnpqrstvwxyz'
+
+
+def parse_mix(mix: str) -> Dict[str, int]:
+    """Parse a queue mix like "deferred=70,active=30" into names and weights."""
+    queues = {}
+    for item in mix.split(','):
+        name, _, weight = item.partition('=')
+        queues[name.strip()] = int(weight or 1)
+    return queues
+
+
+def address(rnd: random.Random) -> str:
+    """Return a random email address."""
+    return f'{rnd.choice(NAMES)}{rnd.randrange(1000)}@{rnd.choice(DOMAINS)}'
+
+
+def reasons(rnd: random.Random, variety: int) -> list:
+    """Return a list of distinct delay reasons."""
+    result = []
+    for i in range(variety):
+        host = f'mx{i % 7}.{DOMAINS[i % len(DOMAINS)]}'
+        ip = f'192.0.2.{i % 250 + 1}'
+        result.append(REASONS[i % len(REASONS)].format(host=host, ip=ip) + ('' if i < len(REASONS) else f' #{i}'))
+    rnd.shuffle(result)
+    return result
+
+
+def generate(count: int, rcpts: int = 3, variety: int = 20, queues: str = DEFAULT_QUEUES,
+             seed: int = 0) -> Iterator[bytes]:
+    """Yield queue records as JSON lines. The same arguments always produce the
+    same data.
+
+    Args:
+        count: Number of records.
+        rcpts: Maximum number of recipients per record.
+        variety: Number of distinct delay reasons.
+        queues: Queue names and their relative weights, e.g. "deferred=70,active=30".
+        seed: Random seed.
+    """
+    rnd = random.Random(seed)
+    mix = parse_mix(queues)
+    names = list(mix)
+    weights = [mix[n] for n in names]
+    reason_list = reasons(rnd, max(variety, 1))
+    for _ in range(count):
+        qname = rnd.choices(names, weights)[0]
+        recipients = []
+        for _ in range(rnd.randint(1, max(rcpts, 1))):
+            r = {'address': address(rnd)}
+            if qname == 'deferred' or rnd.random() < 0.1:
+                # Skewed choice, so that some reasons are much more frequent.
+                r['delay_reason'] = reason_list[min(int(rnd.expovariate(0.3)), len(reason_list) - 1)]
+            recipients.append(r)
+        qdata = {
+            'queue_name': qname,
+            'queue_id': ''.join(rnd.choice(ID_CHARS) for _ in range(15)),
+            'arrival_time': BASE_TIME + rnd.randrange(TIME_SPAN),
+            'message_size': rnd.randint(500, 5000000),
+            'forced_expire': rnd.random() < 0.01,
+            # Bounces have an empty sender address.
+            'sender': '' if rnd.random() < 0.05 else address(rnd),
+            'recipients': recipients,
+        }
+        yield json.dumps(qdata).encode() + b'\n'
+
+
+def main() -> None:
+    parser = ArgumentParser(description='Generate synthetic "postqueue -j" data.')
+    parser.add_argument('-n', dest='count', metavar='COUNT', type=int, default=1000, help='Number of records.')
+    parser.add_argument('--rcpts', type=int, default=3, help='Maximum number of recipients per record.')
+    parser.add_argument('--reasons', type=int, default=20, help='Number of distinct delay reasons.')
+    parser.add_argument('--queues', metavar='MIX', default=DEFAULT_QUEUES, help='Queue names and weights.')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed.')
+    parser.add_argument('-o', dest='outfile', metavar='OUTFILE', help='Output file (default: stdout).')
+    ns = parser.parse_args()
+    out = open(ns.outfile, 'wb') if ns.outfile else sys.stdout.buffer
+    out.writelines(generate(ns.count, ns.rcpts, ns.reasons, ns.queues, ns.seed))
+    out.flush()
+    if ns.outfile:
+        out.close()
+
+
+if __name__ == '__main__':
+    main()
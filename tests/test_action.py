@@ -0,0 +1,88 @@
+# Copyright © 2022 Ralph Seichter
+#
+# This file is part of PostQF.
+#
+# PostQF is free software: you can redistribute it and/or modify it under the terms of the GNU
+# General Public License as published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# PostQF is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without
+# even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with PostQF.
+# If not, see <https://www.gnu.org/licenses/>.
+import os
+import sys
+from argparse import Namespace
+from os.path import join
+from tempfile import NamedTemporaryFile
+from unittest.mock import patch
+
+from postqf.action import ActionRunner
+from postqf.config import cf
+from postqf.core import process_files
+from tests import PostqfTestCase
+
+
+class TestAction(PostqfTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        cf.refresh(Namespace(qname=None, rcpt=None, sender=None, reason=None))
+        self.qdata = join(self.parentdir(__file__), 'qdata')
+        with NamedTemporaryFile(delete=False) as tmp:
+            self.log = tmp.name
+        self.fake = f'{sys.executable} {join(self.parentdir(__file__), "fake_postsuper.py")} {self.log}'
+
+    def tearDown(self) -> None:
+        os.unlink(self.log)
+        super().tearDown()
+
+    def _logged(self) -> list:
+        with open(self.log) as f:
+            return f.read().splitlines()
+
+    def test_batches(self):
+        with patch('postqf.action.BATCH_SIZE', 2):
+            runner = ActionRunner('hold', self.fake)
+        for i in range(5):
+            runner.add(f'ID{i}')
+        self.assertEqual(4, runner.processed)
+        self.assertTrue(runner.close())
+        self.assertEqual([f'-h ID{i}' for i in range(5)], self._logged())
+        self.assertEqual('hold: 5 queue IDs processed, 0 failed', runner.summary())
+
+    def test_failure(self):
+        runner = ActionRunner('delete', f'{self.fake} 1')
+        runner.add('ID')
+        self.assertFalse(runner.close())
+        runner = ActionRunner('delete', '/nonexistent/postsuper')
+        runner.add('ID')
+        self.assertFalse(runner.close())
+        self.assertEqual(1, runner.failed)
+
+    def test_dry_run(self):
+        runner = ActionRunner('requeue', '/nonexistent/postsuper', dry_run=True)
+        runner.add('ID')
+        self.assertTrue(runner.close())
+        self.assertEqual('requeue (dry run): 1 queue IDs processed, 0 failed', runner.summary())
+
+    def test_rate(self):
+        runner = ActionRunner('release', self.fake, rate=2)
+        self.assertEqual(2, runner.batch_size)
+        with patch('postqf.action.time.sleep') as sleep:
+            for i in range(6):
+                runner.add(f'ID{i}')
+            self.assertTrue(runner.close())
+        self.assertEqual(2, sleep.call_count)
+        self.assertEqual(6, len(self._logged()))
+
+    def test_process_files(self):
+        cf.infile = [self.qdata]
+        cf.outfile = os.devnull
+        cf.sender_re = cf.re_compile('fummo')
+        cf.action = 'hold'
+        cf.postsuper_cmd = self.fake
+        with patch('sys.stderr'):
+            self.assertTrue(process_files())
+        self.assertEqual(['-h 4Jgt2V6BKNz1xy5', '-h 4Jgt2V6Twsz1y0d'], self._logged())
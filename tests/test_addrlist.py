@@ -0,0 +1,70 @@
+# Copyright © 2022 Ralph Seichter
+#
+# This file is part of PostQF.
+#
+# PostQF is free software: you can redistribute it and/or modify it under the terms of the GNU
+# General Public License as published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# PostQF is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without
+# even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with PostQF.
+# If not, see <https://www.gnu.org/licenses/>.
+import os
+from argparse import Namespace
+from tempfile import NamedTemporaryFile
+
+from postqf.addrlist import load_list
+from postqf.addrlist import parse_list
+from postqf.config import Config
+from postqf.filter import compile_filter
+from tests import PostqfTestCase
+
+
+class TestAddressList(PostqfTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.list = parse_list(['# Comment', '', 'Carol@Example.com', 'example.net  # Domain', '@sub.example.org'])
+
+    def test_parse(self):
+        self.assertEqual(3, len(self.list))
+        self.assertEqual({'carol@example.com'}, self.list.addresses)
+
+    def test_match(self):
+        self.assertTrue(self.list.match('carol@EXAMPLE.com'))
+        self.assertFalse(self.list.match('dave@example.com'))
+        self.assertTrue(self.list.match('ned@example.net'))
+        self.assertTrue(self.list.match('ned@mx.Example.NET'))
+        self.assertFalse(self.list.match('ned@badexample.net'))
+        self.assertFalse(self.list.match('alice@example.org'))
+        self.assertTrue(self.list.match('alice@a.sub.example.org'))
+        self.assertFalse(self.list.match(''))
+        self.assertFalse(self.list.match('example.net'))
+
+    def test_load_cached(self):
+        with NamedTemporaryFile('w', delete=False) as tmp:
+            tmp.write('example.com\n')
+        first = load_list(tmp.name)
+        self.assertIs(first, load_list(tmp.name))
+        with open(tmp.name, 'a') as f:
+            f.write('example.net\n')
+        os.utime(tmp.name, ns=(0, 0))
+        second = load_list(tmp.name)
+        os.unlink(tmp.name)
+        self.assertIsNot(first, second)
+        self.assertEqual(2, len(second))
+
+    def test_filter(self):
+        with NamedTemporaryFile('w') as senders, NamedTemporaryFile('w') as rcpts:
+            senders.write('alice@example.org\n')
+            senders.flush()
+            rcpts.write('example.net\n')
+            rcpts.flush()
+            c = Config()
+            c.refresh(Namespace(qname=None, rcpt=None, sender=None, reason=None, sender_file=senders.name,
+                                rcpt_file=rcpts.name))
+            self.assertTrue(compile_filter(c)(self.data))
+            self.assertFalse(compile_filter(c)(dict(self.data, sender='bob@example.org')))
+            self.assertFalse(compile_filter(c)(dict(self.data, recipients=self.recipients()[:1])))
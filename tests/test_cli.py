@@ -0,0 +1,54 @@
+# Copyright © 2022 Ralph Seichter
+#
+# This file is part of PostQF.
+#
+# PostQF is free software: you can redistribute it and/or modify it under the terms of the GNU
+# General Public License as published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# PostQF is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without
+# even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with PostQF.
+# If not, see <https://www.gnu.org/licenses/>.
+import os
+import subprocess
+import sys
+from contextlib import redirect_stderr
+from io import StringIO
+from os.path import join
+
+from postqf.cli import parse_args
+from tests import PostqfTestCase
+
+
+class TestCli(PostqfTestCase):
+    def test_stats(self):
+        ns = parse_args(['--stats', 'keep.json', '-q', 'hold'])
+        self.assertEqual('-', ns.stats)
+        self.assertEqual(['keep.json'], ns.infile)
+        ns = parse_args(['--stats-file', 'stats.json', 'keep.json'])
+        self.assertEqual('stats.json', ns.stats)
+        self.assertEqual(['keep.json'], ns.infile)
+        self.assertIsNone(parse_args([]).stats)
+
+    def test_actions_exclusive(self):
+        self.assertEqual('hold', parse_args(['--hold', 'x']).action)
+        with redirect_stderr(StringIO()), self.assertRaises(SystemExit):
+            parse_args(['--hold', '--delete', 'x'])
+
+    def _run(self, *args) -> int:
+        root = self.parentdir(self.parentdir(__file__))
+        env = dict(os.environ, PYTHONPATH=root, LOG_LEVEL='FATAL')
+        args = [sys.executable, '-m', 'postqf', *args, join(self.parentdir(__file__), 'qdata')]
+        return subprocess.run(args, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                              timeout=60).returncode
+
+    def test_exit_status(self):
+        self.assertEqual(0, self._run('-q', 'hold'))
+        self.assertEqual(0, self._run('--hold', '--dry-run'))
+        self.assertEqual(1, self._run('--hold', '--postsuper-cmd', '/nonexistent/postsuper'))
+        fake = join(self.parentdir(__file__), 'fake_postsuper.py')
+        self.assertEqual(1, self._run('--hold', '--postsuper-cmd', f'{sys.executable} {fake} {os.devnull} 3'))
+        self.assertEqual(1, self._run('--postqueue', '--postqueue-cmd', '/nonexistent/postqueue'))
@@ -0,0 +1,92 @@
+# Copyright © 2022 Ralph Seichter
+#
+# This file is part of PostQF.
+#
+# PostQF is free software: you can redistribute it and/or modify it under the terms of the GNU
+# General Public License as published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# PostQF is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without
+# even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with PostQF.
+# If not, see <https://www.gnu.org/licenses/>.
+import bz2
+import gzip
+import lzma
+import shutil
+import struct
+import tempfile
+import zlib
+from os.path import join
+from unittest.mock import patch
+
+from postqf.compress import compression
+from postqf.compress import gzip_members
+from postqf.compress import member_ranges
+from postqf.parallel import split_file
+from postqf.source import FileSource
+from tests import PostqfTestCase
+
+
+def _bgzf_block(data: bytes) -> bytes:
+    """Compress data into a single BGZF block, as written by "bgzip"."""
+    c = zlib.compressobj(6, zlib.DEFLATED, -15)
+    deflated = c.compress(data) + c.flush()
+    header = b'\x1f\x8b\x08\x04' + bytes(6) + struct.pack('<HBBHH', 6, ord('B'), ord('C'), 2, len(deflated) + 25)
+    return header + deflated + struct.pack('<II', zlib.crc32(data), len(data))
+
+
+class TestCompress(PostqfTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.tmpdir = tempfile.mkdtemp()
+        with open(join(self.parentdir(__file__), 'qdata'), 'rb') as f:
+            self.data = f.read()
+        self.lines = self.data.splitlines(keepends=True)
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.tmpdir)
+        super().tearDown()
+
+    def _write(self, name: str, data: bytes) -> str:
+        path = join(self.tmpdir, name)
+        with open(path, 'wb') as f:
+            f.write(data)
+        return path
+
+    def _read(self, path: str, jobs: int = 1) -> list:
+        source = FileSource(path, jobs)
+        lines = list(source.open())
+        source.close()
+        return lines
+
+    def test_compression(self):
+        self.assertEqual('gzip', compression(gzip.compress(b'x')))
+        self.assertEqual('bzip2', compression(bz2.compress(b'x')))
+        self.assertEqual('xz', compression(lzma.compress(b'x')))
+        self.assertIsNone(compression(b'{"queue_name": "x"}'))
+        self.assertIsNone(compression(b''))
+
+    def test_formats(self):
+        for name, compress in [('gz', gzip.compress), ('bz2', bz2.compress), ('xz', lzma.compress)]:
+            path = self._write(f'qdata.{name}', compress(self.data))
+            self.assertEqual(self.lines, self._read(path), name)
+            self.assertEqual([(path, 0, -1)], split_file(path, 4))
+
+    def test_multi_member(self):
+        path = self._write('multi.gz', gzip.compress(self.data[:1000]) + gzip.compress(self.data[1000:]))
+        self.assertIsNone(gzip_members(path))
+        self.assertEqual(self.lines, self._read(path, jobs=2))
+
+    def test_bgzf(self):
+        blocks = [_bgzf_block(self.data[i:i + 1000]) for i in range(0, len(self.data), 1000)] + [_bgzf_block(b'')]
+        path = self._write('qdata.bgz', b''.join(blocks))
+        members = gzip_members(path)
+        self.assertEqual([len(b) for b in blocks], [size for _, size in members])
+        self.assertEqual(1, len(member_ranges(members)))
+        self.assertEqual(len(blocks), len(member_ranges(members, chunk=1)))
+        self.assertEqual(self.lines, self._read(path))
+        with patch('postqf.compress.MEMBER_CHUNK_SIZE', 1000):
+            self.assertEqual(self.lines, self._read(path, jobs=2))
@@ -102,3 +102,33 @@ class TestInterval(TestCase):
     def test_upper_iso(self):
         t = datetime.fromisoformat('2022-01-23')
         self.assertTrue(Interval(before='2022-01-24').includes(t))
+
+    def test_inactive(self):
+        i = Interval()
+        self.assertFalse(i.active)
+        self.assertTrue(i.includes_epoch(0))
+
+    def test_epoch_boundaries(self):
+        i = Interval(after='1642923000', before='1642956300')
+        self.assertTrue(i.active)
+        self.assertEqual((1642923000, 1642956300), (i.after_epoch, i.before_epoch))
+        self.assertFalse(i.includes_epoch(1642923000))
+        self.assertTrue(i.includes_epoch(1642923001))
+        self.assertTrue(i.includes_epoch(1642956299))
+        self.assertFalse(i.includes_epoch(1642956300))
+
+    def test_to_seconds(self):
+        self.assertEqual(90, Interval.to_seconds('90'))
+        self.assertEqual(900, Interval.to_seconds('15m'))
+        self.assertEqual(7200, Interval.to_seconds('2H'))
+        self.assertEqual(86400, Interval.to_seconds('day'))
+        for invalid in ['', '0', 'm', '1w', 'week']:
+            self.assertRaises(ValueError, Interval.to_seconds, invalid)
+
+    def test_epoch_matches_datetime(self):
+        i = Interval(after='90m', before='2022-01-24T18:45')
+        for t in range(_epoch(i.before) - 5, _epoch(i.before) + 5):
+            self.assertEqual(i.includes(datetime.fromtimestamp(t)), i.includes_epoch(t))
+        i = Interval(after='90m')
+        for t in range(_epoch(i.after) - 5, _epoch(i.after) + 5):
+            self.assertEqual(i.includes(datetime.fromtimestamp(t)), i.includes_epoch(t))
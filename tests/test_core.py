@@ -18,16 +18,21 @@ import tempfile
 from argparse import Namespace
 from os.path import join
 from tempfile import NamedTemporaryFile
+from unittest.mock import patch
 
 from postqf.config import cf
 from postqf.core import close_file
 from postqf.core import count_rcpt
+from postqf.core import encode_output
 from postqf.core import format_output
 from postqf.core import generate_report
+from postqf.core import generate_top_report
 from postqf.core import open_file
 from postqf.core import process_files
 from postqf.core import queue_name
 from postqf.core import report_dict
+from postqf.core import reports
+from postqf.topn import SpaceSaving
 from tests import PostqfTestCase
 
 
@@ -105,6 +110,59 @@ class Test(PostqfTestCase):
         cf.report_sender = True
         self.assertTrue(self._process())
 
+    def test_process_prefiltered(self):
+        self.config_re('qname_re', 'hold')
+        self.assertEqual(b'', self._output())
+        self.config_re('qname_re', 'active')
+        self.config_re('sender_re', 'fummo')
+        self.assertEqual(2, len(self._output().splitlines()))
+
+    def test_process_passthrough(self):
+        with open(self.qdata, 'rb') as f:
+            self.assertEqual(f.read(), self._output())
+
+    def test_encode_output(self):
+        d = {'x': 'y', 'queue_id': 'abc'}
+        self.assertEqual(b'{"x": "y", "queue_id": "abc"}\n', encode_output(d))
+        self.assertEqual(b'{"x":"y"}\n', encode_output(d, b'{"x":"y"}'))
+        self.assertEqual(b'{"x":"y"}\r\n', encode_output(d, b'{"x":"y"}\r\n'))
+        cf.queue_id = True
+        self.assertEqual(b'abc\n', encode_output(d, b'{"x":"y"}\n'))
+
+    def test_process_top(self):
+        cf.report_rdom = True
+        cf.top = 2
+        self.assertEqual(b'2 0 example.org\n95 0 example.com\n', self._output())
+
+    def test_gen_top_report(self):
+        s = SpaceSaving(10)
+        for key in 'abbccc':
+            s.add(key)
+        with NamedTemporaryFile('wt', delete=False) as outfile:
+            generate_top_report(s, 2, outfile)
+            outfile.close()
+            with open(outfile.name, 'rt') as infile:
+                self.assertEqual('2 0 b\n3 0 c\n', infile.read())
+        os.unlink(outfile.name)
+
+    def test_process_multiple_reports(self):
+        cf.report_rdom = True
+        cf.report_sdom = True
+        self.assertEqual(b'# rdom\n1 9gmail.com\n2 example.org\n95 example.com\n# sdom\n5 example.org\n',
+                         self._output())
+
+    def test_process_records_and_report(self):
+        cf.queue_id = True
+        cf.report_sdom = True
+        lines = self._output().splitlines()
+        self.assertEqual(7, len(lines))
+        self.assertEqual([b'# sdom', b'5 example.org'], lines[-2:])
+
+    def _output(self) -> bytes:
+        report_dict.clear()
+        cf.infile = [self.qdata]
+        return super()._output()
+
     def _process(self) -> bool:
         tmp = NamedTemporaryFile(delete=False)
         tmp.close()
@@ -113,3 +171,14 @@ class Test(PostqfTestCase):
         r = process_files()
         os.unlink(tmp.name)
         return r
+
+    def test_process_parallel(self):
+        cf.report_rdom = True
+        cf.report_sender = True
+        self._process()
+        expected = {name: dict(counter) for name, counter in reports.items()}
+        cf.jobs = 2
+        with patch('postqf.parallel.MIN_CHUNK_SIZE', 1024):
+            self.assertTrue(self._process())
+        self.assertEqual(expected, reports)
+        self.assertEqual(list(expected['rdom']), list(reports['rdom']))
@@ -0,0 +1,105 @@
+# Copyright © 2022 Ralph Seichter
+#
+# This file is part of PostQF.
+#
+# PostQF is free software: you can redistribute it and/or modify it under the terms of the GNU
+# General Public License as published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# PostQF is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without
+# even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with PostQF.
+# If not, see <https://www.gnu.org/licenses/>.
+import os
+import sys
+import threading
+from contextlib import redirect_stderr
+from io import StringIO
+from os.path import join
+from tempfile import TemporaryDirectory
+
+from postqf import daemon
+from postqf.client import decode_status
+from postqf.client import encode_status
+from postqf.client import query
+from postqf.daemon import QueryHandler
+from postqf.daemon import QueryServer
+from postqf.daemon import Snapshot
+from postqf.daemon import answer
+from postqf.daemon import refresh
+from postqf.logstuff import log
+from tests import PostqfTestCase
+
+
+class TestDaemon(PostqfTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.qdata = join(self.parentdir(__file__), 'qdata')
+        self.assertTrue(refresh(self.qdata))
+
+    def tearDown(self) -> None:
+        daemon.snapshot = None
+        super().tearDown()
+
+    def test_snapshot(self):
+        self.assertEqual(5, daemon.snapshot.records)
+        self.assertEqual(2, Snapshot(b'{}\n{}', 0).records)
+        self.assertEqual(0, Snapshot(b'', 0).records)
+
+    def test_refresh_swap(self):
+        old = daemon.snapshot
+        data = old.data
+        self.assertTrue(refresh(self.qdata))
+        self.assertIsNot(old, daemon.snapshot)
+        self.assertIs(data, old.data)
+        with self.assertLogs(log.name, 'ERROR'):
+            self.assertFalse(refresh(join(self.parentdir(__file__), 'missing')))
+        self.assertEqual(5, daemon.snapshot.records)
+
+    def test_refresh_command(self):
+        command = f'{sys.executable} {join(self.parentdir(__file__), "fake_postqueue.py")}'
+        self.assertTrue(refresh(command=f'{command} 2'))
+        self.assertEqual(10, daemon.snapshot.records)
+        with self.assertLogs(log.name, 'ERROR'):
+            self.assertFalse(refresh(command=f'{command} 1 1'))
+        self.assertEqual(10, daemon.snapshot.records)
+
+    def test_answer(self):
+        status, message, output = answer(['-s', 'fummo', '--id'], daemon.snapshot)
+        self.assertEqual((0, ''), (status, message))
+        self.assertEqual(b'4Jgt2V6BKNz1xy5\n4Jgt2V6Twsz1y0d\n', output)
+        self.assertEqual(2, answer(['--delete'], daemon.snapshot)[0])
+        with TemporaryDirectory() as tmp:
+            victim = join(tmp, 'victim')
+            for argv in [['--rdom', '--stats-file', victim], ['--stats'], ['--rcpt-file', victim],
+                         ['--sender-file', victim]]:
+                self.assertEqual(2, answer(argv, daemon.snapshot)[0], argv)
+            self.assertFalse(os.path.exists(victim))
+        self.assertEqual(1, answer(['--id'], None)[0])
+
+    def test_status_line(self):
+        self.assertEqual((2, 'No such thing'), decode_status(encode_status(2, 'No such thing')))
+        self.assertEqual((0, ''), decode_status(encode_status(0)))
+
+    def test_query(self):
+        with TemporaryDirectory() as tmp:
+            path = join(tmp, 'postqf.sock')
+            out = join(tmp, 'out')
+            with QueryServer(path, QueryHandler) as server:
+                thread = threading.Thread(target=server.serve_forever)
+                thread.start()
+                try:
+                    self.assertEqual(0, query(path, ['--sdom'], out))
+                    with open(out, 'rb') as f:
+                        self.assertEqual(b'5 example.org\n', f.read())
+                    self.assertEqual(0, query(path, ['-q', 'deferred'], out))
+                    self.assertEqual(0, os.path.getsize(out))
+                finally:
+                    server.shutdown()
+                    thread.join()
+            self.assertFalse(os.path.exists(path))
+            with redirect_stderr(StringIO()) as err:
+                self.assertEqual(1, query(path, ['--sdom'], out))
+            self.assertIn('Cannot query daemon', err.getvalue())
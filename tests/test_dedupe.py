@@ -0,0 +1,52 @@
+# Copyright © 2022 Ralph Seichter
+#
+# This file is part of PostQF.
+#
+# PostQF is free software: you can redistribute it and/or modify it under the terms of the GNU
+# General Public License as published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# PostQF is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without
+# even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with PostQF.
+# If not, see <https://www.gnu.org/licenses/>.
+from argparse import Namespace
+from os.path import join
+
+from postqf.config import cf
+from postqf.dedupe import FingerprintSet
+from tests import PostqfTestCase
+
+
+class TestDedupe(PostqfTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        cf.refresh(Namespace(qname=None, rcpt=None, sender=None, reason=None))
+        self.qdata = join(self.parentdir(__file__), 'qdata')
+
+    def test_fingerprint_set(self):
+        s = FingerprintSet(capacity=8)
+        keys = [f'4Jgt{i:011d}' for i in range(1000)]
+        self.assertTrue(all(s.add(k) for k in keys))
+        self.assertFalse(any(s.add(k) for k in keys))
+        self.assertEqual(1000, len(s))
+        self.assertIn(keys[500], s)
+        self.assertNotIn('missing', s)
+        self.assertGreaterEqual(len(s.table), 1000 * 4 // 3)
+
+    def test_unique_ids(self):
+        cf.infile = [self.qdata, self.qdata]
+        cf.queue_id = True
+        self.assertEqual(10, len(self._output().splitlines()))
+        cf.unique = True
+        ids = self._output().splitlines()
+        self.assertEqual(5, len(ids))
+        self.assertEqual(5, len(set(ids)))
+
+    def test_unique_report(self):
+        cf.infile = [self.qdata, self.qdata]
+        cf.report_sdom = True
+        cf.unique = True
+        self.assertEqual(b'5 example.org\n', self._output())
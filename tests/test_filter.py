@@ -12,16 +12,26 @@
 #
 # You should have received a copy of the GNU General Public License along with PostQF.
 # If not, see <https://www.gnu.org/licenses/>.
+import json
 import logging
 import re
+from argparse import Namespace
+from os.path import join
 
+from postqf.config import Config
 from postqf.config import Interval
 from postqf.config import cf
 from postqf.filter import arrival_match
+from postqf.filter import compile_filter
+from postqf.filter import filter_checks
+from postqf.filter import compile_prefilter
+from postqf.filter import literal_re
 from postqf.filter import rcpt_match
 from postqf.filter import reason_match
+from postqf.filter import required_literal
 from postqf.filter import str_match
 from postqf.logstuff import level_from_str
+from postqf.logstuff import log
 from tests import PostqfTestCase
 
 
@@ -74,6 +84,134 @@ class TestRcpt(PostqfTestCase):
         self.config_re('reason_re', '.')
         self.assertTrue(reason_match(r))
 
+    def test_reason_normalized(self):
+        self.config_re('reason_re', r'^connect to <host>\[<ip>\]:25:')
+        self.assertFalse(reason_match(self.recipients()))
+        cf.normalize_reasons = True
+        try:
+            self.assertTrue(reason_match(self.recipients()))
+        finally:
+            cf.normalize_reasons = False
+
     def test_rcpt_mismatch(self):
         self.config_re('rcpt_re', r'@example\.edu')
         self.assertFalse(rcpt_match(self.recipients()))
+
+
+class TestPrefilter(PostqfTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        with open(join(self.parentdir(__file__), 'qdata'), 'rb') as f:
+            self.lines = f.readlines()
+
+    @staticmethod
+    def _config(**kwargs) -> Config:
+        c = Config()
+        c.refresh(Namespace(qname=kwargs.get('qname'), rcpt=kwargs.get('rcpt'), reason=kwargs.get('reason'),
+                            sender=kwargs.get('sender')))
+        return c
+
+    def test_required_literal(self):
+        cases = {
+            '.': '',
+            'hold': 'hold',
+            r'^(alice|bob)@gmail\.com$': '',
+            r'@example\.(com|org)$': '',
+            r'@example\.net$': '@example.net',
+            'connection timed out': 'connection timed out',
+            r'ab?cd': 'cd',
+            r'abc*de': 'ab',
+            r'x+yz': 'yz',
+            r'ab{2,3}cd': 'cd',
+            r'[a-z]+@ex[]x]ample': 'ample',
+            r'\d+ over quota': ' over quota',
+            r'foo\x41bar': 'foo',
+            r'a/b/c': 'a',
+            r'mail.example': 'example',
+        }
+        for pattern, literal in cases.items():
+            self.assertEqual(literal, required_literal(pattern), pattern)
+
+    def test_literal_re_case_folding(self):
+        search = literal_re('Kiss').search
+        self.assertTrue(search(b'"KISS"'))
+        self.assertTrue(search('\u212aI\u017fs'.encode()))
+        self.assertFalse(search(b'kis'))
+
+    def test_inactive(self):
+        self.assertIsNone(compile_prefilter(self._config()))
+
+    def test_unicode_escape(self):
+        prefilter = compile_prefilter(self._config(sender='alice'))
+        self.assertTrue(prefilter(b'{"sender": "\\u0061lice"}'))
+        self.assertFalse(prefilter(b'{"sender": "bob"}'))
+
+    def test_equivalence(self):
+        filters = [
+            {'qname': 'active'},
+            {'qname': 'hold'},
+            {'qname': '^act'},
+            {'sender': 'fummo'},
+            {'sender': r'@example\.org$'},
+            {'rcpt': r'@example\.com'},
+            {'rcpt': 'nobody'},
+            {'reason': 'Unverified Client'},
+            {'reason': 'over quota', 'qname': 'active'},
+        ]
+        for kwargs in filters:
+            c = self._config(**kwargs)
+            prefilter = compile_prefilter(c)
+            for line in self.lines:
+                data = json.loads(line)
+                match = (str_match(c.qname_re, data['queue_name']) and
+                         str_match(c.sender_re, data['sender']) and
+                         any(c.rcpt_re.search(r['address']) for r in data['recipients']) and
+                         any(c.reason_re.search(r.get('delay_reason', '')) for r in data['recipients']))
+                if match:
+                    self.assertTrue(prefilter(line), kwargs)
+                elif 'qname' in kwargs and not str_match(c.qname_re, data['queue_name']):
+                    self.assertFalse(prefilter(line), kwargs)
+
+
+class TestCompiledFilter(PostqfTestCase):
+    @staticmethod
+    def _config(**kwargs) -> Config:
+        c = Config()
+        c.refresh(Namespace(qname=kwargs.get('qname'), rcpt=kwargs.get('rcpt'), reason=kwargs.get('reason'),
+                            sender=kwargs.get('sender'), after=kwargs.get('after'),
+                            before=kwargs.get('before')))
+        return c
+
+    def test_inactive(self):
+        checks = filter_checks(self._config())
+        self.assertEqual(['qname'], [name for name, _ in checks])
+        match = compile_filter(self._config())
+        self.assertTrue(match(self.data))
+        self.assertTrue(match(dict(self.data, sender='')))
+        self.assertFalse(match({}))
+
+    def test_order(self):
+        c = self._config(qname='deferred', rcpt='example', reason='quota', sender='alice', after='2022-01-01')
+        self.assertEqual(['qname', 'arrival', 'sender', 'rcpt', 'reason'], [name for name, _ in filter_checks(c)])
+        self.assertTrue(compile_filter(c)(self.data))
+
+    def test_mismatch(self):
+        for kwargs in [{'qname': 'hold'}, {'sender': 'bob'}, {'rcpt': 'nobody'}, {'reason': 'gone mad'},
+                       {'after': '1h'}, {'before': '2022-01-01'}, {'after': '2022-01-01', 'before': '2022-01-02'}]:
+            self.assertFalse(compile_filter(self._config(**kwargs))(self.data), kwargs)
+
+    def test_normalized_reason(self):
+        c = self._config(reason=r'<host>\[<ip>\]')
+        self.assertFalse(compile_filter(c)(self.data))
+        c.normalize_reasons = True
+        self.assertTrue(compile_filter(c)(self.data))
+        self.assertIsNone(compile_prefilter(c))
+
+    def test_logged(self):
+        level = log.level
+        log.setLevel(logging.DEBUG)
+        try:
+            with self.assertLogs(log.name, logging.DEBUG):
+                self.assertFalse(compile_filter(self._config(sender='bob'))(self.data))
+        finally:
+            log.setLevel(level)
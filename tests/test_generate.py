@@ -0,0 +1,38 @@
+# Copyright © 2022 Ralph Seichter
+#
+# This file is part of PostQF.
+#
+# PostQF is free software: you can redistribute it and/or modify it under the terms of the GNU
+# General Public License as published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# PostQF is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without
+# even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with PostQF.
+# If not, see <https://www.gnu.org/licenses/>.
+import json
+
+from tests import PostqfTestCase
+from tests.generate import generate
+from tests.generate import parse_mix
+
+
+class TestGenerate(PostqfTestCase):
+    def test_parse_mix(self):
+        self.assertEqual({'deferred': 70, 'hold': 1}, parse_mix('deferred=70, hold'))
+
+    def test_deterministic(self):
+        self.assertEqual(list(generate(50, seed=3)), list(generate(50, seed=3)))
+        self.assertNotEqual(list(generate(50, seed=3)), list(generate(50, seed=4)))
+
+    def test_records(self):
+        records = [json.loads(line) for line in generate(200, rcpts=2, variety=5, queues='hold=1,deferred=1')]
+        self.assertEqual(200, len(records))
+        self.assertEqual({'hold', 'deferred'}, {r['queue_name'] for r in records})
+        self.assertTrue(all(1 <= len(r['recipients']) <= 2 for r in records))
+        reasons = {x['delay_reason'] for r in records for x in r['recipients'] if 'delay_reason' in x}
+        self.assertLessEqual(len(reasons), 5)
+        deferred = [r for r in records if r['queue_name'] == 'deferred']
+        self.assertTrue(all(r['recipients'][0].get('delay_reason') for r in deferred))
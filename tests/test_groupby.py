@@ -0,0 +1,73 @@
+# Copyright © 2022 Ralph Seichter
+#
+# This file is part of PostQF.
+#
+# PostQF is free software: you can redistribute it and/or modify it under the terms of the GNU
+# General Public License as published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# PostQF is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without
+# even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with PostQF.
+# If not, see <https://www.gnu.org/licenses/>.
+import sys
+from argparse import Namespace
+from io import StringIO
+from os.path import join
+
+from postqf.config import cf
+from postqf.groupby import count_group
+from postqf.groupby import domain
+from postqf.groupby import generate_group_report
+from postqf.groupby import parse_fields
+from postqf.topn import ExactCounter
+from postqf.topn import SpaceSaving
+from tests import PostqfTestCase
+
+
+class TestGroupBy(PostqfTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        cf.refresh(Namespace(qname=None, rcpt=None, sender=None, reason=None))
+        self.qdata = join(self.parentdir(__file__), 'qdata')
+
+    def test_parse_fields(self):
+        self.assertEqual(('queue', 'rdom', 'reason'), parse_fields('queue, RDOM,reason'))
+        self.assertRaises(ValueError, parse_fields, 'queue,domain')
+
+    def test_domain(self):
+        self.assertEqual('example.com', domain('Alice@Example.COM'))
+        self.assertEqual('', domain('MAILER-DAEMON'))
+
+    def test_message_fields(self):
+        counter = ExactCounter()
+        count_group(self.data, ('queue', 'sdom'), counter)
+        count_group(dict(self.data, sender=''), ('queue', 'sdom'), counter)
+        self.assertEqual({('deferred', 'example.org'): 1, ('deferred', ''): 1}, counter)
+
+    def test_rcpt_fields(self):
+        counter = ExactCounter()
+        count_group(self.data, ('sdom', 'rdom'), counter)
+        self.assertEqual(len(self.data['recipients']), sum(counter.values()))
+        for sdom, rdom in counter:
+            self.assertEqual('example.org', sdom)
+            self.assertIs(sys.intern(rdom), rdom)
+
+    def test_generate(self):
+        out = StringIO()
+        generate_group_report(ExactCounter({('a', 'x'): 3, ('b', ''): 1}), 0, out)
+        self.assertEqual('1\tb\t\n3\ta\tx\n', out.getvalue())
+        counter = SpaceSaving(4)
+        counter.add(('a', 'x'), 3)
+        counter.add(('b', 'y'))
+        out = StringIO()
+        generate_group_report(counter, 1, out)
+        self.assertEqual('3\t0\ta\tx\n', out.getvalue())
+
+    def test_report(self):
+        cf.infile = [self.qdata]
+        cf.report_group = ('queue', 'rdom')
+        cf.sender_re = cf.re_compile('fummo')
+        self.assertEqual(b'95\tactive\texample.com\n', self._output())
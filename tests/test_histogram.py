@@ -0,0 +1,67 @@
+# Copyright © 2022 Ralph Seichter
+#
+# This file is part of PostQF.
+#
+# PostQF is free software: you can redistribute it and/or modify it under the terms of the GNU
+# General Public License as published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# PostQF is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without
+# even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with PostQF.
+# If not, see <https://www.gnu.org/licenses/>.
+from argparse import Namespace
+from io import StringIO
+from os.path import join
+
+from postqf.config import cf
+from postqf.histogram import bucket_start
+from postqf.histogram import count_arrival
+from postqf.histogram import generate_histogram
+from postqf.topn import ExactCounter
+from tests import PostqfTestCase
+
+
+class TestHistogram(PostqfTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        cf.refresh(Namespace(qname=None, rcpt=None, sender=None, reason=None))
+        self.qdata = join(self.parentdir(__file__), 'qdata')
+
+    def test_bucket_start(self):
+        self.assertEqual(1642845600, bucket_start(1642847778, 3600))
+        self.assertEqual(1642845600, bucket_start(1642845600, 3600))
+        self.assertEqual(1642809600, bucket_start(1642847778, 86400))
+
+    def test_count_reason(self):
+        counter = ExactCounter()
+        count_arrival(self.data, 60, 'reason', counter)
+        self.assertEqual(len(self.data['recipients']), sum(counter.values()))
+        self.assertEqual({1642751520}, {bucket for bucket, _ in counter})
+        count_arrival(dict(self.data, recipients=[]), 60, 'reason', counter)
+        count_arrival({'queue_name': 'active'}, 60, None, counter)
+        self.assertEqual(len(self.data['recipients']), sum(counter.values()))
+
+    def test_generate(self):
+        out = StringIO()
+        generate_histogram({(86400, 'deferred'): 2, (0, 'active'): 1, (0, 'deferred'): 3}, out)
+        self.assertEqual('1970-01-01T00:00:00Z 1 active\n1970-01-01T00:00:00Z 3 deferred\n'
+                         '1970-01-02T00:00:00Z 2 deferred\n', out.getvalue())
+
+    def test_report(self):
+        cf.infile = [self.qdata]
+        cf.report_histogram = 3600
+        self.assertEqual(b'2022-01-20T10:00:00Z 1\n2022-01-22T10:00:00Z 2\n2022-01-22T11:00:00Z 2\n',
+                         self._output())
+        cf.histogram_by = 'queue'
+        cf.report_sdom = True
+        self.assertEqual(b'# histogram\n2022-01-20T10:00:00Z 1 active\n2022-01-22T10:00:00Z 2 active\n'
+                         b'2022-01-22T11:00:00Z 2 active\n# sdom\n5 example.org\n', self._output())
+
+    def test_report_top(self):
+        cf.infile = [self.qdata]
+        cf.report_histogram = 86400
+        cf.top = 1
+        self.assertEqual(b'2022-01-20T00:00:00Z 1\n2022-01-22T00:00:00Z 4\n', self._output())
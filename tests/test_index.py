@@ -0,0 +1,116 @@
+# Copyright © 2022 Ralph Seichter
+#
+# This file is part of PostQF.
+#
+# PostQF is free software: you can redistribute it and/or modify it under the terms of the GNU
+# General Public License as published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# PostQF is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without
+# even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with PostQF.
+# If not, see <https://www.gnu.org/licenses/>.
+import shutil
+import sqlite3
+import tempfile
+from argparse import Namespace
+from os.path import join
+
+from postqf.config import Config
+from postqf.config import cf
+from postqf.index import Index
+from postqf.index import read_lines
+from postqf.index import update_files
+from postqf.source import IndexedFileSource
+from tests import PostqfTestCase
+
+
+class TestIndex(PostqfTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.tmpdir = tempfile.mkdtemp()
+        self.db = join(self.tmpdir, 'index.db')
+        self.snapshot = join(self.tmpdir, 'snapshot.json')
+        shutil.copy(join(self.parentdir(__file__), 'qdata'), self.snapshot)
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.tmpdir)
+        super().tearDown()
+
+    @staticmethod
+    def _config(**kwargs) -> Config:
+        c = Config()
+        c.refresh(Namespace(qname=kwargs.get('qname'), rcpt=kwargs.get('rcpt'), reason=kwargs.get('reason'),
+                            sender=kwargs.get('sender'), after=kwargs.get('after'), before=kwargs.get('before')))
+        return c
+
+    def test_schema_version(self):
+        conn = sqlite3.connect(self.db)
+        conn.execute('CREATE TABLE records (file_id INTEGER, unused TEXT)')
+        conn.commit()
+        conn.close()
+        index = Index(self.db)
+        self.assertEqual(5, index.update(self.snapshot)[1])
+        index.close()
+        index = Index(self.db)
+        self.assertEqual(-1, index.update(self.snapshot)[1])
+        index.close()
+
+    def test_incremental(self):
+        index = Index(self.db)
+        file_id, count = index.update(self.snapshot)
+        self.assertEqual(5, count)
+        self.assertEqual((file_id, -1), index.update(self.snapshot))
+        with open(self.snapshot, 'rb') as f:
+            line = f.readline()
+        with open(self.snapshot, 'ab') as f:
+            f.write(line)
+        self.assertIsNone(index.file_id(self.snapshot))
+        _, count = index.update(self.snapshot)
+        self.assertEqual(6, count)
+        self.assertEqual(6, index.conn.execute('SELECT COUNT(*) FROM records').fetchone()[0])
+        index.close()
+
+    def test_offsets(self):
+        index = Index(self.db)
+        file_id, _ = index.update(self.snapshot)
+        self.assertEqual(5, len(index.offsets(file_id, self._config())))
+        self.assertEqual(0, len(index.offsets(file_id, self._config(qname='hold'))))
+        self.assertEqual(2, len(index.offsets(file_id, self._config(sender='fummo'))))
+        self.assertEqual(1, len(index.offsets(file_id, self._config(rcpt='^vranka85@'))))
+        self.assertEqual(2, len(index.offsets(file_id, self._config(reason='Unverified'))))
+        self.assertEqual(4, len(index.offsets(file_id, self._config(after='1642800000'))))
+        self.assertEqual(1, len(index.offsets(file_id, self._config(before='1642800000'))))
+        config = self._config(reason=r'<host>\[<ip>\]')
+        self.assertEqual(0, len(index.offsets(file_id, config)))
+        config.normalize_reasons = True
+        self.assertEqual(2, len(index.offsets(file_id, config)))
+        offsets = index.offsets(file_id, self._config(sender='heidschnucke'))
+        index.close()
+        lines = list(read_lines(self.snapshot, offsets))
+        self.assertEqual(1, len(lines))
+        self.assertIn(b'heidschnucke70@example.org', lines[0])
+
+    def test_update_files(self):
+        self.assertTrue(update_files(self.db, [self.snapshot]))
+        self.assertFalse(update_files(self.db, [join(self.tmpdir, 'missing')]))
+
+    def test_fallback(self):
+        with open(self.snapshot, 'ab') as f:
+            f.write(b'invalid\n')
+        source = IndexedFileSource(self.snapshot, self.db, self._config())
+        self.assertEqual(6, len(list(source.open())))
+        source.close()
+
+    def test_process_files(self):
+        cf.refresh(Namespace(qname=None, rcpt=None, sender=None, reason=None))
+        cf.infile = [self.snapshot]
+        cf.queue_id = True
+        for regex in ['fummo', 'nobody', '.']:
+            self.config_re('sender_re', regex)
+            cf.index = None
+            expected = self._output()
+            cf.index = self.db
+            self.assertEqual(expected, self._output(), regex)
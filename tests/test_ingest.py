@@ -0,0 +1,169 @@
+# Copyright © 2022 Ralph Seichter
+#
+# This file is part of PostQF.
+#
+# PostQF is free software: you can redistribute it and/or modify it under the terms of the GNU
+# General Public License as published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# PostQF is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without
+# even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with PostQF.
+# If not, see <https://www.gnu.org/licenses/>.
+import json
+import os
+import shutil
+import tempfile
+import subprocess
+import sys
+import threading
+import time
+import unittest
+from argparse import Namespace
+from os.path import join
+from tempfile import NamedTemporaryFile
+from typing import Optional
+
+from postqf.config import cf
+from postqf.core import TaggedOutput
+from postqf.ingest import ingest
+from tests import PostqfTestCase
+
+
+def _write_fifo(path: str, lines: list, gate: Optional[threading.Event] = None) -> None:
+    """Write lines to a named pipe. If a gate is given, only the first line is
+    written before waiting for the gate to open."""
+    try:
+        with open(path, 'wb') as f:
+            for i, line in enumerate(lines):
+                if i == 1 and gate is not None:
+                    gate.wait(10)
+                f.write(line)
+                f.flush()
+    except BrokenPipeError:
+        pass
+
+
+@unittest.skipUnless(hasattr(os, 'mkfifo'), 'Named pipes are not supported')
+class TestIngest(PostqfTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        cf.refresh(Namespace(qname=None, rcpt=None, sender=None, reason=None))
+        self.qdata = join(self.parentdir(__file__), 'qdata')
+        with open(self.qdata, 'rb') as f:
+            self.lines = f.readlines()
+        self.tmpdir = tempfile.mkdtemp()
+        self.fifos = [join(self.tmpdir, f'fifo{i}') for i in range(2)]
+        for fifo in self.fifos:
+            os.mkfifo(fifo)
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.tmpdir)
+        super().tearDown()
+
+    def _writers(self, gates: list, lines: Optional[list] = None) -> list:
+        threads = [threading.Thread(target=_write_fifo, args=(fifo, lines or self.lines, gate), daemon=True)
+                   for fifo, gate in zip(self.fifos, gates)]
+        for t in threads:
+            t.start()
+        return threads
+
+    def _join(self, threads: list) -> None:
+        """Wait for writer threads to finish, draining the named pipes meanwhile
+        so that writers are neither blocked in open() nor in write()."""
+        readers = [os.open(fifo, os.O_RDONLY | os.O_NONBLOCK) for fifo in self.fifos]
+        try:
+            deadline = time.monotonic() + 30
+            for t in threads:
+                while t.is_alive() and time.monotonic() < deadline:
+                    for fd in readers:
+                        try:
+                            os.read(fd, 65536)
+                        except BlockingIOError:
+                            pass
+                    t.join(0.01)
+                self.assertFalse(t.is_alive(), 'Writer thread did not finish')
+        finally:
+            for fd in readers:
+                os.close(fd)
+
+    def test_tagged_output(self):
+        with NamedTemporaryFile() as tmp:
+            out = TaggedOutput(tmp, 'a "b"')
+            out.write(b'{"queue_id": "x"}\n')
+            out.write(b'{ "queue_id": "y" }\n')
+            tmp.seek(0)
+            records = [json.loads(line) for line in tmp]
+        self.assertEqual([{'source': 'a "b"', 'queue_id': 'x'}, {'source': 'a "b"', 'queue_id': 'y'}], records)
+
+    def test_ingest(self):
+        batches = []
+        others = self.fifos[1:] + [self.qdata]
+        # The first pipe stalls until all other inputs have been passed on.
+        others_done = threading.Event()
+
+        def handle(name: str, lines: list) -> bool:
+            batches.append((name, lines))
+            if all(sum(len(b) for n, b in batches if n == path) == len(self.lines) for path in others):
+                others_done.set()
+            return True
+
+        threads = self._writers([others_done, None])
+        self.assertTrue(ingest(self.fifos + [self.qdata], handle, lambda: False))
+        for t in threads:
+            t.join()
+        self.assertTrue(others_done.is_set())
+        for path in self.fifos + [self.qdata]:
+            self.assertEqual(self.lines, [line for name, lines in batches if name == path for line in lines])
+        self.assertEqual(self.fifos[0], batches[-1][0])
+
+    def test_process_files(self):
+        threads = self._writers([None, None])
+        cf.infile = self.fifos + [self.qdata]
+        cf.concurrent = True
+        cf.report_sdom = True
+        cf.records = True
+        output = self._output()
+        for t in threads:
+            t.join()
+        records = [json.loads(line) for line in output.splitlines()[:-2]]
+        self.assertEqual(15, len(records))
+        self.assertEqual(5, sum(1 for r in records if r['source'] == self.fifos[1]))
+        self.assertEqual([b'# sdom', b'15 example.org'], output.splitlines()[-2:])
+
+    def test_limit(self):
+        cf.infile = [self.qdata] + self.fifos
+        cf.concurrent = True
+        cf.queue_id = True
+        cf.limit = 3
+        fds = len(os.listdir('/proc/self/fd')) if os.path.isdir('/proc/self/fd') else None
+        # The named pipes are never opened by a writer.
+        self.assertEqual(3, len(self._output().splitlines()))
+        if fds is not None:
+            self.assertEqual(fds, len(os.listdir('/proc/self/fd')))
+
+    def test_limit_live_inputs(self):
+        files = [join(self.tmpdir, f'queue{i}.json') for i in range(3)]
+        for path in files:
+            with open(path, 'wb') as f:
+                f.writelines(self.lines * 400)
+        threads = self._writers([None, None], self.lines * 400)
+        cf.infile = files + self.fifos
+        cf.concurrent = True
+        cf.queue_id = True
+        cf.limit = 3
+        try:
+            self.assertEqual(3, len(self._output().splitlines()))
+        finally:
+            self._join(threads)
+
+    def test_stdin_file(self):
+        root = self.parentdir(self.parentdir(__file__))
+        env = dict(os.environ, PYTHONPATH=root)
+        with open(self.qdata, 'rb') as stdin:
+            p = subprocess.run([sys.executable, '-m', 'postqf', '--concurrent', '-i', '-', self.qdata], env=env,
+                               stdin=stdin, stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=60)
+        self.assertEqual(b'', p.stderr)
+        self.assertEqual(2 * len(self.lines), len(p.stdout.splitlines()))
@@ -0,0 +1,110 @@
+# Copyright © 2022 Ralph Seichter
+#
+# This file is part of PostQF.
+#
+# PostQF is free software: you can redistribute it and/or modify it under the terms of the GNU
+# General Public License as published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# PostQF is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without
+# even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with PostQF.
+# If not, see <https://www.gnu.org/licenses/>.
+import os
+import subprocess
+import sys
+from argparse import Namespace
+from io import BytesIO
+from os.path import join
+from tempfile import TemporaryDirectory
+
+from postqf.config import cf
+from postqf.core import process_files
+from postqf.output import OutputClosed
+from postqf.output import OutputWriter
+from postqf.source import FileSource
+from tests import PostqfTestCase
+
+
+class CountingFile(BytesIO):
+    def __init__(self) -> None:
+        super().__init__()
+        self.writes = 0
+
+    def write(self, data) -> int:
+        self.writes += 1
+        return super().write(data)
+
+
+class ClosedPipe(BytesIO):
+    def write(self, data) -> int:
+        raise BrokenPipeError
+
+
+class TestOutput(PostqfTestCase):
+    def test_block_buffered(self):
+        file = CountingFile()
+        writer = OutputWriter(file, buffer_size=100)
+        for _ in range(15):
+            writer.write(b'0123456789\n')
+        self.assertEqual(1, file.writes)
+        self.assertEqual(110, len(file.getvalue()))
+        writer.flush()
+        self.assertEqual(2, file.writes)
+        self.assertEqual(165, len(file.getvalue()))
+
+    def test_line_buffered(self):
+        file = CountingFile()
+        writer = OutputWriter(file, line_buffered=True)
+        writer.write(b'partial ')
+        self.assertEqual(0, file.writes)
+        writer.write(b'line\n')
+        self.assertEqual(b'partial line\n', file.getvalue())
+
+    def test_not_a_tty(self):
+        self.assertFalse(OutputWriter(BytesIO()).line_buffered)
+
+    def test_print(self):
+        file = BytesIO()
+        writer = OutputWriter(file)
+        print(42, 'tést', file=writer)
+        writer.flush()
+        self.assertEqual('42 tést\n'.encode('utf-8'), file.getvalue())
+
+    def test_broken_pipe(self):
+        writer = OutputWriter(ClosedPipe())
+        writer.write(b'lost\n')
+        with self.assertRaises(OutputClosed):
+            writer.flush()
+        self.assertTrue(writer.broken)
+        writer.write(b'discarded\n')
+        writer.flush()
+        self.assertEqual(0, len(writer.buffer))
+
+    def test_reader_stops_early(self):
+        root = self.parentdir(self.parentdir(__file__))
+        with open(join(self.parentdir(__file__), 'qdata'), 'rb') as f:
+            data = f.read()
+        with TemporaryDirectory() as tmp:
+            path = join(tmp, 'qdata')
+            with open(path, 'wb') as f:
+                f.write(data * 2000)
+            env = dict(os.environ, PYTHONPATH=root)
+            p = subprocess.Popen([sys.executable, '-m', 'postqf', '--records', path], env=env,
+                                 stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            p.stdout.readline()
+            p.stdout.close()
+            self.assertEqual(0, p.wait())
+            self.assertEqual(b'', p.stderr.read())
+            p.stderr.close()
+
+    def test_kept_on_error(self):
+        cf.refresh(Namespace(qname=None, rcpt=None, sender=None, reason=None))
+        cf.queue_id = True
+        qdata = join(self.parentdir(__file__), 'qdata')
+        output = BytesIO()
+        with TemporaryDirectory() as tmp, self.assertRaises(OSError):
+            process_files([FileSource(qdata), FileSource(join(tmp, 'missing'))], output)
+        self.assertEqual(5, len(output.getvalue().splitlines()))
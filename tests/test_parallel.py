@@ -0,0 +1,75 @@
+# Copyright © 2022 Ralph Seichter
+#
+# This file is part of PostQF.
+#
+# PostQF is free software: you can redistribute it and/or modify it under the terms of the GNU
+# General Public License as published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# PostQF is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without
+# even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with PostQF.
+# If not, see <https://www.gnu.org/licenses/>.
+import os
+from tempfile import NamedTemporaryFile
+from unittest import TestCase
+
+from postqf.parallel import is_regular_file
+from postqf.parallel import map_file
+from postqf.parallel import mapped_lines
+from postqf.parallel import read_range
+from postqf.parallel import run_ordered
+from postqf.parallel import split_file
+
+
+def _square(x: int) -> int:
+    return x * x
+
+
+class TestParallel(TestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.lines = [f'line {i:03d} {"x" * i}\n'.encode() for i in range(50)]
+        with NamedTemporaryFile('wb', delete=False) as tmp:
+            tmp.writelines(self.lines)
+        self.path = tmp.name
+
+    def tearDown(self) -> None:
+        os.unlink(self.path)
+        super().tearDown()
+
+    def test_irregular(self):
+        self.assertFalse(is_regular_file('-'))
+        self.assertEqual([('-', 0, -1)], split_file('-', 4))
+
+    def test_small_file(self):
+        size = os.path.getsize(self.path)
+        self.assertEqual([(self.path, 0, size)], split_file(self.path, 4))
+
+    def test_ranges_cover_all_lines(self):
+        for chunk in [1, 7, 64, 100, 1000]:
+            lines = []
+            for path, start, end in split_file(self.path, 100, min_chunk=chunk):
+                lines.extend(read_range(path, start, end))
+            self.assertEqual(self.lines, lines, f'chunk size {chunk}')
+
+    def test_run_ordered(self):
+        self.assertEqual([x * x for x in range(20)], list(run_ordered(_square, range(20), 2)))
+
+    def test_mapped_lines(self):
+        with open(self.path, 'ab') as f:
+            f.write(b'no newline')
+        with open(self.path, 'rb') as f:
+            expected = f.readlines()
+            with map_file(f) as mm:
+                self.assertEqual(expected, list(mapped_lines(mm)))
+                self.assertEqual(expected[1:3], list(mapped_lines(mm, 1, len(expected[0]) + len(expected[1]) + 1)))
+                self.assertEqual([], list(mapped_lines(mm, len(mm) - 1)))
+
+    def test_empty_file(self):
+        with NamedTemporaryFile('wb') as tmp:
+            with open(tmp.name, 'rb') as f:
+                self.assertIsNone(map_file(f))
+            self.assertEqual([], list(read_range(tmp.name, 0, 0)))
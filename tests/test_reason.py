@@ -0,0 +1,68 @@
+# Copyright © 2022 Ralph Seichter
+#
+# This file is part of PostQF.
+#
+# PostQF is free software: you can redistribute it and/or modify it under the terms of the GNU
+# General Public License as published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# PostQF is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without
+# even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with PostQF.
+# If not, see <https://www.gnu.org/licenses/>.
+import os
+from argparse import Namespace
+from os.path import join
+from tempfile import NamedTemporaryFile
+
+from postqf.config import cf
+from postqf.core import process_files
+from postqf.reason import normalize_reason
+from tests import PostqfTestCase
+
+
+class TestReason(PostqfTestCase):
+    def test_templates(self):
+        cases = {
+            'connect to mail.example.com[1.2.3.4]:25: Connection timed out':
+                'connect to <host>[<ip>]:25: Connection timed out',
+            'connect to mx.example.net[2001:db8::1]:25: Network is unreachable':
+                'connect to <host>[<ip>]:25: Network is unreachable',
+            'host mx.example.net[192.0.2.7] said: 250 2.0.0 Ok: queued as 4Jgt2V6BKNz1xy5':
+                'host <host>[<ip>] said: 250 2.0.0 Ok: queued as <id>',
+            'host mx.example.net[192.0.2.7] said: 552 5.2.2 <bob@example.net>: Mailbox full, size 123456789':
+                'host <host>[<ip>] said: 552 5.2.2 <<address>>: Mailbox full, size <n>',
+            'Time: (Jan 22 12:02:40), Client: (145.2.33.444), Server: (smtp4.example.com).':
+                'Time: (<date> <time>), Client: (<ip>), Server: (<host>).',
+            'Recipient is over quota': 'Recipient is over quota',
+            'delivery temporarily suspended: 450 4.7.1 try again':
+                'delivery temporarily suspended: 450 4.7.1 try again',
+        }
+        for reason, template in cases.items():
+            self.assertEqual(template, normalize_reason(reason), reason)
+
+    def test_cache(self):
+        reason = 'connect to mail.example.com[1.2.3.4]:25: Connection timed out'
+        normalize_reason(reason)
+        hits = normalize_reason.cache_info().hits
+        self.assertIs(normalize_reason(reason), normalize_reason('connect to mx.example.org[5.6.7.8]:25: ' +
+                                                                 'Connection timed out'))
+        self.assertEqual(hits + 1, normalize_reason.cache_info().hits)
+
+    def test_report(self):
+        cf.refresh(Namespace(qname=None, rcpt=None, sender=None, reason=None, normalize_reasons=True,
+                             report_reason=True, infile=[join(self.parentdir(__file__), 'qdata')]))
+        tmp = NamedTemporaryFile(delete=False)
+        tmp.close()
+        cf.outfile = tmp.name
+        try:
+            self.assertTrue(process_files())
+            with open(tmp.name, 'rb') as f:
+                lines = f.read().splitlines()
+        finally:
+            os.unlink(tmp.name)
+            cf.refresh(Namespace(qname=None, rcpt=None, sender=None, reason=None))
+        self.assertEqual(1, len(lines))
+        self.assertTrue(lines[0].startswith(b'19 host <host>[<ip>] said: 450-4.7.1 <<host>>:'))
@@ -0,0 +1,153 @@
+# Copyright © 2022 Ralph Seichter
+#
+# This file is part of PostQF.
+#
+# PostQF is free software: you can redistribute it and/or modify it under the terms of the GNU
+# General Public License as published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# PostQF is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without
+# even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with PostQF.
+# If not, see <https://www.gnu.org/licenses/>.
+import json
+from argparse import Namespace
+from io import StringIO
+from os.path import join
+from tempfile import TemporaryDirectory
+from unittest.mock import patch
+
+from postqf import core
+from postqf.config import cf
+from postqf.groupby import generate_group_report
+from postqf.sample import Reservoir
+from postqf.sample import SquareSums
+from postqf.sample import estimate
+from postqf.sample import line_hash
+from postqf.sample import parse_rate
+from postqf.sample import sample_check
+from postqf.topn import ExactCounter
+from tests import PostqfTestCase
+
+
+class TestSample(PostqfTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        cf.refresh(Namespace(qname=None, rcpt=None, sender=None, reason=None))
+        self.qdata = join(self.parentdir(__file__), 'qdata')
+        with open(self.qdata, 'rb') as f:
+            self.lines = f.readlines()
+
+    def test_parse_rate(self):
+        self.assertEqual(0.01, parse_rate('0.01'))
+        self.assertEqual(1.0, parse_rate('1'))
+        for string in ['0', '-0.5', '1.5', 'half']:
+            with self.assertRaises(ValueError):
+                parse_rate(string)
+
+    def test_hash_uses_queue_id(self):
+        line = json.dumps(self.data).encode('utf-8')
+        changed = json.dumps(dict(self.data, queue_name='active')).encode('utf-8')
+        self.assertEqual(line_hash(line), line_hash(changed))
+        self.assertNotEqual(line_hash(line), line_hash(line, seed=1))
+
+    def test_sample_check(self):
+        lines = [json.dumps(dict(self.data, queue_id=f'{i:015X}')).encode('utf-8') for i in range(10000)]
+        check = sample_check(0.1)
+        sampled = [line for line in lines if check(line)]
+        self.assertTrue(800 < len(sampled) < 1200)
+        self.assertEqual(sampled, [line for line in lines if sample_check(0.1)(line)])
+        self.assertEqual(len(lines), sum(1 for line in lines if sample_check(1)(line)))
+
+    def test_reservoir(self):
+        reservoir = Reservoir(2)
+        reservoir.offer(self.lines)
+        self.assertEqual([self.lines[1], self.lines[2]], reservoir.lines())
+        self.assertEqual(0.4, reservoir.rate())
+        reversed_order = Reservoir(2)
+        reversed_order.offer(reversed(self.lines))
+        self.assertEqual(set(reservoir.lines()), set(reversed_order.lines()))
+        self.assertEqual(1.0, Reservoir(2).rate())
+
+    def test_estimate(self):
+        self.assertEqual((10, 0), estimate(10, 1.0))
+        self.assertEqual((100, 59), estimate(10, 0.1))
+        self.assertEqual((0, 0), estimate(0, 0.5))
+        self.assertEqual((20, 28), estimate(10, 0.5, 100))
+
+    def test_square_sums(self):
+        squares = SquareSums()
+        squares.add({'example.com': 2, 'example.org': 1})
+        squares.add({'example.com': 1})
+        other = SquareSums()
+        other.add({'example.com': 3})
+        squares.merge(other)
+        self.assertEqual({'example.com': 14, 'example.org': 1}, squares)
+        squares.retain({'example.org'})
+        self.assertEqual({'example.org': 1}, squares)
+
+    def test_margin_coverage(self):
+        # Messages with many recipients in the same domain are sampled as a
+        # whole, so the margins must account for the spread between messages.
+        sizes = [1 + (i * 7) % 40 for i in range(400)]
+        lines = [json.dumps(dict(self.data, queue_id=f'{i:015X}')).encode('utf-8') for i in range(len(sizes))]
+        covered = naive = 0
+        for seed in range(100):
+            check = sample_check(0.1, seed)
+            sampled = [size for line, size in zip(lines, sizes) if check(line)]
+            count, margin = estimate(sum(sampled), 0.1, sum(size * size for size in sampled))
+            covered += abs(count - sum(sizes)) <= margin
+            count, margin = estimate(sum(sampled), 0.1)
+            naive += abs(count - sum(sizes)) <= margin
+        self.assertGreaterEqual(covered, 80)
+        self.assertLess(naive, 50)
+
+    def test_group_report(self):
+        counter = ExactCounter()
+        counter.add(('active', 'example.com'), 10)
+        out = StringIO()
+        generate_group_report(counter, 0, out, 0.1)
+        self.assertEqual('100\t59\tactive\texample.com\n', out.getvalue())
+
+    def test_process_sample(self):
+        cf.infile = [self.qdata]
+        cf.report_sdom = True
+        cf.sample = 0.5
+        self.assertEqual(b'2 3 example.org\n', self._output())
+        cf.seed = 1
+        self.assertEqual(b'8 6 example.org\n', self._output())
+
+    def test_process_sample_squares(self):
+        cf.infile = [self.qdata]
+        cf.report_rdom = True
+        cf.sample = 0.5
+        cf.seed = 1
+        # All recipients of a message are sampled together.
+        self.assertEqual(b'2 3 example.org\n2 3 9gmail.com\n190 187 example.com\n', self._output())
+
+    def test_process_sample_top(self):
+        with TemporaryDirectory() as tmp:
+            cf.infile = [join(tmp, 'qdata')]
+            with open(cf.infile[0], 'w') as f:
+                for i in range(1000):
+                    rcpt = 'top@example.com' if i % 2 else f'{i}@example.com'
+                    record = dict(self.data, queue_id=f'{i:015X}', recipients=[{'address': rcpt}])
+                    print(json.dumps(record), file=f)
+            cf.report_rcpt = True
+            cf.sample = 0.5
+            cf.top = 1
+            with patch('postqf.topn.MIN_CAPACITY', 5):
+                self.assertTrue(self._output().endswith(b' top@example.com\n'))
+        # Sums are only kept for monitored keys, plus those of the last record.
+        self.assertLessEqual(len(core.report_squares['rcpt']), 11)
+
+    def test_process_reservoir(self):
+        cf.infile = [self.qdata]
+        cf.queue_id = True
+        cf.report_sdom = True
+        cf.reservoir = 2
+        self.assertEqual(b'4JgtdG4SPrz1y14\n4Jgt2V6Twsz1y0d\n# sdom\n5 6 example.org\n', self._output())
+        cf.reservoir = 10
+        self.assertEqual(5, len(self._output().splitlines()) - 2)
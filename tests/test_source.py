@@ -0,0 +1,84 @@
+# Copyright © 2022 Ralph Seichter
+#
+# This file is part of PostQF.
+#
+# PostQF is free software: you can redistribute it and/or modify it under the terms of the GNU
+# General Public License as published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# PostQF is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without
+# even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with PostQF.
+# If not, see <https://www.gnu.org/licenses/>.
+import sys
+from argparse import Namespace
+from os.path import join
+from tempfile import NamedTemporaryFile
+
+from postqf.config import Config
+from postqf.config import cf
+from postqf.source import CommandSource
+from postqf.source import FileSource
+from postqf.source import input_sources
+from tests import PostqfTestCase
+
+
+class TestSource(PostqfTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        cf.refresh(Namespace(qname=None, rcpt=None, sender=None, reason=None))
+        self.qdata = join(self.parentdir(__file__), 'qdata')
+        self.fake = f'{sys.executable} {join(self.parentdir(__file__), "fake_postqueue.py")}'
+
+    def test_input_sources(self):
+        c = Config()
+        c.refresh(Namespace(qname=None, rcpt=None, sender=None, reason=None, infile=['a', 'b']))
+        self.assertEqual(['a', 'b'], [str(s) for s in input_sources(c)])
+        c.postqueue = True
+        sources = input_sources(c)
+        self.assertTrue(isinstance(sources[0], CommandSource))
+        self.assertEqual('postqueue -j', str(sources[0]))
+
+    def test_file(self):
+        source = FileSource(self.qdata)
+        self.assertEqual(5, len(list(source.open())))
+        self.assertTrue(source.close())
+
+    def test_empty_file(self):
+        with NamedTemporaryFile('wb') as tmp:
+            source = FileSource(tmp.name)
+            self.assertEqual([], list(source.open()))
+            self.assertTrue(source.close())
+
+    def test_command(self):
+        source = CommandSource(f'{self.fake} 2')
+        self.assertEqual(10, len(list(source.open())))
+        self.assertTrue(source.close())
+        self.assertFalse(source.terminated)
+
+    def test_command_failure(self):
+        source = CommandSource(f'{self.fake} 1 3')
+        list(source.open())
+        self.assertFalse(source.close())
+
+    def test_command_terminated(self):
+        source = CommandSource(f'{self.fake} 0')
+        lines = source.open()
+        next(lines)
+        self.assertTrue(source.close())
+        self.assertTrue(source.terminated)
+
+    def test_limit(self):
+        cf.infile = [self.qdata, self.qdata]
+        cf.limit = 7
+        cf.queue_id = True
+        self.assertEqual(7, len(self._output().splitlines()))
+
+    def test_postqueue_limit(self):
+        cf.postqueue = True
+        cf.postqueue_cmd = f'{self.fake} 0'
+        cf.limit = 12
+        cf.queue_id = True
+        self.assertEqual(12, len(self._output().splitlines()))
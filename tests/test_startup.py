@@ -0,0 +1,80 @@
+# Copyright © 2022 Ralph Seichter
+#
+# This file is part of PostQF.
+#
+# PostQF is free software: you can redistribute it and/or modify it under the terms of the GNU
+# General Public License as published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# PostQF is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without
+# even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with PostQF.
+# If not, see <https://www.gnu.org/licenses/>.
+import os
+import subprocess
+import sys
+import zipapp
+from os.path import join
+from tempfile import TemporaryDirectory
+from typing import Optional
+
+from tests import PostqfTestCase
+
+# Standard library modules imported by a regular run of the original,
+# single-module implementation.
+BASELINE_MODULES = 'argparse, datetime, json, logging, re, typing'
+# Maximum time for importing the modules used by a regular run, relative to the
+# time for importing the baseline modules.
+STARTUP_BUDGET = 1.4
+# Modules which are slow to import, and only needed for some options.
+HEAVY_MODULES = ['asyncio', 'bz2', 'concurrent.futures', 'gzip', 'logging', 'lzma', 'multiprocessing', 'shlex',
+                 'socket', 'sqlite3', 'subprocess']
+
+
+class TestStartup(PostqfTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.root = self.parentdir(self.parentdir(__file__))
+        self.qdata = join(self.parentdir(__file__), 'qdata')
+
+    def _python(self, code: str, env: Optional[dict] = None) -> str:
+        env = dict(env or os.environ, PYTHONPATH=self.root)
+        p = subprocess.run([sys.executable, '-c', code], env=env, stdout=subprocess.PIPE, check=True)
+        return p.stdout.decode()
+
+    def _imported(self, modules: str) -> set:
+        code = f'import sys\nimport {modules}\nprint(" ".join(sys.modules))'
+        return set(self._python(code).split())
+
+    def test_lazy_imports(self):
+        imported = self._imported('postqf.cli, postqf.core')
+        self.assertEqual([], [m for m in HEAVY_MODULES if m in imported])
+
+    def test_client_path(self):
+        imported = self._imported('postqf.cli, postqf.client')
+        self.assertNotIn('postqf.core', imported)
+        self.assertNotIn('logging', imported)
+
+    def _import_time(self, modules: str, env: dict) -> float:
+        code = f'import time\nt = time.perf_counter()\nimport {modules}\nprint(time.perf_counter() - t)'
+        return min(float(self._python(code, env)) for _ in range(5))
+
+    def test_startup_time(self):
+        with TemporaryDirectory() as tmp:
+            # Bytecode is cached like in an installed package, but outside the source tree.
+            env = dict(os.environ, PYTHONPYCACHEPREFIX=tmp)
+            env.pop('PYTHONDONTWRITEBYTECODE', None)
+            baseline = self._import_time(BASELINE_MODULES, env)
+            elapsed = self._import_time('postqf.cli, postqf.core', env)
+        self.assertLess(elapsed, STARTUP_BUDGET * baseline)
+
+    def test_zipapp(self):
+        with TemporaryDirectory() as tmp:
+            target = join(tmp, 'postqf.pyz')
+            zipapp.create_archive(self.root, target, main='postqf.cli:main',
+                                  filter=lambda p: p.parts[0] == 'postqf' and '__pycache__' not in p.parts)
+            output = subprocess.run([sys.executable, target, '-s', 'fummo', '--id', self.qdata],
+                                    stdout=subprocess.PIPE, check=True).stdout
+        self.assertEqual(b'4Jgt2V6BKNz1xy5\n4Jgt2V6Twsz1y0d\n', output)
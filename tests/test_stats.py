@@ -0,0 +1,93 @@
+# Copyright © 2022 Ralph Seichter
+#
+# This file is part of PostQF.
+#
+# PostQF is free software: you can redistribute it and/or modify it under the terms of the GNU
+# General Public License as published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# PostQF is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without
+# even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with PostQF.
+# If not, see <https://www.gnu.org/licenses/>.
+import json
+import os
+from argparse import Namespace
+from os.path import join
+from tempfile import NamedTemporaryFile
+from unittest.mock import patch
+
+from postqf.config import cf
+from postqf.core import process_files
+from postqf.stats import Stats
+from postqf.stats import add_stats_hook
+from postqf.stats import stats_hooks
+from tests import PostqfTestCase
+
+
+class TestStats(PostqfTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        cf.refresh(Namespace(qname=None, rcpt=None, sender=None, reason=None))
+        cf.infile = [join(self.parentdir(__file__), 'qdata')]
+        cf.outfile = os.devnull
+        self.collected = []
+        add_stats_hook(self.collected.append)
+
+    def tearDown(self) -> None:
+        stats_hooks.clear()
+        super().tearDown()
+
+    def test_merge(self):
+        a = Stats()
+        a.records = 3
+        a.rejected = {'qname': 1}
+        a.sampled = 1
+        a.stage_times['parse'] = 0.5
+        a.busy = 2.0
+        b = Stats()
+        b.records = 1
+        b.rejected = {'qname': 2, 'rcpt': 1}
+        b.busy = 1.0
+        a.merge(b)
+        self.assertEqual(4, a.records)
+        self.assertEqual({'qname': 3, 'rcpt': 1}, a.rejected)
+        stages = a.stages()
+        self.assertEqual(2.0, stages['parse'])
+        self.assertEqual(1.0, stages['read'])
+
+    def test_hook(self):
+        cf.sender_re = cf.re_compile('fummo')
+        cf.rcpt_re = cf.re_compile('vladik|nobody')
+        cf.report_rdom = True
+        self.assertTrue(process_files())
+        stats = self.collected[0]
+        self.assertEqual(5, stats.records)
+        self.assertEqual(12491, stats.bytes)
+        self.assertEqual(1, stats.matches)
+        self.assertEqual({'qname': 0, 'sender': 3, 'rcpt': 1}, stats.rejected)
+        self.assertEqual({'rdom': 1}, stats.cardinality)
+        self.assertGreater(stats.wall, 0)
+
+    def test_prefiltered(self):
+        cf.qname_re = cf.re_compile('hold')
+        self.assertTrue(process_files())
+        self.assertEqual({'qname': 5}, self.collected[0].rejected)
+
+    def test_sampling(self):
+        with patch('postqf.core.SAMPLE_INTERVAL', 2):
+            self.assertTrue(process_files())
+        stats = self.collected[0]
+        self.assertEqual(2, stats.sampled)
+        self.assertEqual(5, stats.matches)
+        self.assertGreater(stats.stage_times['output'], 0)
+
+    def test_json_file(self):
+        with NamedTemporaryFile('r') as tmp:
+            cf.stats = tmp.name
+            self.assertTrue(process_files())
+            data = json.load(tmp)
+        self.assertEqual(5, data['records'])
+        self.assertEqual(set(data['stages']), {'read', 'prefilter', 'parse', 'filter', 'output'})
@@ -0,0 +1,76 @@
+# Copyright © 2022 Ralph Seichter
+#
+# This file is part of PostQF.
+#
+# PostQF is free software: you can redistribute it and/or modify it under the terms of the GNU
+# General Public License as published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# PostQF is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without
+# even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with PostQF.
+# If not, see <https://www.gnu.org/licenses/>.
+import random
+from collections import Counter
+from unittest import TestCase
+
+from postqf.topn import MIN_CAPACITY
+from postqf.topn import SpaceSaving
+from postqf.topn import capacity_for
+
+
+def _stream(seed: int, length: int = 20000) -> list:
+    rnd = random.Random(seed)
+    # A few heavy hitters among many rare keys.
+    heavy = [f'heavy{i}' for i in range(5)]
+    return [rnd.choice(heavy) if rnd.random() < 0.3 else f'rare{rnd.randrange(10000)}' for _ in range(length)]
+
+
+class TestSpaceSaving(TestCase):
+    def test_capacity(self):
+        self.assertEqual(MIN_CAPACITY, capacity_for(1))
+        self.assertEqual(100000, capacity_for(10000))
+
+    def test_exact_below_capacity(self):
+        s = SpaceSaving(10)
+        for key in 'abracadabra':
+            s.add(key)
+        self.assertEqual([('a', 5, 0), ('b', 2, 0)], s.top(2))
+        self.assertEqual(11, s.total)
+
+    def test_bounded(self):
+        s = SpaceSaving(50)
+        for key in _stream(1):
+            s.add(key)
+        self.assertEqual(50, len(s))
+
+    def test_error_bounds(self):
+        stream = _stream(2)
+        exact = Counter(stream)
+        s = SpaceSaving(200)
+        for key in stream:
+            s.add(key)
+        top = s.top(5)
+        self.assertEqual({f'heavy{i}' for i in range(5)}, {key for key, _, _ in top})
+        for key, count, error in top:
+            self.assertLessEqual(count - error, exact[key])
+            self.assertGreaterEqual(count, exact[key])
+
+    def test_merge(self):
+        stream = _stream(3)
+        exact = Counter(stream)
+        a = SpaceSaving(200)
+        b = SpaceSaving(200)
+        for i, key in enumerate(stream):
+            (a if i % 2 else b).add(key)
+        a.merge(b)
+        self.assertEqual(len(stream), a.total)
+        self.assertLessEqual(len(a), 200)
+        for key, count, error in a.top(5):
+            self.assertTrue(key.startswith('heavy'))
+            self.assertLessEqual(count - error, exact[key])
+            self.assertGreaterEqual(count, exact[key])
+        a.add('new')
+        self.assertLessEqual(len(a), 200)